@@ -0,0 +1,211 @@
+from .logger import logger
+from .context import CONTROL_PREFIXES
+import asyncio
+import collections
+import json
+import math
+import os
+import time
+
+# Path prefix -> route class, first match wins. "/" on its own is core.
+# Paths that match no prefix are in the "default" class.
+ROUTE_CLASSES = (
+    ("/todos", "core"),
+    ("/simulate", "simulation"),
+)
+
+# Never limited: monitoring and operator controls must answer during an overload,
+# and event streams are capped by the broadcaster itself.
+EXEMPT_PREFIXES = CONTROL_PREFIXES
+
+# class -> (max in flight, max queued, max queue wait in ms)
+# Sync routes run on a 40-thread pool, so simulations alone cannot take every thread.
+DEFAULT_LIMITS = {
+    "core": (64, 256, 500),
+    "simulation": (16, 16, 100),
+    "default": (32, 64, 250),
+}
+
+
+def parse_limits(value: str):
+    """
+    Parses "simulation=8:8:50,core=128:256:500" into {class: (limit, queue, deadline_ms)}.
+    """
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, numbers = item.partition("=")
+        limit, queue, deadline_ms = (int(n) for n in numbers.split(":"))
+        limits[name.strip()] = (limit, queue, deadline_ms)
+    return limits
+
+
+class RouteClass:
+    """
+    Concurrency limit for one class of routes with a bounded FIFO queue.
+
+    A request is admitted while fewer than `limit` are in flight. Otherwise it
+    waits in the queue for at most `deadline` seconds; a finishing request
+    hands its slot straight to the oldest waiter. When the queue is full, or
+    the wait times out, the request is shed.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, deadline_ms: int):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.deadline = deadline_ms / 1000
+        self.inflight = 0
+        self._waiters = collections.deque()
+        self.shedding = False
+        self._service_time = 0.0  # moving average of seconds a slot is held
+        self._admitted = 0
+        self._queued = 0
+        self._shed_queue_full = 0
+        self._shed_deadline = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def acquire(self) -> bool:
+        if self.inflight < self.limit and not self._waiters:
+            self.inflight += 1
+            self._admitted += 1
+            if self.shedding:
+                self.shedding = False
+                logger.info("admission_recovered", route_class=self.name)
+            return True
+        if len(self._waiters) >= self.queue:
+            self._shed_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.deadline)
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the deadline passed
+            if waiter.cancelled():
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                self._shed_deadline += 1
+                return False
+        except BaseException:
+            # Cancelled (client gone) after a slot was handed over: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        waited = time.monotonic() - start
+        self._admitted += 1
+        self._queued += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return True
+
+    def release(self, held: float):
+        self._service_time += (held - self._service_time) * 0.1
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot moves to the waiter, so `inflight` stays the same
+                waiter.set_result(None)
+                return
+        self.inflight -= 1
+
+    def retry_after(self) -> int:
+        """
+        Seconds until the current backlog should have drained, at least 1.
+        """
+        backlog = self.inflight + len(self._waiters)
+        return max(1, math.ceil(self._service_time * backlog / max(1, self.limit)))
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "queue_limit": self.queue,
+            "queue_deadline_ms": self.deadline * 1000,
+            "inflight": self.inflight,
+            "queued_now": len(self._waiters),
+            "admitted": self._admitted,
+            "admitted_after_queueing": self._queued,
+            "shed_queue_full": self._shed_queue_full,
+            "shed_deadline": self._shed_deadline,
+            "avg_queue_wait_ms": round(self._wait_total / self._queued * 1000, 3) if self._queued else 0.0,
+            "max_queue_wait_ms": round(self._wait_max * 1000, 3),
+            "avg_service_ms": round(self._service_time * 1000, 3),
+        }
+
+
+class AdmissionController:
+    def __init__(self, limits: dict):
+        self.classes = {name: RouteClass(name, *values) for name, values in limits.items()}
+
+    def classify(self, path: str):
+        """
+        The RouteClass for `path`, or None if the path is exempt.
+        """
+        if path.startswith(EXEMPT_PREFIXES):
+            return None
+        if path == "/":
+            return self.classes["core"]
+        for prefix, name in ROUTE_CLASSES:
+            if path.startswith(prefix):
+                return self.classes[name]
+        return self.classes["default"]
+
+    def stats(self):
+        return {name: route_class.stats() for name, route_class in self.classes.items()}
+
+
+admission = AdmissionController({**DEFAULT_LIMITS, **parse_limits(os.getenv("ADMISSION_LIMITS", ""))})
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI admission control, applied before routing so a shed request
+    costs no more than a path match and a 503 with `Retry-After`.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.controller.classify(scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await route_class.acquire():
+            await self.reject(route_class, send)
+            return
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release(time.monotonic() - start)
+
+    @staticmethod
+    async def reject(route_class: RouteClass, send):
+        if not route_class.shedding:
+            route_class.shedding = True
+            logger.warning("admission_shedding", route_class=route_class.name, **route_class.stats())
+        body = json.dumps({"detail": f"Server busy: too many {route_class.name} requests",
+                           "route_class": route_class.name}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(route_class.retry_after()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,94 @@
+"""
+Local stand-in for the incident-response agent webhook.
+
+Accepts POSTs on any path, answers 200 with {"status": "received"} and counts
+the incidents it received. Useful for benchmarks and replays without network
+access.
+
+    python -m app.agent_stub --port 9000
+    AGENT_URL=http://127.0.0.1:9000/analyze-incident uvicorn app.main:app
+"""
+import argparse
+import http.server
+import json
+import threading
+import time
+
+
+class AgentStubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, each keep-alive response waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            payload = json.loads(body or b"null")
+        except ValueError:
+            payload = None
+        incidents = len(payload) if isinstance(payload, list) else 1
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.incidents += incidents
+        if server.delay:
+            time.sleep(server.delay)
+
+        response = b'{"status": "received"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        # Keep benchmark and replay output clean
+        pass
+
+
+class AgentStubServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # Replay opens one connection per concurrent request at once; the default backlog of 5 resets most of them
+    request_queue_size = 256
+
+    def __init__(self, address, delay: float = 0.0):
+        super().__init__(address, AgentStubHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.incidents = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/analyze-incident"
+
+
+def start_stub(host: str = "127.0.0.1", port: int = 0, delay: float = 0.0) -> AgentStubServer:
+    """
+    Starts the stub on a background thread. Port 0 picks a free port; see `server.url`.
+    """
+    server = AgentStubServer((host, port), delay)
+    threading.Thread(target=server.serve_forever, name="agent-stub", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub for the agent webhook.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Artificial processing delay per POST")
+    args = parser.parse_args()
+
+    server = AgentStubServer((args.host, args.port), args.delay_ms / 1000)
+    print(f"Agent stub listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Received {server.requests} requests carrying {server.incidents} incidents")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,21 @@
-from .logger import logger
-import requests
+from .logger import logger, sampling_handler
+from .delivery import delivery_queue
+from .context import current_request_id
+from .fingerprint import StormCoalescer, fingerprint_exception, fingerprint_message
+from .incident_store import incident_store
+from .event_stream import publish_notification
+from .tracebacks import summarize
 import os
 
+FINGERPRINT_DEPTH = int(os.getenv("INCIDENT_FINGERPRINT_DEPTH", "5"))
+# About 20 lines once rendered
+TRACEBACK_FRAMES = int(os.getenv("INCIDENT_TRACEBACK_FRAMES", "8"))
+
+storm_coalescer = StormCoalescer(
+    emit=delivery_queue.enqueue,
+    window=float(os.getenv("INCIDENT_WINDOW_SECONDS", "60")),
+)
+
 def send_email_alert(subject: str, body: str):
     """
     Simulates sending an email alert.
@@ -11,31 +25,50 @@ def send_email_alert(subject: str, body: str):
 
 import datetime
 
-def notify_agent(severity: str, error_message: str, incident_type: str = "raw_error"):
+def notify_agent(severity: str, error_message: str = None, incident_type: str = "raw_error", exc: BaseException = None):
     """
     Simulates notifying the AI agent with a specific payload format.
     Only sends the last 20 lines of the error message.
+    The POST itself happens on the background delivery queue.
+
+    Pass `exc` instead of a preformatted traceback so repeated incidents are
+    coalesced without formatting their traceback at all.
     """
-    # Split by lines and keep only the last 20
-    error_lines = error_message.splitlines()
-    error_msg = "\n".join(error_lines[-20:])
-    print("asdf", error_msg)
-    payload = {
-        "type": incident_type,
-        "severity": severity.upper(),
-        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-        "error": error_msg
-    }
-
-    logger.debug("agent_notification", payload=payload, type="incident_trigger")
-    
-    # Use default URL if not provided to ensure we simulate the POST request
-    # Priority: Environment Variable -> Default Localhost
-    target_url = os.getenv("AGENT_URL") or "https://ira-agent-dfij4ukyrq-uc.a.run.app/analyze-incident"
-    
-    try:
-        response = requests.post(target_url, json=payload, timeout=5)
-        logger.info("agent_webhook_payload_sent", status_code=response.status_code, url=target_url)
-    except Exception as e:
-        # We catch the error because the webhook might not exist, but we attempted the POST
-        logger.warning("agent_webhook_failed", error=str(e), url=target_url)
+    # Keep the full log trail of the request that raised this incident
+    sampling_handler.mark_incident()
+
+    if exc is not None:
+        fingerprint = fingerprint_exception(exc, incident_type, FINGERPRINT_DEPTH)
+    else:
+        fingerprint = fingerprint_message(error_message, incident_type, FINGERPRINT_DEPTH)
+
+    # Every occurrence is indexed, including the ones coalesced below
+    if exc is not None:
+        summary = f"{type(exc).__name__}: {exc}"
+    else:
+        summary = error_message.strip().splitlines()[-1] if error_message and error_message.strip() else error_message
+    request_id = current_request_id()
+    incident_store.add(incident_type, severity, source="agent_notification", message=summary,
+                       fingerprint=fingerprint, request_id=request_id)
+    publish_notification({"type": incident_type, "severity": severity, "message": summary,
+                          "fingerprint": fingerprint, "request_id": request_id})
+
+    def build_payload():
+        message = error_message
+        if message is None:
+            message = summarize(exc, TRACEBACK_FRAMES)
+        # Split by lines and keep only the last 20
+        error_lines = message.splitlines()
+        error_msg = "\n".join(error_lines[-20:])
+        payload = {
+            "type": incident_type,
+            "severity": severity.upper(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "error": error_msg,
+            "fingerprint": fingerprint,
+            "request_id": current_request_id(),
+        }
+        logger.debug("agent_notification", payload=payload, type="incident_trigger")
+        return payload
+
+    storm_coalescer.observe(fingerprint, build_payload)
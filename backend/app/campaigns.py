@@ -0,0 +1,375 @@
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+from typing import List, Optional
+from .logger import logger
+from .alerts import notify_agent
+from .scenarios import scenario_engine, ScenarioLimitError
+from .chaos_workers import SCENARIOS as ISOLATED_SCENARIOS
+from .histogram import LatencyHistogram
+import asyncio
+import collections
+import math
+import os
+import time
+import weakref
+
+router = APIRouter()
+
+PROCESS_WORKERS = int(os.getenv("CAMPAIGN_PROCESS_WORKERS", "2"))
+# An isolated run still going after this many seconds (queueing included) is stopped
+ISOLATED_RUN_TIMEOUT = float(os.getenv("CAMPAIGN_RUN_TIMEOUT", "300"))
+MAX_RUNS_PER_STEP = 10000
+HTTP_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+# Routes a campaign must not call: itself, and streams that never finish
+FORBIDDEN_PREFIXES = ("/campaigns", "/events/stream")
+
+# incident_type and severity reported to the agent for each isolated scenario
+ISOLATED_INCIDENTS = {
+    "recursion_error": ("recursion_error", "high"),
+    "cpu_burn": ("cpu_saturation", "medium"),
+    "memory_ramp": ("memory_leak", "high"),
+    "hard_crash": ("worker_crash", "critical"),
+}
+
+
+class CampaignStep(BaseModel):
+    endpoint: Optional[str] = None  # e.g. "POST /simulate/disk_full"
+    scenario: Optional[str] = None  # one of chaos_workers.SCENARIOS, run in a worker process
+    params: dict = {}
+    start: float = 0  # seconds after the campaign starts
+    every: float = 0  # seconds between runs
+    count: int = 1
+    overlap: int = 1  # runs of this step allowed in flight at once; extra runs are skipped
+
+
+class CampaignSpec(BaseModel):
+    name: str = "campaign"
+    steps: List[CampaignStep]
+    max_duration: float = 600
+
+
+class StepReport:
+    def __init__(self, step: CampaignStep):
+        self.label = step.endpoint or f"isolated:{step.scenario}"
+        self.scheduled = step.count
+        self.outcomes = collections.Counter()
+        self.latency = LatencyHistogram()
+        self.skipped = 0
+        self.recent = collections.deque(maxlen=20)
+
+    def record(self, offset: float, duration: float, outcome: str, detail: str = None):
+        self.outcomes[outcome] += 1
+        self.latency.record(duration)
+        run = {"offset_seconds": round(offset, 3), "duration_ms": round(duration * 1000, 3), "outcome": outcome}
+        if detail:
+            run["detail"] = detail
+        self.recent.append(run)
+
+    def to_dict(self):
+        return {
+            "step": self.label,
+            "scheduled": self.scheduled,
+            "completed": self.latency.count,
+            "skipped_over_overlap": self.skipped,
+            "outcomes": dict(self.outcomes),
+            "latency": self.latency.summary_ms(),
+            "recent_runs": list(self.recent),
+        }
+
+
+class Campaign:
+    def __init__(self, spec: CampaignSpec):
+        self.spec = spec
+        self.steps = [StepReport(step) for step in spec.steps]
+        self.scenario = None
+        self.timed_out = False
+
+    def to_dict(self):
+        return {
+            **self.scenario.to_dict(),
+            "name": self.spec.name,
+            "timed_out": self.timed_out,
+            "steps": [step.to_dict() for step in self.steps],
+        }
+
+
+# --- worker processes ---
+
+class WorkerStopped(Exception):
+    pass
+
+
+_pool = None
+_stopped_pools = weakref.WeakSet()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # Imported on first use: multiprocessing adds noticeably to cold start
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn: workers must not inherit the server's threads, sockets and memory
+        _pool = ProcessPoolExecutor(PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _discard_pool(pool, stop_workers: bool = False):
+    global _pool
+    if _pool is pool:
+        _pool = None
+    processes = list((getattr(pool, "_processes", None) or {}).values()) if stop_workers else []
+    pool.shutdown(wait=False, cancel_futures=stop_workers)
+    # shutdown() cannot interrupt a call that is already running, so runaway workers are killed
+    if processes:
+        _stopped_pools.add(pool)
+        for process in processes:
+            process.terminate()
+
+
+def shutdown_workers():
+    if _pool is not None:
+        _discard_pool(_pool)
+
+
+router.add_event_handler("shutdown", shutdown_workers)
+
+
+async def run_isolated(name: str, params: dict):
+    """
+    Runs a chaos_workers scenario in the process pool.
+    A worker that dies breaks the whole pool, failing its other in-flight
+    runs too; a fresh pool is created on the next call. A run that times out
+    or is cancelled while a worker is executing it has its pool stopped the
+    same way, so the runaway worker does not keep holding a slot.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+
+    pool = _get_pool()
+    future = pool.submit(ISOLATED_SCENARIOS[name], **params)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), ISOLATED_RUN_TIMEOUT)
+    except BrokenProcessPool:
+        if pool in _stopped_pools:
+            raise WorkerStopped("worker pool stopped after another run timed out or was cancelled")
+        _discard_pool(pool)
+        raise
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        # A queued call was cancelled with the wait; a running one has to be killed
+        if not future.done():
+            _discard_pool(pool, stop_workers=True)
+        raise
+
+
+# --- runner ---
+
+class CampaignRunner:
+    """
+    Runs declarative campaigns: each step fires an endpoint (in-process,
+    through ASGI) or an isolated scenario (in a worker process) `count`
+    times, `every` seconds apart, starting `start` seconds in. Steps run
+    concurrently; a campaign is a scenario, so it can be listed and
+    cancelled through /scenarios.
+    """
+
+    def __init__(self, history: int = 50):
+        self._campaigns = collections.OrderedDict()
+        self._history = history
+
+    def start(self, spec: CampaignSpec, app) -> Campaign:
+        campaign = Campaign(spec)
+        campaign.scenario = scenario_engine.start(
+            "campaign", lambda: self._run(campaign, app), {"name": spec.name, "steps": len(spec.steps)}
+        )
+        self._campaigns[campaign.scenario.id] = campaign
+        while len(self._campaigns) > self._history:
+            oldest = next(iter(self._campaigns.values()))
+            if oldest.scenario.status == "running":
+                break
+            self._campaigns.popitem(last=False)
+        return campaign
+
+    def get(self, campaign_id: str):
+        return self._campaigns.get(campaign_id)
+
+    def list(self):
+        return list(reversed(self._campaigns.values()))
+
+    async def _run(self, campaign: Campaign, app):
+        from .loadgen import asgi_client
+
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+
+        async with asgi_client(app) as client:
+            drivers = [
+                loop.create_task(self._drive(step, report, client, t0))
+                for step, report in zip(campaign.spec.steps, campaign.steps)
+            ]
+            try:
+                await asyncio.wait_for(asyncio.gather(*drivers), campaign.spec.max_duration)
+            except asyncio.TimeoutError:
+                campaign.timed_out = True
+        logger.info(
+            "campaign_finished",
+            campaign_id=campaign.scenario.id,
+            name=campaign.spec.name,
+            timed_out=campaign.timed_out,
+            outcomes={report.label: dict(report.outcomes) for report in campaign.steps},
+        )
+
+    async def _drive(self, step: CampaignStep, report: StepReport, client, t0: float):
+        loop = asyncio.get_running_loop()
+        inflight = set()
+        try:
+            for i in range(step.count):
+                delay = t0 + step.start + i * step.every - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if len(inflight) >= step.overlap:
+                    report.skipped += 1
+                    continue
+                task = loop.create_task(self._run_once(step, report, client, t0))
+                inflight.add(task)
+                task.add_done_callback(inflight.discard)
+            if inflight:
+                await asyncio.wait(inflight)
+        finally:
+            for task in inflight:
+                task.cancel()
+
+    async def _run_once(self, step: CampaignStep, report: StepReport, client, t0: float):
+        from concurrent.futures.process import BrokenProcessPool
+
+        offset = asyncio.get_running_loop().time() - t0
+        started = time.perf_counter()
+        detail = None
+        try:
+            if step.endpoint:
+                method, path = step.endpoint.split(" ", 1)
+                response = await client.request(method, path, params=step.params or None)
+                outcome = str(response.status_code)
+            else:
+                result = await run_isolated(step.scenario, step.params)
+                outcome = "ok" if result.get("ok") else result["error_type"]
+                self._notify(step.scenario, result)
+        except asyncio.CancelledError:
+            report.record(offset, time.perf_counter() - started, "cancelled")
+            raise
+        except BrokenProcessPool:
+            outcome = "crashed"
+            self._notify(step.scenario, {"error": f"Campaign worker process running {step.scenario} died"})
+        except Exception as e:
+            outcome = type(e).__name__
+            detail = str(e)
+        report.record(offset, time.perf_counter() - started, outcome, detail)
+
+    @staticmethod
+    def _notify(scenario: str, result: dict):
+        incident_type, severity = ISOLATED_INCIDENTS.get(scenario, (scenario, "high"))
+        if result.get("ok"):
+            message = f"{scenario} held a CPU core for {result['duration_seconds']:.1f}s in worker {result['pid']}"
+        else:
+            message = result["error"]
+        notify_agent(severity=severity, error_message=message, incident_type=incident_type)
+
+
+campaign_runner = CampaignRunner()
+
+
+def validate_step(step: CampaignStep):
+    if (step.endpoint is None) == (step.scenario is None):
+        return "each step needs exactly one of endpoint or scenario"
+    if step.endpoint is not None:
+        method, _, path = step.endpoint.partition(" ")
+        if method not in HTTP_METHODS or not path.startswith("/"):
+            return f'endpoint must look like "POST /simulate/disk_full", got {step.endpoint!r}'
+        if path.startswith(FORBIDDEN_PREFIXES):
+            return f"{path} cannot be called from a campaign"
+    elif step.scenario not in ISOLATED_SCENARIOS:
+        return f"scenario must be one of {', '.join(ISOLATED_SCENARIOS)}"
+    else:
+        error = validate_isolated_params(step.scenario, step.params)
+        if error:
+            return error
+    if not 1 <= step.count <= MAX_RUNS_PER_STEP:
+        return f"count must be between 1 and {MAX_RUNS_PER_STEP}"
+    if step.start < 0 or step.every < 0 or step.overlap < 1:
+        return "start and every must be >= 0 and overlap >= 1"
+    return None
+
+
+def _positive(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) and value > 0
+
+
+def validate_isolated_params(scenario: str, params: dict):
+    """
+    Isolated runs get the same limits as the in-process scenarios: memory is
+    capped at MEMORY_PRESSURE_MAX_MB and nothing may outlast the run timeout.
+    """
+    allowed = {
+        "recursion_error": (),
+        "cpu_burn": ("seconds",),
+        "memory_ramp": ("target_mb", "rate_mb_s"),
+        "hard_crash": ("exit_code",),
+    }[scenario]
+    unknown = set(params) - set(allowed)
+    if unknown:
+        return f"unknown params for {scenario}: {', '.join(sorted(unknown))}"
+    if scenario == "cpu_burn":
+        seconds = params.get("seconds", 5.0)
+        if not _positive(seconds) or seconds > ISOLATED_RUN_TIMEOUT:
+            return f"seconds must be greater than 0 and at most {ISOLATED_RUN_TIMEOUT:g}"
+    elif scenario == "memory_ramp":
+        from .memory_pressure import MAX_ALLOCATION_MB
+
+        target_mb = params.get("target_mb", 256)
+        rate_mb_s = params.get("rate_mb_s", 100)
+        if not _positive(target_mb) or target_mb > MAX_ALLOCATION_MB:
+            return f"target_mb must be greater than 0 and at most {MAX_ALLOCATION_MB}"
+        if not _positive(rate_mb_s) or target_mb / rate_mb_s > ISOLATED_RUN_TIMEOUT:
+            return f"rate_mb_s must be positive and reach target_mb within {ISOLATED_RUN_TIMEOUT:g}s"
+    elif scenario == "hard_crash" and not isinstance(params.get("exit_code", 1), int):
+        return "exit_code must be an integer"
+    return None
+
+
+@router.post("/campaigns")
+async def start_campaign(spec: CampaignSpec, request: Request):
+    """
+    Starts a chaos campaign. Example step list:
+    [{"endpoint": "POST /simulate/division_by_zero", "every": 2, "count": 30},
+     {"scenario": "recursion_error", "start": 10},
+     {"scenario": "cpu_burn", "params": {"seconds": 5}, "start": 20, "every": 10, "count": 3, "overlap": 2}]
+    """
+    if not spec.steps:
+        raise HTTPException(status_code=422, detail="a campaign needs at least one step")
+    for position, step in enumerate(spec.steps):
+        error = validate_step(step)
+        if error:
+            raise HTTPException(status_code=422, detail=f"step {position}: {error}")
+    try:
+        campaign = campaign_runner.start(spec, request.app)
+    except ScenarioLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    logger.warning("campaign_started", campaign_id=campaign.scenario.id, name=spec.name, steps=len(spec.steps))
+    return {"message": "Campaign started", "campaign_id": campaign.scenario.id}
+
+
+@router.get("/campaigns")
+async def list_campaigns():
+    return {"campaigns": [
+        {key: value for key, value in campaign.to_dict().items() if key != "steps"}
+        for campaign in campaign_runner.list()
+    ]}
+
+
+@router.get("/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str):
+    campaign = campaign_runner.get(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign.to_dict()
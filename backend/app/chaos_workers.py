@@ -0,0 +1,95 @@
+"""
+Fault scenarios that run in campaign worker processes.
+
+Each function reproduces its fault inside the worker and returns a result
+dict instead of raising, so the traceback can be summarised where it
+happened. Only stdlib (and app.tracebacks) is imported here so workers
+start quickly.
+"""
+import hashlib
+import os
+import sys
+import time
+
+from .tracebacks import summarize
+
+MB = 1024 * 1024
+
+
+def _failure(exc: BaseException, started: float, **extra):
+    return {
+        "ok": False,
+        "error_type": type(exc).__name__,
+        "error": summarize(exc, 8),
+        "duration_seconds": time.perf_counter() - started,
+        "pid": os.getpid(),
+        **extra,
+    }
+
+
+def recursion_error():
+    started = time.perf_counter()
+
+    def recurse(depth):
+        return recurse(depth + 1)
+
+    try:
+        recurse(0)
+    except RecursionError as e:
+        return _failure(e, started, recursion_limit=sys.getrecursionlimit())
+
+
+def cpu_burn(seconds: float = 5.0):
+    """
+    Hashes in a tight loop for `seconds`, holding one core.
+    """
+    started = time.perf_counter()
+    digest = b""
+    iterations = 0
+    while time.perf_counter() - started < seconds:
+        digest = hashlib.sha256(digest).digest()
+        iterations += 1
+    return {"ok": True, "iterations": iterations, "duration_seconds": time.perf_counter() - started, "pid": os.getpid()}
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def memory_ramp(target_mb: float = 256, rate_mb_s: float = 100):
+    """
+    Grows this worker's memory to `target_mb` at `rate_mb_s`, then fails with
+    a MemoryError. The memory goes away with the worker's stack frame.
+    """
+    if target_mb <= 0 or rate_mb_s <= 0:
+        raise ValueError("target_mb and rate_mb_s must be positive")
+    started = time.perf_counter()
+    chunks = []
+    step = max(1, int(rate_mb_s * MB / 10))
+    while len(chunks) * step < target_mb * MB:
+        chunks.append(b"x" * step)
+        time.sleep(0.1)
+    peak = _rss_bytes()
+    try:
+        raise MemoryError(f"Worker RSS reached {round(peak / MB) if peak else '?'} MB")
+    except MemoryError as e:
+        return _failure(e, started, peak_rss_mb=round(peak / MB, 1) if peak else None)
+
+
+def hard_crash(exit_code: int = 1):
+    """
+    Kills the worker process outright, as a segfault or OOM kill would.
+    """
+    os._exit(exit_code)
+
+
+SCENARIOS = {
+    "recursion_error": recursion_error,
+    "cpu_burn": cpu_burn,
+    "memory_ramp": memory_ramp,
+    "hard_crash": hard_crash,
+}
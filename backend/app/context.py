@@ -0,0 +1,24 @@
+import contextvars
+
+# Bound by the request middleware for the lifetime of each HTTP request.
+# Context is copied into threadpool workers and tasks started by the request.
+request_id_var = contextvars.ContextVar("request_id", default=None)
+request_path_var = contextvars.ContextVar("request_path", default=None)
+
+# Monitoring and operator controls. These must keep answering during an overload
+# or an injected outage, so admission control and HTTP faults skip them.
+CONTROL_PREFIXES = ("/metrics", "/debug", "/faults", "/scenarios", "/incidents", "/events/stream", "/docs", "/openapi.json")
+
+
+def current_request_id():
+    return request_id_var.get()
+
+
+def add_request_context(logger, method_name, event_dict):
+    """
+    Structlog processor that tags every record logged during a request with its id.
+    """
+    request_id = request_id_var.get()
+    if request_id is not None and "request_id" not in event_dict:
+        event_dict["request_id"] = request_id
+    return event_dict
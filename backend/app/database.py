@@ -1,12 +1,20 @@
 import sqlite3
 import os
 from .logger import logger
+from .db_pool import ConnectionPool
+from .group_commit import GroupCommitter
 
-DB_FILE = "todos.db"
+DB_FILE = os.getenv("DB_FILE", "todos.db")
+
+SELECT_TODOS = "SELECT id, title, completed FROM todos"
+SELECT_TODOS_AFTER = "SELECT id, title, completed FROM todos WHERE id > ? ORDER BY id"
+SELECT_TODOS_PAGE = "SELECT id, title, completed FROM todos WHERE id > ? ORDER BY id LIMIT ?"
+INSERT_TODO = "INSERT INTO todos (title, completed) VALUES (?, ?)"
 
 def get_db_connection():
     """
-    Establishes a connection to the SQLite database.
+    Establishes a standalone connection to the SQLite database.
+    Request handlers should use `db_pool` instead.
     Dumps an error log if connection fails.
     """
     try:
@@ -23,6 +31,8 @@ def init_db():
     """
     try:
         conn = get_db_connection()
+        # Persistent in the file, so readers opened before the first write use WAL too
+        conn.execute("PRAGMA journal_mode = WAL")
         with conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS todos (
@@ -36,5 +46,29 @@ def init_db():
     except Exception as e:
         logger.error("db_initialization_failed", error=str(e))
 
-# Initialize on module load (simple approach) or call from main
-init_db()
+def iter_todo_pages(after: int = 0, limit: int = None, page_size: int = 500):
+    """
+    Yields todo rows in pages using keyset pagination on `id`.
+    Each page is a short query, so no cursor is held open between pages.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        with db_pool.reader() as conn:
+            rows = conn.execute(SELECT_TODOS_PAGE, (after, size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < size:
+            return
+        after = rows[-1]["id"]
+        if remaining is not None:
+            remaining -= len(rows)
+
+db_pool = ConnectionPool(DB_FILE)
+
+group_committer = GroupCommitter(
+    db_pool,
+    window=float(os.getenv("DB_COMMIT_WINDOW_MS", "2")) / 1000,
+    max_batch=int(os.getenv("DB_COMMIT_MAX_BATCH", "256")),
+)
@@ -0,0 +1,137 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import urllib.request
+from .logger import logger
+from .faults import fault_injector, InjectedDatabaseError
+
+# Applied once per connection when it is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 67108864",
+)
+
+
+class ConnectionPool:
+    """
+    Pooled SQLite access in WAL mode (`init_db` switches the file to WAL
+    before any pooled connection is opened).
+
+    Reads use one long-lived, query-only connection per thread, so concurrent
+    readers never wait on each other or on the writer. Writes share a single
+    connection serialized by a lock. Connections are opened with mode=rw, so a
+    missing database file fails loudly instead of silently creating an empty one.
+    """
+
+    def __init__(self, db_file: str, cached_statements: int = 256):
+        self.db_file = db_file
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._readers = {}  # thread -> connection
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._opened = 0
+        self._invalidations = 0
+
+    def _connect(self, read_only: bool):
+        uri = "file:" + urllib.request.pathname2url(os.path.abspath(self.db_file)) + "?mode=rw"
+        try:
+            conn = sqlite3.connect(
+                uri,
+                uri=True,
+                check_same_thread=False,
+                cached_statements=self.cached_statements,
+                isolation_level=None if read_only else "DEFERRED",
+            )
+        except sqlite3.Error as e:
+            logger.error("db_connection_failed", details={"error": str(e), "type": "db_error"})
+            raise e
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        self._opened += 1
+        return conn
+
+    def _reader_connection(self):
+        cached = getattr(self._local, "reader", None)
+        if cached is not None and cached[0] == self._generation:
+            return cached[1]
+        with self._lock:
+            # Drop connections owned by threads that have exited
+            for thread in [t for t in self._readers if not t.is_alive()]:
+                self._readers.pop(thread).close()
+            # Invalidated: only the owning thread closes its connection, since it may be mid-query
+            if cached is not None:
+                cached[1].close()
+            conn = self._connect(read_only=True)
+            self._readers[threading.current_thread()] = conn
+            self._local.reader = (self._generation, conn)
+        return conn
+
+    @contextlib.contextmanager
+    def reader(self):
+        """
+        Yields this thread's read-only connection.
+        """
+        if fault_injector.db:
+            fault_injector.apply(fault_injector.db, "read", InjectedDatabaseError)
+        yield self._reader_connection()
+
+    @contextlib.contextmanager
+    def writer(self):
+        """
+        Yields the shared write connection inside a transaction.
+        Commits on success and rolls back on error.
+        """
+        with self._write_lock:
+            if self._writer is None:
+                with self._lock:
+                    self._writer = self._connect(read_only=False)
+            conn = self._writer
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    @property
+    def generation(self):
+        """
+        Incremented by every `invalidate`.
+        """
+        return self._generation
+
+    def invalidate(self, action=None, reason: str = None):
+        """
+        Closes the write connection and marks every reader stale, so each
+        thread reconnects on its next access. `action` (e.g. moving the
+        database file) runs while no connection can be opened.
+        """
+        with self._write_lock, self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._generation += 1
+            self._invalidations += 1
+            if action is not None:
+                action()
+        logger.info("db_pool_invalidated", reason=reason, generation=self._generation)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "generation": self._generation,
+                "open_readers": len(self._readers),
+                "writer_open": self._writer is not None,
+                "connections_opened": self._opened,
+                "invalidations": self._invalidations,
+            }
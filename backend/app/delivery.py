@@ -0,0 +1,275 @@
+import collections
+import json
+import os
+import threading
+import time
+from .logger import logger
+from .faults import fault_injector
+from .recorder import incident_recorder
+
+DEFAULT_AGENT_URL = "https://ira-agent-dfij4ukyrq-uc.a.run.app/analyze-incident"
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_SPILL = "spill"
+
+
+def get_agent_url():
+    # Priority: Environment Variable -> Default Agent URL
+    return os.getenv("AGENT_URL") or DEFAULT_AGENT_URL
+
+
+class AgentDeliveryQueue:
+    """
+    Background delivery of agent payloads.
+
+    Request handlers only pay for an enqueue. A single worker thread drains
+    the bounded queue in batches and POSTs them over a pooled keep-alive
+    session. When the queue is full the overflow policy decides what happens:
+    "drop_oldest" discards the oldest queued payload, "spill" moves the new
+    payload to a bounded in-memory overflow buffer that a spill thread
+    appends to a JSONL file, replayed once the queue has drained. The spill
+    thread is separate from the worker because the worker is busy POSTing
+    exactly when the queue is full. File I/O never happens on the caller.
+    """
+
+    def __init__(self, maxsize=1000, batch_size=10, flush_interval=0.25,
+                 overflow=OVERFLOW_DROP_OLDEST, spill_path="agent_spill.jsonl", timeout=5, recorder=None,
+                 spill_buffer=1000):
+        if overflow not in (OVERFLOW_DROP_OLDEST, OVERFLOW_SPILL):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.maxsize = maxsize
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self.timeout = timeout
+        self.recorder = recorder
+
+        self._items = collections.deque()
+        self._overflow = collections.deque()
+        self.spill_buffer = max(1, spill_buffer)
+        self._spill_ready = threading.Event()
+        self._spill_lock = threading.Lock()  # serialises appends with the reload's rename
+        self._spill_thread = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._session = None
+
+        self._enqueued = 0
+        self._dropped = 0
+        self._spilled = 0
+        self._delivered = 0
+        self._failed = 0
+        self._batches = 0
+        self._batch_sizes = collections.Counter()
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latency_last = 0.0
+
+    def enqueue(self, payload):
+        """
+        Queues a payload for delivery. Never blocks on the network.
+        """
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.overflow == OVERFLOW_SPILL:
+                    # Written to disk by the worker; a full buffer drops its oldest payload
+                    if len(self._overflow) >= self.spill_buffer:
+                        self._overflow.popleft()
+                        self._dropped += 1
+                    self._overflow.append(payload)
+                    self._spill_ready.set()
+                    payload = None
+                else:
+                    self._items.popleft()
+                    self._dropped += 1
+            if payload is not None:
+                self._items.append(payload)
+                self._enqueued += 1
+                self._cond.notify()
+        self._ensure_worker()
+
+    def _spill(self, payloads):
+        """
+        Appends payloads to the spill file. Only called on background threads.
+        """
+        try:
+            with self._spill_lock, open(self.spill_path, "a") as f:
+                f.write("".join(json.dumps(payload) + "\n" for payload in payloads))
+            with self._cond:
+                self._spilled += len(payloads)
+        except OSError as e:
+            with self._cond:
+                self._dropped += len(payloads)
+            logger.warning("agent_spill_failed", error=str(e), path=self.spill_path)
+
+    def _write_overflow(self):
+        with self._cond:
+            if not self._overflow:
+                return
+            payloads, self._overflow = list(self._overflow), collections.deque()
+        self._spill(payloads)
+
+    def _run_spill(self):
+        while True:
+            self._spill_ready.wait()
+            self._spill_ready.clear()
+            self._write_overflow()
+            if self._stopping:
+                return
+
+    def _load_spill(self):
+        """
+        Moves spilled payloads back into the queue once it has drained.
+        Payloads that no longer fit go straight back to the spill file.
+        """
+        if self.overflow != OVERFLOW_SPILL or not os.path.exists(self.spill_path):
+            return
+        draining_path = self.spill_path + ".draining"
+        leftover = []
+        try:
+            with self._spill_lock:
+                os.replace(self.spill_path, draining_path)
+            with open(draining_path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    payload = json.loads(line)
+                    with self._cond:
+                        if len(self._items) < self.maxsize:
+                            self._items.append(payload)
+                            self._enqueued += 1
+                            continue
+                    leftover.append(payload)
+            if leftover:
+                self._spill(leftover)
+            os.remove(draining_path)
+        except (OSError, ValueError) as e:
+            logger.warning("agent_spill_reload_failed", error=str(e), path=self.spill_path)
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="agent-delivery", daemon=True)
+            self._thread.start()
+            if self.overflow == OVERFLOW_SPILL and (self._spill_thread is None or not self._spill_thread.is_alive()):
+                self._spill_thread = threading.Thread(target=self._run_spill, name="agent-spill", daemon=True)
+                self._spill_thread.start()
+
+    def _get_session(self):
+        if self._session is None:
+            # Imported on first delivery: requests is slow to import and not needed to serve
+            import requests
+
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def _next_batch(self):
+        with self._cond:
+            if not self._items and not self._stopping:
+                self._cond.wait(self.flush_interval)
+            # Give concurrent producers a moment to fill the batch
+            if 0 < len(self._items) < self.batch_size and not self._stopping:
+                self._cond.wait(self.flush_interval)
+            batch = []
+            while self._items and len(batch) < self.batch_size:
+                batch.append(self._items.popleft())
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._send(batch)
+                continue
+            if self._stopping:
+                return
+            self._load_spill()
+
+    def _send(self, batch):
+        if self.recorder is not None:
+            self.recorder.record(batch)
+        target_url = get_agent_url()
+        # A single incident keeps the original payload shape; batches are sent as a list
+        body = batch[0] if len(batch) == 1 else batch
+        start = time.perf_counter()
+        try:
+            if fault_injector.agent:
+                fault_injector.apply(fault_injector.agent)
+            response = self._get_session().post(target_url, json=body, timeout=self.timeout)
+            ok = True
+            logger.info("agent_webhook_payload_sent", status_code=response.status_code,
+                        url=target_url, batch_size=len(batch))
+        except Exception as e:
+            # We catch the error because the webhook might not exist, but we attempted the POST
+            ok = False
+            logger.warning("agent_webhook_failed", error=str(e), url=target_url, batch_size=len(batch))
+        latency = time.perf_counter() - start
+
+        with self._cond:
+            self._batches += 1
+            self._batch_sizes[len(batch)] += 1
+            if ok:
+                self._delivered += len(batch)
+            else:
+                self._failed += len(batch)
+            self._latency_total += latency
+            self._latency_last = latency
+            self._latency_max = max(self._latency_max, latency)
+
+    def stop(self, timeout=5.0):
+        """
+        Flushes queued payloads and stops the worker.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._spill_ready.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._spill_thread is not None:
+            self._spill_thread.join(timeout)
+        self._write_overflow()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self._items),
+                "queue_capacity": self.maxsize,
+                "overflow_policy": self.overflow,
+                "enqueued": self._enqueued,
+                "delivered": self._delivered,
+                "failed": self._failed,
+                "dropped": self._dropped,
+                "spilled": self._spilled,
+                "spill_buffered": len(self._overflow),
+                "batches": self._batches,
+                "batch_sizes": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                "latency_last_ms": round(self._latency_last * 1000, 3),
+                "latency_avg_ms": round(self._latency_total / self._batches * 1000, 3) if self._batches else 0.0,
+                "latency_max_ms": round(self._latency_max * 1000, 3),
+                "recorder": self.recorder.stats() if self.recorder is not None else None,
+            }
+
+
+delivery_queue = AgentDeliveryQueue(
+    maxsize=int(os.getenv("AGENT_QUEUE_SIZE", "1000")),
+    batch_size=int(os.getenv("AGENT_BATCH_SIZE", "10")),
+    flush_interval=float(os.getenv("AGENT_FLUSH_INTERVAL", "0.25")),
+    overflow=os.getenv("AGENT_OVERFLOW_POLICY", OVERFLOW_DROP_OLDEST),
+    spill_path=os.getenv("AGENT_SPILL_PATH", "agent_spill.jsonl"),
+    spill_buffer=int(os.getenv("AGENT_SPILL_BUFFER", "1000")),
+    recorder=incident_recorder,
+)
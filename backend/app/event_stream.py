@@ -0,0 +1,202 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import os
+import threading
+
+router = APIRouter()
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "critical": 50}
+
+# notify_agent severities mapped onto log levels for filtering
+SEVERITY_LEVELS = {"low": "info", "medium": "warning", "high": "error", "critical": "critical"}
+
+KEEPALIVE_SECONDS = 15
+
+
+class Subscriber:
+    __slots__ = ("queue", "min_level", "types", "on_full", "dropped", "closed")
+
+    def __init__(self, maxsize: int, min_level: int, types, on_full: str):
+        self.queue = asyncio.Queue(maxsize)
+        self.min_level = min_level
+        self.types = types
+        self.on_full = on_full
+        self.dropped = 0
+        self.closed = False
+
+    def wants(self, level: int, event_type: str):
+        return level >= self.min_level and (self.types is None or event_type in self.types)
+
+
+class EventBroadcaster:
+    """
+    Fans log and incident events out to connected dashboards.
+
+    `publish` may be called from any thread. It returns immediately when
+    nobody is connected; otherwise it hands the event to the event loop with
+    a single `call_soon_threadsafe`, and filtering and fan-out to the
+    per-subscriber queues happen there, so the cost on the logging thread
+    does not grow with the number of dashboards. A subscriber whose queue is
+    full either loses its oldest event ("drop") or is disconnected.
+    """
+
+    def __init__(self, queue_size: int = 256, max_subscribers: int = 100):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._loop = None
+        self._loop_thread = None
+        self._lock = threading.Lock()
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._disconnected = 0
+
+    def publish(self, event: dict):
+        if not self._subscribers:
+            return
+        self._published += 1
+        if threading.get_ident() == self._loop_thread:
+            self._loop.call_soon(self._fan_out, event)
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._fan_out, event)
+            except RuntimeError:  # loop closed
+                pass
+
+    def _fan_out(self, event: dict):
+        level = LEVELS.get(event.get("level"), 0)
+        event_type = event.get("type") or "log"
+        for subscriber in list(self._subscribers):
+            if subscriber.closed or not subscriber.wants(level, event_type):
+                continue
+            if subscriber.queue.full():
+                if subscriber.on_full == "disconnect":
+                    self._disconnect(subscriber)
+                    continue
+                subscriber.queue.get_nowait()
+                subscriber.dropped += 1
+                self._dropped += 1
+            subscriber.queue.put_nowait(event)
+            self._delivered += 1
+
+    def _disconnect(self, subscriber: Subscriber):
+        subscriber.closed = True
+        self._disconnected += 1
+        # Wake the stream with an end marker in place of what it has not read
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def subscribe(self, min_level: int = 20, types=None, on_full: str = "drop") -> Subscriber:
+        """
+        Registers a subscriber. Must be called on the event loop thread.
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            if not self._subscribers:
+                self._loop = asyncio.get_running_loop()
+                self._loop_thread = threading.get_ident()
+            subscriber = Subscriber(self.queue_size, min_level, types, on_full)
+            self._subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self._published,
+            "delivered": self._delivered,
+            "dropped": self._dropped,
+            "disconnected_slow_consumers": self._disconnected,
+        }
+
+
+event_broadcaster = EventBroadcaster(
+    queue_size=int(os.getenv("EVENT_STREAM_QUEUE_SIZE", "256")),
+    max_subscribers=int(os.getenv("EVENT_STREAM_MAX_CLIENTS", "100")),
+)
+
+
+def publish_event(logger, method_name, event_dict):
+    """
+    structlog processor that copies each event to connected dashboards.
+    Incident events carry `severity` instead of `level`.
+    """
+    if event_broadcaster._subscribers:
+        event = dict(event_dict)
+        event.setdefault("level", event.get("severity"))
+        event_broadcaster.publish(event)
+    return event_dict
+
+
+def publish_notification(payload: dict):
+    """
+    Streams an agent notification, mapping its severity onto a log level.
+    """
+    if event_broadcaster._subscribers:
+        event = dict(payload)
+        event["level"] = SEVERITY_LEVELS.get(str(event.get("severity", "")).lower(), "error")
+        event["type"] = "agent_notification"
+        event["incident_type"] = payload.get("type")
+        event_broadcaster.publish(event)
+
+
+def _sse(data: str):
+    return f"data: {data}\n\n"
+
+
+@router.get("/events/stream")
+async def stream_events(
+    level: str = Query("info"),
+    types: Optional[str] = Query(None, alias="type"),
+    on_full: str = Query("drop"),
+):
+    """
+    Server-Sent Events stream of log and incident events.
+    `level` is the minimum level, `type` a comma-separated list of event types
+    (`log`, `incident`, `alert`, `agent_notification`). `on_full` decides what
+    happens when this client falls behind: `drop` its oldest events or `disconnect`.
+    """
+    from .logger import fast_dumps
+
+    if level.lower() not in LEVELS:
+        raise HTTPException(status_code=422, detail=f"level must be one of {', '.join(LEVELS)}")
+    if on_full not in ("drop", "disconnect"):
+        raise HTTPException(status_code=422, detail="on_full must be drop or disconnect")
+    type_filter = frozenset(t.strip() for t in types.split(",") if t.strip()) if types else None
+    subscriber = event_broadcaster.subscribe(LEVELS[level.lower()], type_filter, on_full)
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many event stream clients")
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    yield "event: overflow\n" + _sse('{"reason": "client too slow"}')
+                    return
+                if subscriber.dropped:
+                    # Events are shared between subscribers, so report drops separately
+                    yield "event: dropped\n" + _sse(f'{{"count": {subscriber.dropped}}}')
+                    subscriber.dropped = 0
+                yield _sse(fast_dumps(event, default=str))
+        finally:
+            event_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
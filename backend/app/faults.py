@@ -0,0 +1,380 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from .logger import logger
+from .context import CONTROL_PREFIXES, request_path_var
+from .shared_state import shared_state
+import asyncio
+import math
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+router = APIRouter()
+
+TARGETS = ("http", "db", "agent")
+KINDS = ("error", "latency")
+DB_OPERATIONS = ("read", "write")
+MAX_TTL_SECONDS = 3600
+
+
+class InjectedFault(Exception):
+    pass
+
+
+class InjectedDatabaseError(sqlite3.OperationalError):
+    pass
+
+
+# --- latency distributions (milliseconds) ---
+
+def _fixed(spec):
+    return spec.mean_ms
+
+
+def _uniform(spec):
+    return random.uniform(spec.min_ms, spec.max_ms)
+
+
+def _normal(spec):
+    return random.gauss(spec.mean_ms, spec.stddev_ms)
+
+
+def _exponential(spec):
+    return random.expovariate(1 / spec.mean_ms) if spec.mean_ms > 0 else 0.0
+
+
+def _lognormal(spec):
+    # Parameterised by the mean and stddev of the delay itself, not of its log
+    if spec.mean_ms <= 0:
+        return 0.0
+    sigma2 = math.log(1 + (spec.stddev_ms / spec.mean_ms) ** 2)
+    return random.lognormvariate(math.log(spec.mean_ms) - sigma2 / 2, math.sqrt(sigma2))
+
+
+DISTRIBUTIONS = {
+    "fixed": _fixed,
+    "uniform": _uniform,
+    "normal": _normal,
+    "exponential": _exponential,
+    "lognormal": _lognormal,
+}
+
+
+class LatencySpec(BaseModel):
+    distribution: str = "fixed"
+    mean_ms: float = 100
+    stddev_ms: float = 0  # normal, lognormal
+    min_ms: float = 0  # lower bound for every distribution; uniform draws from [min_ms, max_ms]
+    max_ms: float = 30000
+
+
+class FaultSpec(BaseModel):
+    target: str = "http"  # "http" (FaultMiddleware), "db" (connection pool) or "agent" (agent delivery)
+    route: Optional[str] = None  # request path prefix; every route if omitted. Not used for agent faults.
+    operation: Optional[str] = None  # db only: "read" or "write"; both if omitted
+    kind: str = "error"
+    probability: float = 1.0
+    status: int = 500  # http errors
+    message: Optional[str] = None
+    latency: Optional[LatencySpec] = None  # latency faults
+    ttl: float = 60  # seconds until the fault removes itself
+
+
+def validate_fault(spec: FaultSpec):
+    if spec.target not in TARGETS:
+        return f"target must be one of {', '.join(TARGETS)}"
+    if spec.kind not in KINDS:
+        return f"kind must be one of {', '.join(KINDS)}"
+    if not 0 <= spec.probability <= 1:
+        return "probability must be between 0 and 1"
+    if not 0 < spec.ttl <= MAX_TTL_SECONDS:
+        return f"ttl must be between 0 and {MAX_TTL_SECONDS} seconds"
+    if spec.route is not None and (spec.target == "agent" or not spec.route.startswith("/")):
+        return "route must be a path prefix such as /todos, and is not supported for agent faults"
+    if spec.operation is not None and (spec.target != "db" or spec.operation not in DB_OPERATIONS):
+        return f"operation is only supported for db faults and must be one of {', '.join(DB_OPERATIONS)}"
+    if spec.target == "http" and not 400 <= spec.status <= 599:
+        return "status must be a 4xx or 5xx code"
+    if spec.kind == "latency":
+        latency = spec.latency
+        if latency is None:
+            return "latency faults need a latency spec"
+        if latency.distribution not in DISTRIBUTIONS:
+            return f"distribution must be one of {', '.join(DISTRIBUTIONS)}"
+        if min(latency.mean_ms, latency.stddev_ms, latency.min_ms) < 0 or latency.max_ms < latency.min_ms:
+            return "latency values must be >= 0 and max_ms >= min_ms"
+    return None
+
+
+class Fault:
+    def __init__(self, spec: FaultSpec, fault_id: str = None, expires_at: float = None):
+        self.id = fault_id or uuid.uuid4().hex[:12]
+        self.spec = spec
+        self.created_at = time.time()
+        self.expires_at = expires_at if expires_at is not None else self.created_at + spec.ttl
+        self.matched = 0
+        self.fired = 0
+
+    def matches(self, path, operation):
+        spec = self.spec
+        if spec.route is not None and (path is None or not path.startswith(spec.route)):
+            return False
+        return spec.operation is None or spec.operation == operation
+
+    def delay(self) -> float:
+        latency = self.spec.latency
+        ms = DISTRIBUTIONS[latency.distribution](latency)
+        return min(max(ms, latency.min_ms), latency.max_ms) / 1000
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            **self.spec.model_dump(),
+            "expires_in_seconds": round(max(0.0, self.expires_at - time.time()), 1),
+            "matched": self.matched,
+            "fired": self.fired,
+        }
+
+
+class FaultInjector:
+    """
+    Runtime fault injection for the HTTP middleware, the database pool and
+    agent delivery.
+
+    Each target's active faults live in a tuple attribute (`http`, `db`,
+    `agent`) that is rebuilt whenever the set changes. Hooks test that tuple
+    before doing anything else, so with no faults installed a hook costs one
+    attribute lookup. Faults expire after their TTL; expired ones are dropped
+    the next time they are matched or listed.
+    """
+
+    def __init__(self):
+        self.http = ()
+        self.db = ()
+        self.agent = ()
+        self._faults = {}
+        self._lock = threading.Lock()
+        self._installed = 0
+        self._expired = 0
+
+    def _rebuild(self):
+        # Called with the lock held; the tuples are swapped in whole, so hooks never need the lock
+        for target in TARGETS:
+            setattr(self, target, tuple(f for f in self._faults.values() if f.spec.target == target))
+
+    def add(self, spec: FaultSpec, fault_id: str = None, expires_at: float = None) -> Fault:
+        fault = Fault(spec, fault_id, expires_at)
+        with self._lock:
+            self._faults[fault.id] = fault
+            self._installed += 1
+            self._rebuild()
+        logger.warning("fault_installed", fault_id=fault.id, target=spec.target, kind=spec.kind,
+                       route=spec.route, probability=spec.probability, ttl=spec.ttl)
+        return fault
+
+    def remove(self, fault_id: str) -> bool:
+        with self._lock:
+            fault = self._faults.pop(fault_id, None)
+            self._rebuild()
+        if fault is not None:
+            logger.info("fault_removed", fault_id=fault_id)
+        return fault is not None
+
+    def clear(self):
+        with self._lock:
+            removed = len(self._faults)
+            self._faults.clear()
+            self._rebuild()
+        return removed
+
+    def load(self, rows):
+        """
+        Replaces the installed faults with `rows` of (id, expires_at, spec dict)
+        from the shared state store. Counters of faults that stay are kept.
+        """
+        with self._lock:
+            faults = {}
+            for fault_id, expires_at, spec in rows:
+                fault = self._faults.get(fault_id)
+                faults[fault_id] = fault if fault is not None else Fault(FaultSpec(**spec), fault_id, expires_at)
+            self._faults = faults
+            self._rebuild()
+
+    def _expire(self, now: float):
+        with self._lock:
+            expired = [fault_id for fault_id, f in self._faults.items() if f.expires_at <= now]
+            for fault_id in expired:
+                del self._faults[fault_id]
+            self._expired += len(expired)
+            self._rebuild()
+        for fault_id in expired:
+            logger.info("fault_expired", fault_id=fault_id)
+
+    def evaluate(self, faults, path=None, operation=None):
+        """
+        Rolls every matching fault. Returns (delay_seconds, error_fault):
+        the summed delay of the latency faults that fired and the first
+        error fault that fired, or None.
+        """
+        now = time.time()
+        delay = 0.0
+        error = None
+        expired = False
+        for fault in faults:
+            if fault.expires_at <= now:
+                expired = True
+                continue
+            if not fault.matches(path, operation):
+                continue
+            fault.matched += 1
+            if random.random() >= fault.spec.probability:
+                continue
+            fault.fired += 1
+            if fault.spec.kind == "latency":
+                delay += fault.delay()
+            elif error is None:
+                error = fault
+        if expired:
+            self._expire(now)
+        return delay, error
+
+    def apply(self, faults, operation=None, error_type=InjectedFault):
+        """
+        Blocking hook for threadpool and background-thread callers: sleeps for
+        injected latency, then raises `error_type` for an injected error.
+        """
+        delay, error = self.evaluate(faults, request_path_var.get(), operation)
+        if delay:
+            time.sleep(delay)
+        if error is not None:
+            raise error_type(error.spec.message or f"Injected fault {error.id}")
+
+    async def http_handler(self, path: str, app):
+        """
+        Middleware hook: waits out injected latency and returns the ASGI app
+        that should handle the request, either `app` or an error response.
+        """
+        # Monitoring and controls stay up, so the outage can be seen and lifted
+        if path.startswith(CONTROL_PREFIXES):
+            return app
+        delay, error = self.evaluate(self.http, path)
+        if delay:
+            await asyncio.sleep(delay)
+        if error is None:
+            return app
+        return JSONResponse(
+            {"detail": error.spec.message or "Injected fault", "fault_id": error.id},
+            status_code=error.spec.status,
+        )
+
+    def list(self):
+        self._expire(time.time())
+        with self._lock:
+            return list(self._faults.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": {target: len(getattr(self, target)) for target in TARGETS},
+                "installed": self._installed,
+                "expired": self._expired,
+            }
+
+
+fault_injector = FaultInjector()
+
+
+class FaultMiddleware:
+    """
+    Pure ASGI hook for HTTP faults. Registered inside CORS, like admission, so
+    the dashboard sees the injected status rather than a CORS error.
+    """
+
+    def __init__(self, app, injector: FaultInjector = fault_injector):
+        self.app = app
+        self.injector = injector
+
+    async def __call__(self, scope, receive, send):
+        app = self.app
+        if scope["type"] == "http" and self.injector.http:
+            app = await self.injector.http_handler(scope["path"], app)
+        await app(scope, receive, send)
+
+
+# --- sharing faults between worker processes ---
+
+def share_fault(fault: Fault):
+    try:
+        shared_state.put_fault(fault.id, fault.expires_at, fault.spec.model_dump())
+        shared_state.bump("faults")
+    except sqlite3.Error as e:
+        logger.warning("fault_share_failed", fault_id=fault.id, error=str(e))
+
+
+def unshare_faults(fault_id: str = None):
+    try:
+        shared_state.delete_faults(fault_id)
+        shared_state.bump("faults")
+    except sqlite3.Error as e:
+        logger.warning("fault_share_failed", fault_id=fault_id, error=str(e))
+
+
+def sync_faults():
+    """
+    Loads the faults installed by any worker. Runs at startup and whenever
+    another worker changes them.
+    """
+    fault_injector.load(shared_state.active_faults())
+
+
+def install_fault(spec: FaultSpec) -> Fault:
+    fault = fault_injector.add(spec)
+    share_fault(fault)
+    return fault
+
+
+def remove_fault(fault_id: str) -> bool:
+    removed = fault_injector.remove(fault_id)
+    unshare_faults(fault_id)
+    return removed
+
+
+@router.post("/faults")
+async def create_fault(spec: FaultSpec):
+    """
+    Installs a fault in every worker until its TTL runs out. Examples:
+    {"target": "http", "route": "/todos", "probability": 0.2, "status": 503, "ttl": 120}
+    {"target": "db", "operation": "write", "kind": "latency",
+     "latency": {"distribution": "lognormal", "mean_ms": 200, "stddev_ms": 150}}
+    {"target": "agent", "probability": 0.5}
+    """
+    error = validate_fault(spec)
+    if error:
+        raise HTTPException(status_code=422, detail=error)
+    fault = await run_in_threadpool(install_fault, spec)
+    return fault.to_dict()
+
+
+@router.get("/faults")
+async def list_faults():
+    return {"faults": [fault.to_dict() for fault in fault_injector.list()], **fault_injector.stats()}
+
+
+@router.delete("/faults/{fault_id}")
+async def delete_fault(fault_id: str):
+    if not await run_in_threadpool(remove_fault, fault_id):
+        raise HTTPException(status_code=404, detail="Fault not found")
+    return {"message": "Fault removed", "fault_id": fault_id}
+
+
+@router.delete("/faults")
+async def delete_all_faults():
+    removed = fault_injector.clear()
+    await run_in_threadpool(unshare_faults)
+    logger.info("faults_cleared", removed=removed)
+    return {"message": "All faults removed", "removed": removed}
@@ -0,0 +1,156 @@
+import collections
+import datetime
+import hashlib
+import threading
+import time
+import traceback
+
+
+def fingerprint_exception(exc: BaseException, incident_type: str, depth: int = 5) -> str:
+    """
+    Fingerprints an exception by its type and innermost stack frames.
+    Walks the traceback without formatting it.
+    """
+    frames = collections.deque(maxlen=depth)
+    for frame, lineno in traceback.walk_tb(exc.__traceback__):
+        code = frame.f_code
+        frames.append(f"{code.co_filename}:{code.co_name}:{lineno}")
+    key = "|".join([incident_type, type(exc).__qualname__, *frames])
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def fingerprint_message(error_message: str, incident_type: str, depth: int = 5) -> str:
+    """
+    Fingerprints a preformatted error message (e.g. a traceback string).
+    Uses the final line plus the innermost "File ..." lines.
+    """
+    lines = error_message.strip().splitlines()
+    frames = [line.strip() for line in lines if line.lstrip().startswith("File ")][-depth:]
+    last_line = lines[-1].split(":", 1)[0] if lines else ""
+    key = "|".join([incident_type, last_line, *frames])
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class _Storm:
+    __slots__ = ("payload", "pending", "last_summary", "last_seen")
+
+    def __init__(self, payload, now):
+        self.payload = payload
+        self.pending = 0  # repeats since the last summary
+        self.last_summary = now
+        self.last_seen = now
+
+
+class StormCoalescer:
+    """
+    Windowed aggregation of repeated incidents.
+
+    The first occurrence of a fingerprint is sent right away. Repeats are only
+    counted; every `window` seconds a summary payload is emitted for each
+    fingerprint that was seen again. Fingerprints that stay quiet for a whole
+    window are forgotten, so their next occurrence is treated as new.
+    """
+
+    def __init__(self, emit, window: float = 60.0):
+        self.emit = emit
+        self.window = window
+        self._storms = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._first_sent = 0
+        self._suppressed = 0
+        self._summaries_sent = 0
+
+    def observe(self, key: str, build_payload) -> bool:
+        """
+        Records one occurrence of `key`.
+        `build_payload` is only called for first occurrences, so repeats skip
+        traceback formatting entirely. Returns True if the payload was emitted.
+        """
+        now = time.monotonic()
+        with self._lock:
+            storm = self._storms.get(key)
+            if storm is not None:
+                # Includes callers racing a first occurrence whose payload is still being built
+                storm.pending += 1
+                storm.last_seen = now
+                self._suppressed += 1
+                return False
+            # Claim the fingerprint before building the payload outside the lock
+            storm = _Storm(None, now)
+            self._storms[key] = storm
+
+        try:
+            payload = build_payload()
+        except BaseException:
+            with self._lock:
+                if self._storms.get(key) is storm:
+                    del self._storms[key]
+            raise
+        with self._lock:
+            storm.payload = payload
+            self._first_sent += 1
+        self._ensure_flusher()
+        self.emit(payload)
+        return True
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="incident-coalescer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(min(1.0, self.window))
+            for payload in self.flush():
+                self.emit(payload)
+
+    def flush(self, now: float = None):
+        """
+        Returns summary payloads that are due and forgets idle fingerprints.
+        """
+        now = time.monotonic() if now is None else now
+        summaries = []
+        with self._lock:
+            for key, storm in list(self._storms.items()):
+                if storm.payload is None:
+                    continue  # first occurrence not sent yet
+                if now - storm.last_summary >= self.window:
+                    if storm.pending:
+                        summaries.append(self._summary(key, storm, now))
+                        storm.pending = 0
+                    storm.last_summary = now
+
+                if not storm.pending and now - storm.last_seen >= self.window:
+                    del self._storms[key]
+            self._summaries_sent += len(summaries)
+        return summaries
+
+    def _summary(self, key, storm, now):
+        # Summaries go out once per window, so the repeats since the last one are the window's count
+        seen = storm.pending
+        window = int(self.window) if float(self.window).is_integer() else self.window
+        first_line = storm.payload.get("error", "").strip().splitlines()
+        headline = first_line[-1] if first_line else storm.payload.get("type", "incident")
+        summary = dict(storm.payload)
+        summary.update({
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "error": f"{headline} (seen {seen:,} times in the last {window}s)",
+            "occurrences": seen,
+            "summary": True,
+        })
+        return summary
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active_fingerprints": len(self._storms),
+                "window_seconds": self.window,
+                "first_occurrences_sent": self._first_sent,
+                "repeats_suppressed": self._suppressed,
+                "summaries_sent": self._summaries_sent,
+            }
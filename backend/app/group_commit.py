@@ -0,0 +1,137 @@
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from .faults import fault_injector, InjectedDatabaseError
+
+
+class GroupCommitter:
+    """
+    Coalesces concurrent single-row writes into shared transactions.
+
+    Callers block on `submit` while a writer thread gathers every write that
+    arrives within `window` seconds of the first one (up to `max_batch`) and
+    runs them in one transaction with a single commit. Each caller still gets
+    its own `lastrowid`, or its own exception if its statement failed.
+    """
+
+    def __init__(self, pool, window: float = 0.002, max_batch: int = 256):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._commits = 0
+        self._rows = 0
+        self._batch_sizes = collections.Counter()
+        self._bulk_commits = 0
+        self._bulk_rows = 0
+        self._bulk_sizes = collections.Counter()
+
+    def submit(self, sql: str, params) -> int:
+        """
+        Queues one statement and waits for its transaction to commit.
+        Returns the statement's lastrowid.
+        """
+        # Writes are faulted here, on the request's thread, where its route is known
+        if fault_injector.db:
+            fault_injector.apply(fault_injector.db, "write", InjectedDatabaseError)
+        future = Future()
+        self._queue.put((sql, params, future))
+        self._ensure_worker()
+        return future.result()
+
+    def insert_many(self, sql: str, rows) -> list:
+        """
+        Inserts all rows with executemany in a single commit.
+        Returns the new row ids in insertion order.
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+        if fault_injector.db:
+            fault_injector.apply(fault_injector.db, "write", InjectedDatabaseError)
+        with self.pool.writer() as conn:
+            conn.executemany(sql, rows)
+            # The write lock keeps the transaction exclusive, so AUTOINCREMENT ids are contiguous
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        with self._lock:
+            self._bulk_commits += 1
+            self._bulk_rows += len(rows)
+            self._bulk_sizes[self._bucket(len(rows))] += 1
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            results = []
+            try:
+                with self.pool.writer() as conn:
+                    for sql, params, _ in batch:
+                        # A failing statement is rolled back on its own; the rest still commit
+                        try:
+                            results.append(conn.execute(sql, params).lastrowid)
+                        except Exception as e:
+                            results.append(e)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self._commits += 1
+                self._rows += len(batch)
+                self._batch_sizes[self._bucket(len(batch))] += 1
+            for (_, _, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    @staticmethod
+    def _sorted(histogram):
+        return dict(sorted(histogram.items(), key=lambda item: int(item[0][3:])))
+
+    @staticmethod
+    def _bucket(size: int) -> str:
+        # Power-of-two buckets keep the histogram small: 1, 2, 4, 8, ...
+        bound = 1
+        while bound < size:
+            bound *= 2
+        return f"le_{bound}"
+
+    def stats(self):
+        with self._lock:
+            return {
+                "window_ms": self.window * 1000,
+                "pending": self._queue.qsize(),
+                "group_commits": self._commits,
+                "group_rows": self._rows,
+                "avg_group_size": round(self._rows / self._commits, 2) if self._commits else 0.0,
+                "group_size_histogram": self._sorted(self._batch_sizes),
+                "bulk_commits": self._bulk_commits,
+                "bulk_rows": self._bulk_rows,
+                "bulk_size_histogram": self._sorted(self._bulk_sizes),
+            }
@@ -0,0 +1,49 @@
+import collections
+import math
+
+
+class LatencyHistogram:
+    """
+    Mergeable log-linear latency histogram (about 1% relative error).
+    Memory is bounded by the latency range, not the number of samples.
+    """
+
+    GROWTH = math.log(1.01)
+
+    def __init__(self):
+        self.buckets = collections.Counter()
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        micros = max(seconds * 1e6, 1.0)
+        self.buckets[int(math.log(micros) / self.GROWTH)] += 1
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return math.exp((index + 0.5) * self.GROWTH) / 1e6
+        return self.max
+
+    def summary_ms(self):
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p90_ms": round(self.percentile(0.90) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "p999_ms": round(self.percentile(0.999) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
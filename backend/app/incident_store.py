@@ -0,0 +1,283 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+import bisect
+import collections
+import datetime
+import os
+import threading
+import time
+
+router = APIRouter()
+
+BUCKET_SECONDS = 60
+
+
+class _SeqIndex:
+    """
+    Ascending list of sequence numbers. Eviction only ever removes the
+    oldest entry, so it advances a start offset instead of shifting the list.
+    """
+
+    __slots__ = ("seqs", "start")
+
+    def __init__(self):
+        self.seqs = []
+        self.start = 0
+
+    def __len__(self):
+        return len(self.seqs) - self.start
+
+    def append(self, seq: int):
+        self.seqs.append(seq)
+
+    def evict(self):
+        self.start += 1
+        if self.start > 1024 and self.start * 2 > len(self.seqs):
+            del self.seqs[:self.start]
+            self.start = 0
+
+    def first(self):
+        return self.seqs[self.start]
+
+    def bounds(self, lo: int, hi: int):
+        """
+        Positions of the entries with lo <= seq < hi.
+        """
+        return (bisect.bisect_left(self.seqs, lo, self.start),
+                bisect.bisect_left(self.seqs, hi, self.start))
+
+
+class IncidentStore:
+    """
+    Bounded in-memory ring buffer of incidents.
+
+    Incidents get increasing sequence numbers and live in a fixed-size ring;
+    the oldest is evicted when it is full. Secondary indexes by incident
+    type, severity and minute bucket hold ascending sequence numbers, so a
+    query bisects the smallest matching index and walks it newest-first
+    until the page is full, without scanning the whole buffer.
+    """
+
+    def __init__(self, capacity: int = 100000):
+        self.capacity = capacity
+        self._ring = [None] * capacity
+        self._next_seq = 1
+        self._first_seq = 1
+        self._last_ts = 0.0
+        self._by_type = {}
+        self._by_severity = {}
+        self._by_bucket = {}
+        self._buckets = _SeqIndex()  # bucket numbers in ascending order
+        self._pair_counts = collections.Counter()
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    def add(self, incident_type: str, severity: str, source: str, message: str = None,
+            fingerprint: str = None, request_id: str = None, timestamp: float = None):
+        # Keep ingest time non-decreasing so minute buckets stay ordered by sequence
+        severity = (severity or "unknown").lower()
+        incident_type = incident_type or "unknown"
+        with self._lock:
+            ts = max(timestamp if timestamp is not None else time.time(), self._last_ts)
+            self._last_ts = ts
+            if self._next_seq - self._first_seq >= self.capacity:
+                self._evict_oldest()
+            seq = self._next_seq
+            self._next_seq += 1
+            self._ring[seq % self.capacity] = (seq, ts, incident_type, severity, source, message, fingerprint, request_id)
+
+            self._index(self._by_type, incident_type).append(seq)
+            self._index(self._by_severity, severity).append(seq)
+            bucket = int(ts // BUCKET_SECONDS)
+            if bucket not in self._by_bucket:
+                self._buckets.append(bucket)
+            self._index(self._by_bucket, bucket).append(seq)
+            self._pair_counts[(incident_type, severity)] += 1
+        return seq
+
+    @staticmethod
+    def _index(indexes: dict, key):
+        index = indexes.get(key)
+        if index is None:
+            index = indexes[key] = _SeqIndex()
+        return index
+
+    def _evict_oldest(self):
+        _, ts, incident_type, severity, *_ = self._ring[self._first_seq % self.capacity]
+        self._ring[self._first_seq % self.capacity] = None
+        self._first_seq += 1
+        self._evicted += 1
+        bucket = int(ts // BUCKET_SECONDS)
+        for indexes, key in ((self._by_type, incident_type), (self._by_severity, severity), (self._by_bucket, bucket)):
+            index = indexes[key]
+            index.evict()
+            if not len(index):
+                del indexes[key]
+                if indexes is self._by_bucket:
+                    self._buckets.evict()
+        self._pair_counts[(incident_type, severity)] -= 1
+        if not self._pair_counts[(incident_type, severity)]:
+            del self._pair_counts[(incident_type, severity)]
+
+    def _seq_after(self, ts: float):
+        """
+        First retained sequence number whose bucket could hold incidents at or after `ts`.
+        """
+        buckets = self._buckets
+        position = bisect.bisect_left(buckets.seqs, int(ts // BUCKET_SECONDS), buckets.start)
+        if position == len(buckets.seqs):
+            return self._next_seq
+        return self._by_bucket[buckets.seqs[position]].first()
+
+    def query(self, incident_type: str = None, severity: str = None, since: float = None,
+              until: float = None, limit: int = 100, cursor: int = None):
+        """
+        Returns (incidents, next_cursor), newest first. Pass `next_cursor` back
+        as `cursor` to get the following page; it is None on the last page.
+        """
+        severity = severity.lower() if severity else None
+        with self._lock:
+            lo = self._first_seq
+            hi = self._next_seq
+            if cursor is not None:
+                hi = min(hi, cursor)
+            if since is not None:
+                lo = max(lo, self._seq_after(since))
+            if until is not None:
+                hi = min(hi, self._seq_after(until + BUCKET_SECONDS))
+
+            # Walk the smallest index that satisfies a filter; check the rest per record
+            candidates = []
+            if incident_type is not None:
+                candidates.append(self._by_type.get(incident_type))
+            if severity is not None:
+                candidates.append(self._by_severity.get(severity))
+            if any(index is None for index in candidates):
+                return [], None
+            if candidates:
+                index = min(candidates, key=len)
+                start, end = index.bounds(lo, hi)
+                seqs = (index.seqs[i] for i in range(end - 1, start - 1, -1))
+            else:
+                seqs = range(hi - 1, lo - 1, -1)
+
+            results = []
+            for seq in seqs:
+                record = self._ring[seq % self.capacity]
+                _, ts, r_type, r_severity = record[:4]
+                if incident_type is not None and r_type != incident_type:
+                    continue
+                if severity is not None and r_severity != severity:
+                    continue
+                if (since is not None and ts < since) or (until is not None and ts > until):
+                    continue
+                if len(results) == limit:
+                    return results, results[-1]["id"]
+                results.append(self._to_dict(record))
+            return results, None
+
+    @staticmethod
+    def _to_dict(record):
+        seq, ts, incident_type, severity, source, message, fingerprint, request_id = record
+        return {
+            "id": seq,
+            "timestamp": datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isoformat(),
+            "incident_type": incident_type,
+            "severity": severity,
+            "source": source,
+            "message": message,
+            "fingerprint": fingerprint,
+            "request_id": request_id,
+        }
+
+    def counts(self, window_minutes: int = 60):
+        """
+        Aggregate counts over everything retained, plus a per-minute series
+        for the last `window_minutes`.
+        """
+        with self._lock:
+            newest = int(self._last_ts // BUCKET_SECONDS)
+            by_type_severity = collections.defaultdict(dict)
+            for (incident_type, severity), count in self._pair_counts.items():
+                by_type_severity[incident_type][severity] = count
+            per_minute = [
+                {
+                    "minute": datetime.datetime.fromtimestamp(bucket * BUCKET_SECONDS, datetime.timezone.utc).isoformat(),
+                    "count": len(self._by_bucket[bucket]),
+                }
+                for bucket in self._buckets.seqs[self._buckets.start:]
+                if bucket > newest - window_minutes
+            ]
+            return {
+                "total": self._next_seq - self._first_seq,
+                "by_type": {key: len(index) for key, index in self._by_type.items()},
+                "by_severity": {key: len(index) for key, index in self._by_severity.items()},
+                "by_type_severity": dict(by_type_severity),
+                "per_minute": per_minute,
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "retained": self._next_seq - self._first_seq,
+                "capacity": self.capacity,
+                "evicted": self._evicted,
+            }
+
+
+incident_store = IncidentStore(int(os.getenv("INCIDENT_STORE_SIZE", "100000")))
+
+
+def record_incident(logger, method_name, event_dict):
+    """
+    structlog processor that copies incident log events into the store.
+    Runs after `format_incident`.
+    """
+    if event_dict.get("type") == "incident":
+        incident_store.add(
+            incident_type=event_dict.get("incident_type"),
+            severity=event_dict.get("severity"),
+            source="log",
+            message=event_dict.get("error") or event_dict.get("exception"),
+            request_id=event_dict.get("request_id"),
+        )
+    return event_dict
+
+
+def _epoch(value: Optional[datetime.datetime]):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+@router.get("/incidents")
+def list_incidents(
+    incident_type: Optional[str] = Query(None, alias="type"),
+    severity: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = None,
+):
+    """
+    Queries retained incidents, newest first.
+    `since`/`until` accept ISO-8601 timestamps (UTC when no offset is given).
+    """
+    if since is not None and until is not None and since > until:
+        raise HTTPException(status_code=422, detail="since must not be after until")
+    incidents, next_cursor = incident_store.query(
+        incident_type=incident_type,
+        severity=severity,
+        since=_epoch(since),
+        until=_epoch(until),
+        limit=limit,
+        cursor=cursor,
+    )
+    return {"incidents": incidents, "next_cursor": next_cursor}
+
+
+@router.get("/incidents/stats")
+def incident_stats(window_minutes: int = Query(60, ge=1, le=24 * 60)):
+    return {**incident_store.counts(window_minutes), **incident_store.stats()}
@@ -0,0 +1,255 @@
+"""
+Open-loop load generator for the simulation backend.
+
+Arrivals follow a Poisson process at the target rate and are sent whether or
+not earlier requests have completed, so a slow server shows up as growing
+latency instead of a silently lower request rate. Latency is measured from
+each request's scheduled arrival time.
+
+    python -m app.loadgen --url http://localhost:8000 --rps 200 --duration 30 --workers 4
+    python -m app.loadgen --in-process --rps 100 --duration 10
+"""
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import math
+import multiprocessing
+import random
+import time
+
+import httpx
+
+from .histogram import LatencyHistogram
+
+# httpx logs every request at INFO, which would double the server's own log volume
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# (method, path, weight)
+DEFAULT_MIX = (
+    ("GET", "/todos", 40),
+    ("POST", "/todos", 20),
+    ("GET", "/", 10),
+    ("POST", "/simulate/division_by_zero", 5),
+    ("POST", "/simulate/disk_full", 5),
+    ("POST", "/simulate/auth_failure", 5),
+    ("POST", "/simulate/bug/attribute_error", 5),
+    ("POST", "/simulate/bug/name_error", 5),
+    ("POST", "/simulate/unhandled/key_error", 5),
+)
+
+# Roughly 4 successful requests for every failing or incident-raising one
+TRAFFIC_GEN_MIX = (
+    ("GET", "/todos", 50),
+    ("POST", "/todos", 20),
+    ("GET", "/", 10),
+    ("POST", "/simulate/division_by_zero", 5),
+    ("POST", "/simulate/bug/attribute_error", 5),
+    ("POST", "/simulate/unhandled/index_error", 5),
+    ("POST", "/simulate/read_timeout", 5),
+)
+
+
+def positive_number(value: str) -> float:
+    number = float(value)
+    if not (number > 0 and math.isfinite(number)):
+        raise argparse.ArgumentTypeError(f"must be a number greater than 0, got {value}")
+    return number
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def parse_mix(spec: str):
+    """
+    Parses "GET /todos=40,POST /todos=20" into [(method, path, weight), ...].
+    """
+    mix = []
+    for item in spec.split(","):
+        route, _, weight = item.strip().rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        mix.append((method.upper(), path.strip(), float(weight)))
+    return mix
+
+
+def request_body(method: str, path: str):
+    if method == "POST" and path == "/todos":
+        return {"title": f"load-{random.randrange(1_000_000)}"}
+    return None
+
+
+class LoadResult:
+    def __init__(self):
+        self.scheduled = 0
+        self.completed = 0
+        self.skipped = 0
+        self.statuses = collections.Counter()
+        self.transport_errors = collections.Counter()
+        self.latency = LatencyHistogram()
+        self.routes = collections.defaultdict(LatencyHistogram)
+        self.elapsed = 0.0
+
+    def merge(self, other):
+        self.scheduled += other.scheduled
+        self.completed += other.completed
+        self.skipped += other.skipped
+        self.statuses.update(other.statuses)
+        self.transport_errors.update(other.transport_errors)
+        self.latency.merge(other.latency)
+        for route, histogram in other.routes.items():
+            self.routes[route].merge(histogram)
+        self.elapsed = max(self.elapsed, other.elapsed)
+
+    def report(self):
+        return {
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "skipped_over_inflight_limit": self.skipped,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "achieved_rps": round(self.completed / self.elapsed, 2) if self.elapsed else 0.0,
+            "status_codes": {str(code): count for code, count in sorted(self.statuses.items())},
+            "transport_errors": dict(self.transport_errors),
+            "latency": self.latency.summary_ms(),
+            "routes": {route: histogram.summary_ms() for route, histogram in sorted(self.routes.items())},
+        }
+
+
+async def run_load(client: httpx.AsyncClient, rps: float, duration: float, mix=DEFAULT_MIX,
+                   max_inflight: int = 1000, seed: int = None) -> LoadResult:
+    """
+    Drives `client` with Poisson arrivals at `rps` for `duration` seconds.
+    Arrivals beyond `max_inflight` outstanding requests are counted as skipped.
+    """
+    rng = random.Random(seed)
+    routes = [(method, path) for method, path, _ in mix]
+    weights = [weight for _, _, weight in mix]
+    result = LoadResult()
+    inflight = set()
+
+    async def fire(method, path, scheduled_at):
+        label = f"{method} {path}"
+        try:
+            response = await client.request(method, path, json=request_body(method, path))
+            result.statuses[response.status_code] += 1
+        except httpx.HTTPError as e:
+            result.transport_errors[type(e).__name__] += 1
+        latency = time.perf_counter() - scheduled_at
+        result.completed += 1
+        result.latency.record(latency)
+        result.routes[label].record(latency)
+
+    start = time.perf_counter()
+    next_arrival = start
+    end = start + duration
+    while True:
+        next_arrival += rng.expovariate(rps)
+        if next_arrival >= end:
+            break
+        delay = next_arrival - time.perf_counter()
+        # Yield even when behind schedule, so a rate the loop cannot keep up with
+        # (or a full inflight cap) does not starve the other tasks on this loop
+        await asyncio.sleep(max(delay, 0))
+        result.scheduled += 1
+        if len(inflight) >= max_inflight:
+            result.skipped += 1
+            continue
+        method, path = rng.choices(routes, weights)[0]
+        task = asyncio.ensure_future(fire(method, path, next_arrival))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+
+    if inflight:
+        await asyncio.wait(inflight)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def asgi_client(app) -> httpx.AsyncClient:
+    """
+    A client that calls the ASGI app in-process, without sockets.
+    """
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://loadgen")
+
+
+def http_client(url: str, max_connections: int = 200) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0)
+
+
+async def _run_worker(options: dict) -> LoadResult:
+    if options["url"]:
+        client = http_client(options["url"], options["max_inflight"])
+    else:
+        from .database import init_db
+        from .main import app
+        # No server runs the startup hooks in-process
+        init_db()
+        client = asgi_client(app)
+    async with client:
+        return await run_load(client, options["rps"], options["duration"], options["mix"],
+                              options["max_inflight"], options["seed"])
+
+
+def _worker_entry(options: dict) -> LoadResult:
+    return asyncio.run(_run_worker(options))
+
+
+def run(url: str = None, rps: float = 50, duration: float = 10, workers: int = 1,
+        mix=DEFAULT_MIX, max_inflight: int = 1000, seed: int = None) -> LoadResult:
+    """
+    Runs the load across `workers` processes, each taking an equal share of `rps`.
+    `url=None` drives the app in-process through its ASGI interface.
+    """
+    shares = [
+        {"url": url, "rps": rps / workers, "duration": duration, "mix": list(mix),
+         "max_inflight": max(1, max_inflight // workers), "seed": None if seed is None else seed + i}
+        for i in range(workers)
+    ]
+    if workers == 1:
+        return _worker_entry(shares[0])
+    total = LoadResult()
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        for partial in pool.map(_worker_entry, shares):
+            total.merge(partial)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the simulation backend.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server, e.g. http://localhost:8000")
+    target.add_argument("--in-process", action="store_true", help="Drive app.main:app through ASGI without a server")
+    parser.add_argument("--rps", type=positive_number, default=50, help="Target arrival rate across all workers")
+    parser.add_argument("--duration", type=positive_number, default=10, help="Seconds to generate arrivals")
+    parser.add_argument("--workers", type=positive_int, default=1, help="Worker processes")
+    parser.add_argument("--mix", help='Weighted routes, e.g. "GET /todos=40,POST /todos=20"')
+    parser.add_argument("--max-inflight", type=int, default=1000)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    result = run(
+        url=args.url,
+        rps=args.rps,
+        duration=args.duration,
+        workers=args.workers,
+        mix=parse_mix(args.mix) if args.mix else DEFAULT_MIX,
+        max_inflight=args.max_inflight,
+        seed=args.seed,
+    )
+    report = json.dumps(result.report(), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
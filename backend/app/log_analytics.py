@@ -0,0 +1,318 @@
+"""
+Log analytics for the server's JSON log output.
+
+Reads `request_finished` records (latency from `process_time`, status codes),
+`request_failed` records (unhandled exceptions, counted as 500s) and
+incidents (`"type": "incident"`, from `format_incident`). Each file is
+memory-mapped and split into newline-aligned chunks that worker processes
+parse independently. Each worker returns a bounded summary: per-path
+latency histograms, counters and a top-K heap of the slowest requests.
+The summaries are merged, so memory does not grow with the size of the logs.
+
+    python -m app.log_analytics server.log --workers 4
+    python -m app.log_analytics logs/*.log --window 60 --top 50 --output report.json
+"""
+import argparse
+import collections
+import datetime
+import heapq
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import re
+import time
+
+from .histogram import LatencyHistogram
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+loads = orjson.loads if orjson is not None else json.loads
+
+# Cheap byte checks so most lines are never parsed
+REQUEST_MARKER = b'"request_finished"'
+INCIDENT_MARKER = b'"incident"'
+
+# Path segments that are ids rather than routes: numbers, UUIDs, long hex
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{16,})$")
+
+OTHER_PATHS = "[other]"
+
+MAX_CACHED_PATHS = 10000
+
+
+def positive_seconds(value: str) -> float:
+    seconds = float(value)
+    if not (seconds > 0 and math.isfinite(seconds)):
+        raise argparse.ArgumentTypeError(f"must be a number of seconds greater than 0, got {value}")
+    return seconds
+
+
+def normalize_path(path: str) -> str:
+    """
+    "/todos/42" -> "/todos/{id}", so per-path stats are per route.
+    """
+    return "/".join("{id}" if ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+def parse_timestamp(value: str) -> float:
+    # fromisoformat only accepts a trailing "Z" from Python 3.11
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def format_timestamp(seconds: float) -> str:
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class PathStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.status_codes = collections.Counter()
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.status_codes.update(other.status_codes)
+
+    def report(self):
+        count = sum(self.status_codes.values())
+        errors = sum(n for code, n in self.status_codes.items() if code >= 500)
+        return {
+            "count": count,
+            "error_rate": round(errors / count, 4) if count else 0.0,
+            "status_codes": {str(code): n for code, n in sorted(self.status_codes.items())},
+            "latency": self.latency.summary_ms(),
+        }
+
+
+class LogSummary:
+    """
+    Mergeable aggregate of one chunk of log, or of any number of merged chunks.
+    Distinct paths are capped at `max_paths` (the rest are counted under
+    "[other]") and the slowest requests at `top`.
+    """
+
+    def __init__(self, window: float = 300, top: int = 20, max_paths: int = 1000):
+        self.window = window
+        self.top = top
+        self.max_paths = max_paths
+        self.bytes = 0
+        self.lines = 0
+        self.records = 0
+        self.malformed = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.paths = {}  # "METHOD /path" -> PathStats
+        self.incidents = collections.Counter()  # (window start, incident_type, severity) -> count
+        self.slowest = []  # min-heap of (process_time, request_id, method, path, status_code)
+        self._keys = {}  # (method, raw path) -> paths key
+
+    def _see_timestamp(self, timestamp):
+        # ISO-8601 UTC strings sort in time order
+        if not timestamp:
+            return
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+    def add_request(self, method: str, path: str, status_code: int, process_time: float, request_id: str):
+        key = self._keys.get((method, path))
+        if key is None:
+            if len(self._keys) >= MAX_CACHED_PATHS:
+                self._keys.clear()
+            key = self._keys[(method, path)] = f"{method} {normalize_path(path)}"
+        stats = self.paths.get(key)
+        if stats is None:
+            if len(self.paths) >= self.max_paths:
+                key = f"{method} {OTHER_PATHS}"
+                stats = self.paths.get(key)
+            if stats is None:
+                stats = self.paths[key] = PathStats()
+        stats.latency.record(process_time)
+        stats.status_codes[status_code] += 1
+        entry = (process_time, request_id or "", method, path, status_code)
+        if len(self.slowest) < self.top:
+            heapq.heappush(self.slowest, entry)
+        elif self.slowest and entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def add_line(self, line: bytes):
+        """
+        Parses one candidate line (one that contains a marker).
+        """
+        try:
+            record = loads(line)
+        except ValueError:
+            self.malformed += 1
+            return
+        if not isinstance(record, dict):
+            return
+        self.records += 1
+        self._see_timestamp(record.get("timestamp"))
+        try:
+            if record.get("event") == "request_finished":
+                self.add_request(record["method"], record["path"], int(record["status_code"]),
+                                 float(record["process_time"]), record.get("request_id"))
+            elif record.get("type") == "incident":
+                incident_type = record.get("incident_type", "unknown")
+                details = record.get("details")
+                if incident_type == "request_failed" and isinstance(details, dict):
+                    # Unhandled exceptions log no request_finished; the client saw a 500
+                    self.add_request(details["method"], details["path"], 500,
+                                     float(details["process_time"]), details.get("request_id"))
+                timestamp = record.get("timestamp")
+                start = parse_timestamp(timestamp) // self.window * self.window if timestamp else 0.0
+                self.incidents[(start, incident_type, record.get("severity", "unknown"))] += 1
+        except (KeyError, TypeError, ValueError):
+            self.malformed += 1
+
+    def merge(self, other):
+        self.bytes += other.bytes
+        self.lines += other.lines
+        self.records += other.records
+        self.malformed += other.malformed
+        self._see_timestamp(other.first_timestamp)
+        self._see_timestamp(other.last_timestamp)
+        for key, stats in other.paths.items():
+            if key not in self.paths and len(self.paths) >= self.max_paths:
+                key = f"{key.split(' ', 1)[0]} {OTHER_PATHS}"
+            self.paths.setdefault(key, PathStats()).merge(stats)
+        self.incidents.update(other.incidents)
+        self.slowest = heapq.nlargest(self.top, self.slowest + other.slowest)
+        heapq.heapify(self.slowest)
+
+    def report(self):
+        status_codes = collections.Counter()
+        for stats in self.paths.values():
+            status_codes.update(stats.status_codes)
+        requests = sum(status_codes.values())
+        by_type = collections.Counter()
+        windows = collections.defaultdict(collections.Counter)
+        for (start, incident_type, severity), count in sorted(self.incidents.items()):
+            by_type[f"{incident_type}/{severity}"] += count
+            windows[start][f"{incident_type}/{severity}"] += count
+        paths = sorted(self.paths.items(), key=lambda item: sum(item[1].status_codes.values()), reverse=True)
+        return {
+            "bytes": self.bytes,
+            "lines": self.lines,
+            "records": self.records,
+            "malformed": self.malformed,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "requests": requests,
+            "status_codes": {
+                str(code): {"count": n, "rate": round(n / requests, 4)} for code, n in sorted(status_codes.items())
+            },
+            "error_rate": round(sum(n for code, n in status_codes.items() if code >= 500) / requests, 4) if requests else 0.0,
+            "paths": {key: stats.report() for key, stats in paths},
+            "incidents": {
+                "window_seconds": self.window,
+                "totals": dict(by_type.most_common()),
+                "windows": [
+                    {"start": format_timestamp(start), "counts": dict(counts)} for start, counts in sorted(windows.items())
+                ],
+            },
+            "slowest": [
+                {"request_id": request_id, "method": method, "path": path, "status_code": status_code,
+                 "process_time_ms": round(process_time * 1000, 3)}
+                for process_time, request_id, method, path, status_code in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+def split_chunks(path: str, chunk_bytes: int):
+    """
+    (path, start, end) byte ranges of about `chunk_bytes`, each ending just
+    after a newline (or at the end of the file), so no line is split.
+    """
+    chunk_bytes = max(1, chunk_bytes)
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    chunks = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+            end = size if end == -1 else end + 1
+            chunks.append((path, start, end))
+            start = end
+    return chunks
+
+
+def analyze_chunk(chunk, options: dict) -> LogSummary:
+    path, start, end = chunk
+    summary = LogSummary(**options)
+    summary.bytes = end - start
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = start
+        while position < end:
+            newline = mm.find(b"\n", position, end)
+            if newline == -1:
+                newline = end
+            if newline > position:
+                line = mm[position:newline]
+                summary.lines += 1
+                if REQUEST_MARKER in line or INCIDENT_MARKER in line:
+                    summary.add_line(line)
+            position = newline + 1
+    return summary
+
+
+def _worker_entry(args):
+    return analyze_chunk(*args)
+
+
+def analyze(paths, workers: int = None, chunk_bytes: int = 64 * 1024 * 1024, window: float = 300,
+            top: int = 20, max_paths: int = 1000) -> LogSummary:
+    """
+    Analyzes every file in `paths` with `workers` processes (all cores by default).
+    """
+    options = {"window": window, "top": top, "max_paths": max_paths}
+    chunks = [chunk for path in paths for chunk in split_chunks(path, chunk_bytes)]
+    workers = min(workers or os.cpu_count() or 1, max(1, len(chunks)))
+    total = LogSummary(**options)
+    if workers == 1:
+        for chunk in chunks:
+            total.merge(analyze_chunk(chunk, options))
+        return total
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        # Chunks are merged as they finish, so only a few summaries are ever held at once
+        for partial in pool.imap_unordered(_worker_entry, [(chunk, options) for chunk in chunks]):
+            total.merge(partial)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyzes the server's JSON logs.")
+    parser.add_argument("paths", nargs="+", help="Log files (JSON lines; other lines are skipped)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-mb", type=float, default=64, help="Bytes of log per task")
+    parser.add_argument("--window", type=positive_seconds, default=300, help="Seconds per incident-count window")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest requests to report")
+    parser.add_argument("--max-paths", type=int, default=1000, help="Distinct paths tracked before grouping as [other]")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    summary = analyze(args.paths, args.workers, int(args.chunk_mb * 1024 * 1024), args.window, args.top, args.max_paths)
+    elapsed = time.perf_counter() - started
+    report = summary.report()
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["mb_per_second"] = round(summary.bytes / 1024 / 1024 / elapsed, 1) if elapsed else 0.0
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
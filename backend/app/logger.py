@@ -1,54 +1,198 @@
 import structlog
 import logging
+import queue
+import threading
+import collections
+import json
 import sys
 import os
+from .sampling import TailSamplingHandler
+from .context import add_request_context
+from .incident_store import record_incident
+from .event_stream import publish_event
+from .tracebacks import format_exc_summary
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
 
 # Custom processor to format error logs as incidents
 def format_incident(logger, method_name, event_dict):
     if method_name in ("error", "critical"):
         event_dict["type"] = "incident"
         event_dict["service"] = "incident-backend"
-        
+
         # Rename event -> incident_type
         if "event" in event_dict:
             event_dict["incident_type"] = event_dict.pop("event")
-            
+
         # Rename level -> severity
         if "level" in event_dict:
             event_dict["severity"] = event_dict.pop("level")
-            
+
     return event_dict
 
+def fast_dumps(obj, **kwargs):
+    """
+    JSON serializer for structlog's JSONRenderer.
+    Uses orjson when installed and falls back to the stdlib encoder.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=kwargs.get("default"), option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj, **kwargs)
+
+class AsyncLogHandler(logging.Handler):
+    """
+    Non-blocking log handler.
+
+    `emit` only puts the record on a bounded queue; a writer thread renders
+    records with the handler's formatter and writes them to the stream in
+    batches with one flush per batch. When the queue is full the record is
+    dropped and counted. `close` (called by logging.shutdown at exit) drains
+    whatever is still queued.
+    """
+
+    def __init__(self, stream=None, maxsize: int = 10000, batch_size: int = 256):
+        super().__init__()
+        self.stream = stream or sys.stdout
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize)
+        self._dropped = collections.Counter()
+        self._written = 0
+        self._batches = 0
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._dropped[record.levelname] += 1
+
+    def _write(self, records):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        self._written += len(lines)
+        self._batches += 1
+
+    def _run(self):
+        stopping = False
+        while True:
+            batch = []
+            try:
+                # Block for the first record, then take whatever else is already queued
+                record = self._queue.get_nowait() if stopping else self._queue.get()
+                while True:
+                    if record is self._stop:
+                        stopping = True
+                    else:
+                        batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        break
+                    record = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+            elif stopping:
+                return
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(self._stop)
+            self._thread.join(5)
+        super().close()
+
+    def stats(self):
+        return {
+            "mode": "async",
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "written": self._written,
+            "batches": self._batches,
+            "dropped": sum(self._dropped.values()),
+            "dropped_by_level": dict(self._dropped),
+        }
+
+log_handler = None
+sampling_handler = None
+
 def configure_logger():
-    # Configure standard logging to output to stdout
-    handlers = [logging.StreamHandler(sys.stdout)]
+    global log_handler, sampling_handler
+    # LOG_ASYNC=0 renders and writes on the calling thread (the original behaviour)
+    async_mode = os.getenv("LOG_ASYNC", "1") != "0"
+
+    shared_processors = [
+        structlog.stdlib.filter_by_level,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.PositionalArgumentsFormatter(),
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.StackInfoRenderer(),
+        format_exc_summary,
+        structlog.processors.UnicodeDecoder(),
+        add_request_context,
+        format_incident,
+        record_incident,
+        publish_event,
+    ]
 
+    if async_mode:
+        # JSON rendering is deferred to the writer thread via ProcessorFormatter
+        log_handler = AsyncLogHandler(
+            sys.stdout,
+            maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("LOG_BATCH_SIZE", "256")),
+        )
+        log_handler.setFormatter(structlog.stdlib.ProcessorFormatter(
+            processors=[
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                structlog.processors.JSONRenderer(serializer=fast_dumps),
+            ],
+        ))
+        processors = shared_processors + [structlog.stdlib.ProcessorFormatter.wrap_for_formatter]
+    else:
+        # Configure standard logging to output to stdout
+        log_handler = logging.StreamHandler(sys.stdout)
+        processors = shared_processors + [structlog.processors.JSONRenderer(serializer=fast_dumps)]
+
+    # Per-request tail sampling sits in front of the output handler
+    sampling_handler = TailSamplingHandler(
+        log_handler,
+        sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "0.1")),
+    )
 
     logging.basicConfig(
         format="%(message)s",
         level=logging.INFO,
-        handlers=handlers
+        handlers=[sampling_handler]
     )
 
     structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
-            format_incident,
-            structlog.processors.JSONRenderer(),
-        ],
+        processors=processors,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
-    
+
     return structlog.get_logger()
 
+def logging_stats():
+    stats = log_handler.stats() if isinstance(log_handler, AsyncLogHandler) else {"mode": "sync"}
+    stats["sampling"] = sampling_handler.stats()
+    return stats
+
 logger = configure_logger()
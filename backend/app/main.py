@@ -1,113 +1,102 @@
-from fastapi import FastAPI, Request, HTTPException
+from .startup import startup_report
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .simulation import router as simulation_router
-from .buggy_math import router as math_router
-from .buggy_list import router as list_router
-from .buggy_dict import router as dict_router
-from .logger import logger
-from .database import get_db_connection
-from .alerts import notify_agent
-import time
-import uuid
-import traceback
-from pydantic import BaseModel
-
-class TodoItem(BaseModel):
-    title: str
-    completed: bool = False
-
-app = FastAPI()
-
-# Enable CORS for Frontend Dashboard
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for dev
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+import os
+
+# (name, module) of every router, in the order they are included.
+# Core routers are always included; optional ones can be skipped with SKIP_ROUTERS.
+CORE_ROUTERS = (
+    ("status", ".status"),
+    ("todos", ".todos"),
+    ("simulation", ".simulation"),
+    ("scenarios", ".scenarios"),
+    ("incidents", ".incident_store"),
+    ("events", ".event_stream"),
+    ("faults", ".faults"),
+    ("startup", ".startup"),
+    ("profiler", ".profiler"),
+)
+OPTIONAL_ROUTERS = (
+    ("memory", ".memory_pressure"),
+    ("campaigns", ".campaigns"),
+    ("buggy_math", ".buggy_math"),
+    ("buggy_list", ".buggy_list"),
+    ("buggy_dict", ".buggy_dict"),
 )
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    request_id = str(uuid.uuid4())
-    logger.info("request_started", method=request.method, path=request.url.path, request_id=request_id)
-    
-    start_time = time.time()
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        logger.info(
-            "request_finished",
-            method=request.method,
-            path=request.url.path,
-            status_code=response.status_code,
-            process_time=process_time,
-            request_id=request_id
-        )
-        return response
-    except Exception as e:
-        process_time = time.time() - start_time
-        logger.error(
-            "request_failed",
-            details={
-                "method": request.method,
-                "path": request.url.path,
-                "error": str(e),
-                "process_time": process_time,
-                "request_id": request_id
-            }
-        )
-        full_traceback = traceback.format_exc()
-        notify_agent(
-            severity="critical",
-            error_message=full_traceback,
-            incident_type="unhandled_exception"
-        )
-        raise e
-
-app.include_router(simulation_router)
-app.include_router(math_router)
-app.include_router(list_router)
-app.include_router(dict_router)
-
-@app.get("/todos")
-def get_todos():
-    try:
-        conn = get_db_connection()
-        todos = conn.execute("SELECT * FROM todos").fetchall()
-        conn.close()
-        return [{"id": row["id"], "title": row["title"], "completed": bool(row["completed"])} for row in todos]
-    except Exception as e:
-        logger.error("db_query_failed", details={"error": str(e)})
-        raise HTTPException(status_code=500, detail="Database Error")
-
-@app.post("/todos")
-def create_todo(item: TodoItem):
-    try:
-        conn = get_db_connection()
-        cursor = conn.execute("INSERT INTO todos (title, completed) VALUES (?, ?)", (item.title, item.completed))
-        conn.commit()
-        todo_id = cursor.lastrowid
-        conn.close()
-        logger.info("todo_created", id=todo_id, title=item.title)
-        return {"id": todo_id, "title": item.title, "completed": item.completed}
-    except Exception as e:
-        logger.error("db_insert_failed", details={"error": str(e)})
-        raise HTTPException(status_code=500, detail="Database Error")
-
-@app.get("/")
-def read_root():
-    logger.info("root_accessed")
-    return {"message": "Incident Response Simulation Backend"}
-
-@app.get("/metrics")
-def metrics():
+
+def skipped_routers():
+    return [name.strip() for name in os.getenv("SKIP_ROUTERS", "").split(",") if name.strip()]
+
+
+def create_app(skip=None) -> FastAPI:
     """
-    Mock metrics endpoint.
+    Builds the application. Routers named in `skip` (default: the
+    comma-separated SKIP_ROUTERS variable) are not imported at all. The
+    database is initialized by a startup hook, not at import time; see
+    `startup.StartupReport` for where cold-start time goes.
     """
-    return {
-        "memory_usage_mb": 512,
-        "cpu_usage_percent": 15,
-        "disk_usage_percent": 45
-    }
+    skip = set(skipped_routers() if skip is None else skip)
+    unknown = skip - {name for name, _ in OPTIONAL_ROUTERS}
+    if unknown:
+        raise ValueError(f"Only optional routers can be skipped, not: {', '.join(sorted(unknown))}")
+
+    app = FastAPI()
+
+    # Innermost, so injected latency holds an admission slot the way real slowness would
+    faults = startup_report.import_module(".faults", __package__)
+    app.add_middleware(faults.FaultMiddleware)
+
+    # Inside CORS and the request middleware, so shed requests and injected faults
+    # still get CORS headers, a request id and metrics
+    admission = startup_report.import_module(".admission", __package__)
+    app.add_middleware(admission.AdmissionMiddleware)
+
+    # Enable CORS for Frontend Dashboard
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins for dev
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Request-ID", "ETag"],
+    )
+
+    # Registered after CORS so it wraps it and sees every request
+    middleware = startup_report.import_module(".middleware", __package__)
+    app.add_middleware(middleware.RequestContextMiddleware)
+
+    # Startup hooks run in registration order, so the table exists before anything else starts
+    database = startup_report.import_module(".database", __package__)
+
+    @app.on_event("startup")
+    def initialize_database():
+        with startup_report.phase("init_db"):
+            database.init_db()
+
+    startup_report.skipped = [name for name, _ in OPTIONAL_ROUTERS if name in skip]
+    for name, module in CORE_ROUTERS + OPTIONAL_ROUTERS:
+        if name in skip:
+            continue
+        app.include_router(startup_report.import_module(module, __package__).router)
+
+    status = startup_report.import_module(".status", __package__)
+    delivery = startup_report.import_module(".delivery", __package__)
+
+    @app.on_event("startup")
+    def start_shared_state():
+        with startup_report.phase("start_shared_state"):
+            status.start_shared_state()
+
+    @app.on_event("shutdown")
+    def flush_agent_queue():
+        delivery.delivery_queue.stop()
+
+    @app.on_event("shutdown")
+    def stop_shared_state():
+        status.stop_shared_state()
+
+    return app
+
 
+app = create_app()
@@ -0,0 +1,259 @@
+from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from .logger import logger
+from .metrics import process_metrics
+import asyncio
+import collections
+import ctypes
+import ctypes.util
+import gc
+import itertools
+import os
+import threading
+import tracemalloc
+
+router = APIRouter()
+
+MB = 1024 * 1024
+
+# Safety cap on what a single pressure run may allocate
+MAX_ALLOCATION_MB = int(os.getenv("MEMORY_PRESSURE_MAX_MB", "2048"))
+
+SHAPES = ("large", "small", "fragmented")
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"))
+    _malloc_trim = _libc.malloc_trim
+except (OSError, AttributeError, TypeError):  # not glibc
+    _malloc_trim = None
+
+
+def _allocate(shape: str, size: int):
+    """
+    Allocates roughly `size` bytes with every page touched, so RSS really grows.
+    """
+    if shape == "large":
+        # One big block: served by mmap and returned to the OS as soon as it is freed
+        return [b"x" * size]
+    if shape == "small":
+        # Many small objects from pymalloc arenas
+        return [bytearray(256) for _ in range(size // 256)]
+    # fragmented: mixed sizes, every other object freed right away, leaving holes
+    blocks = []
+    kept = 0
+    for i, block_size in enumerate(itertools.cycle((512, 4096, 1536))):
+        if kept >= size:
+            break
+        block = bytearray(block_size)
+        if i % 2 == 0:
+            blocks.append(block)
+            kept += block_size
+    return blocks
+
+
+class MemoryPressure:
+    """
+    Controllable memory pressure.
+
+    `ramp` grows allocations at a given rate until process RSS reaches the
+    target (or the allocation cap). Each step allocates on a worker thread so
+    the event loop keeps serving requests. `reset` frees everything, runs the GC,
+    asks glibc to trim its heap and reports how much RSS actually came back.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._allocated = 0
+        self._generation = 0  # bumped by every reset
+        self._lock = threading.Lock()
+
+    @property
+    def allocated_bytes(self):
+        return self._allocated
+
+    def allocate(self, shape: str, size: int, generation: int = None) -> bool:
+        """
+        Allocates and keeps `size` bytes, unless a reset has happened since
+        `generation` was read. A cancelled ramp cannot stop a step that is
+        already running on its thread, so the check is made under the lock
+        the reset takes.
+        """
+        blocks = _allocate(shape, size)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._chunks.append(blocks)
+            self._allocated += size
+        return True
+
+    async def ramp(self, target_rss_mb: float, rate_mb_s: float, shape: str = "large", step_seconds: float = 0.1):
+        """
+        Allocates `rate_mb_s` per second until RSS reaches `target_rss_mb`.
+        Returns True if the target was reached, False if the cap or a reset stopped it.
+        """
+        step_bytes = max(1, int(rate_mb_s * MB * step_seconds))
+        cap = MAX_ALLOCATION_MB * MB
+        generation = self._generation
+        while True:
+            rss = process_metrics.rss_bytes() or 0
+            if rss >= target_rss_mb * MB:
+                return True
+            if self._allocated + step_bytes > cap:
+                logger.warning("memory_pressure_capped", allocated_mb=self._allocated // MB, cap_mb=MAX_ALLOCATION_MB)
+                return False
+            if not await run_in_threadpool(self.allocate, shape, step_bytes, generation):
+                return False
+            await asyncio.sleep(step_seconds)
+
+    async def ramp_by(self, amount_mb: float, rate_mb_s: float, shape: str = "large", step_seconds: float = 0.1):
+        """
+        Allocates `amount_mb` more at `rate_mb_s`, regardless of current RSS.
+        """
+        remaining = int(amount_mb * MB)
+        step_bytes = max(1, int(rate_mb_s * MB * step_seconds))
+        generation = self._generation
+        while remaining > 0:
+            size = min(step_bytes, remaining, MAX_ALLOCATION_MB * MB - self._allocated)
+            if size <= 0:
+                logger.warning("memory_pressure_capped", allocated_mb=self._allocated // MB, cap_mb=MAX_ALLOCATION_MB)
+                return
+            if not await run_in_threadpool(self.allocate, shape, size, generation):
+                return
+            remaining -= size
+            await asyncio.sleep(step_seconds)
+
+    def reset(self):
+        """
+        Frees all pressure allocations and verifies RSS went down.
+        """
+        rss_before = process_metrics.rss_bytes()
+        with self._lock:
+            allocated = self._allocated
+            self._chunks = []
+            self._allocated = 0
+            self._generation += 1
+        gc.collect()
+        if _malloc_trim is not None:
+            _malloc_trim(0)
+        rss_after = process_metrics.rss_bytes()
+
+        released = (rss_before - rss_after) if rss_before is not None and rss_after is not None else None
+        return {
+            "freed_allocation_mb": round(allocated / MB, 2),
+            "rss_before_mb": round(rss_before / MB, 2) if rss_before is not None else None,
+            "rss_after_mb": round(rss_after / MB, 2) if rss_after is not None else None,
+            "rss_released_mb": round(released / MB, 2) if released is not None else None,
+            # Allow some slack for allocator bookkeeping that stays resident
+            "verified": released is not None and released >= allocated * 0.8,
+        }
+
+    def stats(self):
+        rss = process_metrics.rss_bytes()
+        return {
+            "allocated_mb": round(self._allocated / MB, 2),
+            "rss_mb": round(rss / MB, 2) if rss is not None else None,
+            "cap_mb": MAX_ALLOCATION_MB,
+        }
+
+
+memory_pressure = MemoryPressure()
+
+
+# --- tracemalloc diagnostics ---
+
+MAX_SNAPSHOTS = 5
+_snapshots = collections.OrderedDict()
+_snapshot_ids = itertools.count(1)
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _format_stat(stat):
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+    }
+
+
+def _format_diff(stat):
+    frame = stat.traceback[0]
+    return {
+        "location": f"{frame.filename}:{frame.lineno}",
+        "size_kb": round(stat.size / 1024, 1),
+        "size_diff_kb": round(stat.size_diff / 1024, 1),
+        "count_diff": stat.count_diff,
+    }
+
+
+@router.post("/debug/tracemalloc/start")
+def tracemalloc_start(frames: int = Query(10, ge=1, le=100)):
+    """
+    Starts tracing allocations. Tracing slows allocation-heavy code down noticeably.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    logger.info("tracemalloc_started", frames=tracemalloc.get_traceback_limit())
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+
+@router.post("/debug/tracemalloc/stop")
+def tracemalloc_stop():
+    tracemalloc.stop()
+    _snapshots.clear()
+    logger.info("tracemalloc_stopped")
+    return {"tracing": False}
+
+
+@router.post("/debug/tracemalloc/snapshot")
+def tracemalloc_snapshot(top: int = Query(15, ge=1, le=200)):
+    """
+    Takes a snapshot and returns the top allocation sites by size.
+    The last few snapshots are kept for diffing.
+    """
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="tracemalloc is not running; POST /debug/tracemalloc/start first")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    snapshot_id = next(_snapshot_ids)
+    _snapshots[snapshot_id] = snapshot
+    while len(_snapshots) > MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "id": snapshot_id,
+        "traced_mb": round(current / MB, 2),
+        "peak_traced_mb": round(peak / MB, 2),
+        "top": [_format_stat(stat) for stat in snapshot.statistics("lineno")[:top]],
+    }
+
+
+@router.get("/debug/tracemalloc/snapshots")
+def tracemalloc_snapshots():
+    return {"tracing": tracemalloc.is_tracing(), "snapshots": list(_snapshots)}
+
+
+@router.get("/debug/tracemalloc/diff")
+def tracemalloc_diff(base: int, current: int = None, top: int = Query(15, ge=1, le=200)):
+    """
+    Compares two stored snapshots (or `base` against a fresh one) and
+    returns the allocation sites that grew the most.
+    """
+    if base not in _snapshots or (current is not None and current not in _snapshots):
+        raise HTTPException(status_code=404, detail="Unknown snapshot id")
+    if current is None:
+        if not tracemalloc.is_tracing():
+            raise HTTPException(status_code=409, detail="tracemalloc is not running")
+        newer = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    else:
+        newer = _snapshots[current]
+    stats = newer.compare_to(_snapshots[base], "lineno")
+    return {
+        "base": base,
+        "current": current,
+        "top": [_format_diff(stat) for stat in stats[:top]],
+    }
@@ -0,0 +1,228 @@
+import bisect
+import os
+import shutil
+import threading
+import time
+
+# Upper bounds in seconds; the final bucket catches everything slower
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class RouteStats:
+    __slots__ = ("count", "errors", "total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class RouteMetrics:
+    """
+    Per-route request counters and fixed-bucket latency histograms.
+
+    Recording is a bisect plus a few integer increments under one short lock,
+    so it is cheap enough to run on every request in the middleware.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, status_code: int, duration: float):
+        index = bisect.bisect_left(LATENCY_BUCKETS, duration)
+        key = (method, route)
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats()
+            stats.count += 1
+            stats.total += duration
+            stats.buckets[index] += 1
+            if status_code >= 500:
+                stats.errors += 1
+
+    def snapshot(self):
+        """
+        Returns {(method, route): (count, errors, total_seconds, bucket_counts)}.
+        """
+        with self._lock:
+            return {key: (s.count, s.errors, s.total, list(s.buckets)) for key, s in self._routes.items()}
+
+    def summary(self):
+        return route_summary(self.snapshot())
+
+
+def merge_snapshots(snapshots):
+    """
+    Adds up route snapshots, e.g. from several worker processes.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for key, (count, errors, total, buckets) in snapshot.items():
+            if key in merged:
+                m_count, m_errors, m_total, m_buckets = merged[key]
+                merged[key] = (m_count + count, m_errors + errors, m_total + total,
+                               [a + b for a, b in zip(m_buckets, buckets)])
+            else:
+                merged[key] = (count, errors, total, list(buckets))
+    return merged
+
+
+def route_summary(snapshot):
+    routes = {}
+    for (method, route), (count, errors, total, buckets) in sorted(snapshot.items()):
+        routes[f"{method} {route}"] = {
+            "count": count,
+            "errors": errors,
+            "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+            "p50_ms": percentile_ms(buckets, 0.50),
+            "p90_ms": percentile_ms(buckets, 0.90),
+            "p99_ms": percentile_ms(buckets, 0.99),
+        }
+    return routes
+
+
+def percentile_ms(buckets, q: float):
+    """
+    Estimates a percentile from histogram counts by interpolating inside the bucket.
+    """
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+            upper = LATENCY_BUCKETS[i]
+            if upper == float("inf"):
+                return round(lower * 1000, 3)
+            return round((lower + (upper - lower) * (rank - seen) / count) * 1000, 3)
+        seen += count
+    return round(LATENCY_BUCKETS[-2] * 1000, 3)
+
+
+class ProcessMetrics:
+    """
+    Reads RSS and CPU time for this process from /proc/self.
+    CPU percent is measured between consecutive calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = (time.monotonic(), self.cpu_seconds() or 0.0)
+
+    @staticmethod
+    def rss_bytes():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def cpu_seconds():
+        try:
+            with open("/proc/self/stat") as f:
+                # Fields after the ")" of the command name; utime and stime are 14th and 15th overall
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def cpu_percent(self):
+        cpu = self.cpu_seconds()
+        if cpu is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            last_wall, last_cpu = self._last
+            self._last = (now, cpu)
+        elapsed = now - last_wall
+        return round((cpu - last_cpu) / elapsed * 100, 2) if elapsed > 0 else 0.0
+
+
+def disk_usage(path: str):
+    """
+    Returns (used_percent, used_bytes, total_bytes) for the volume holding `path`.
+    """
+    try:
+        usage = shutil.disk_usage(os.path.dirname(os.path.abspath(path)) or ".")
+    except OSError:
+        return None, None, None
+    return round(usage.used / usage.total * 100, 2), usage.used, usage.total
+
+
+def _escape(value: str):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, bool):
+        out.append((prefix, int(value)))
+    elif isinstance(value, (int, float)):
+        out.append((prefix, value))
+    elif isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(f"{prefix}_{key}", inner, out)
+
+
+def render_prometheus(route_snapshot: dict, process: dict, sections: dict):
+    """
+    Renders metrics in the Prometheus text exposition format.
+    `route_snapshot` is in the `RouteMetrics.snapshot` format; numeric
+    leaves of `sections` are exported as gauges.
+    """
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_str = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+            lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+
+    for name, help_text, value in (
+        ("process_resident_memory_bytes", "Resident memory size in bytes.", process.get("rss_bytes")),
+        ("process_cpu_seconds_total", "Total user and system CPU time in seconds.", process.get("cpu_seconds")),
+        ("disk_used_bytes", "Used bytes on the database volume.", process.get("disk_used_bytes")),
+        ("disk_total_bytes", "Total bytes on the database volume.", process.get("disk_total_bytes")),
+    ):
+        if value is not None:
+            metric(name, "counter" if name.endswith("_total") else "gauge", help_text, [((), value)])
+
+    snapshot = sorted(route_snapshot.items())
+    metric("http_requests_total", "counter", "Requests handled per route.",
+           [((("method", m), ("route", r)), s[0]) for (m, r), s in snapshot])
+    metric("http_request_errors_total", "counter", "Requests per route that ended with a 5xx or an exception.",
+           [((("method", m), ("route", r)), s[1]) for (m, r), s in snapshot])
+
+    lines.append("# HELP http_request_duration_seconds Request latency per route.")
+    lines.append("# TYPE http_request_duration_seconds histogram")
+    for (method, route), (count, _, total, buckets) in snapshot:
+        labels = f'method="{_escape(method)}",route="{_escape(route)}"'
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total}")
+        lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+    gauges = []
+    for section, values in sections.items():
+        _flatten(f"simulation_{section}", values, gauges)
+    for name, value in gauges:
+        name = "".join(c if c.isalnum() or c == "_" else "_" for c in name)
+        metric(name, "gauge", "Subsystem statistic.", [((), value)])
+
+    return "\n".join(lines) + "\n"
+
+
+route_metrics = RouteMetrics()
+process_metrics = ProcessMetrics()
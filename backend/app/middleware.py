@@ -0,0 +1,106 @@
+import time
+import uuid
+from .context import request_id_var, request_path_var
+from .startup import startup_report
+from .profiler import request_profiler, PROFILE_URL_HEADER
+from .logger import logger, sampling_handler
+from .metrics import route_metrics
+from .alerts import notify_agent, TRACEBACK_FRAMES
+from .tracebacks import summarize
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+
+def route_template(scope):
+    # Label by route pattern, not raw path, to keep metric cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI request middleware.
+
+    Assigns each request an id, binds it to `request_id_var` for every log
+    line and agent notification made while handling the request, returns it
+    in the `X-Request-ID` header, and records timing with `perf_counter_ns`.
+    Unlike `@app.middleware("http")` it does not wrap the request in an
+    extra task and response stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = str(uuid.uuid4())
+        request_id_header = request_id.encode()
+        method = scope["method"]
+        path = scope["path"]
+        context_token = request_id_var.set(request_id)
+        path_token = request_path_var.set(path)
+        sampling_token = sampling_handler.begin()
+        status_code = 500
+        completed = False
+        # Header only inspected when a profiling token is configured
+        profile = request_profiler.begin(scope, request_id) if request_profiler.token is not None else None
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", ())) + [(REQUEST_ID_HEADER, request_id_header)]
+                if profile is not None:
+                    message["headers"].append((PROFILE_URL_HEADER, f"/debug/profile/requests/{request_id}".encode()))
+            await send(message)
+
+        logger.info("request_started", method=method, path=path)
+        start_ns = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        except Exception as e:
+            process_time = (time.perf_counter_ns() - start_ns) / 1e9
+            route_metrics.record(method, route_template(scope), 500, process_time)
+            # Rendered once, bounded to the innermost frames, for both the log and the agent
+            summary = summarize(e, TRACEBACK_FRAMES)
+            logger.error(
+                "request_failed",
+                details={
+                    "method": method,
+                    "path": path,
+                    "error": str(e),
+                    "traceback": summary,
+                    "process_time": process_time,
+                    "request_id": request_id
+                }
+            )
+            notify_agent(
+                severity="critical",
+                error_message=summary,
+                exc=e,
+                incident_type="unhandled_exception"
+            )
+            raise
+        else:
+            process_time = (time.perf_counter_ns() - start_ns) / 1e9
+            route_metrics.record(method, route_template(scope), status_code, process_time)
+            logger.info(
+                "request_finished",
+                method=method,
+                path=path,
+                status_code=status_code,
+                process_time=process_time
+            )
+            completed = True
+            startup_report.response_sent()
+        finally:
+            # Also reached when the request is cancelled (client gone): anything
+            # that did not finish cleanly keeps its records
+            sampling_handler.finish(sampling_token, failed=not completed or status_code >= 500)
+            if profile is not None:
+                request_profiler.finish(profile, status_code, (time.perf_counter_ns() - start_ns) / 1e9)
+            request_id_var.reset(context_token)
+            request_path_var.reset(path_token)
@@ -0,0 +1,362 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from .logger import logger
+import collections
+import hmac
+import os
+import sys
+import threading
+import time
+
+router = APIRouter()
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_URL_HEADER = b"x-profile-url"
+
+# Leaf functions of threads that are waiting rather than working
+IDLE_LEAVES = {
+    "threading.py:wait",
+    "threading.py:_wait_for_tstate_lock",
+    "selectors.py:select",
+    "queue.py:get",
+    "base_events.py:_run_once",
+}
+
+MAX_DEPTH = 256
+MAX_LABELS = 50000
+
+
+class StackCollector:
+    """
+    Turns `sys._current_frames()` into collapsed stacks
+    ("thread;file.py:func;file.py:func") counted in a bounded Counter.
+    """
+
+    def __init__(self, max_stacks: int):
+        self.max_stacks = max_stacks
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._labels = {}  # code object -> "file.py:func"
+        self._thread_names = {}
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            if len(self._labels) >= MAX_LABELS:
+                self._labels.clear()
+            label = self._labels[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        return label
+
+    def _thread_name(self, ident):
+        name = self._thread_names.get(ident)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names.get(ident, str(ident))
+        return name
+
+    def collapse(self, ident, frame) -> str:
+        parts = []
+        while frame is not None and len(parts) < MAX_DEPTH:
+            parts.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if frame is not None:
+            parts.append("[truncated]")
+        parts.append(self._thread_name(ident))
+        parts.reverse()
+        return ";".join(parts)
+
+    def sample(self, skip_ident: int):
+        for ident, frame in sys._current_frames().items():
+            if ident == skip_ident:
+                continue
+            stack = self.collapse(ident, frame)
+            if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                stack = self._thread_name(ident) + ";[other]"
+            self.stacks[stack] += 1
+        self.samples += 1
+
+    def reset(self):
+        self.stacks = collections.Counter()
+        self.samples = 0
+
+    def render(self, idle: bool = False, limit: int = None):
+        """
+        Collapsed-stack text ("stack count" per line), the input format of
+        flamegraph.pl and speedscope. Idle stacks are left out unless `idle`.
+        """
+        stacks = [
+            (stack, count) for stack, count in self.stacks.items()
+            if idle or stack.rsplit(";", 1)[-1] not in IDLE_LEAVES
+        ]
+        stacks.sort(key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks[:limit])
+
+
+class SamplingProfiler:
+    """
+    Continuous wall-clock profiler for every thread in the process.
+
+    A daemon thread samples all stacks every `interval` seconds. Each sample
+    holds the GIL while it walks the frames, so the thread measures how long
+    that takes and stretches the interval to keep sampling time under
+    `budget` (a fraction of wall time).
+    """
+
+    def __init__(self, interval: float = 0.01, budget: float = 0.01, max_stacks: int = 10000):
+        self.interval = interval
+        self.budget = budget
+        self.collector = StackCollector(max_stacks)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._started_at = None
+        self._sampling_time = 0.0
+        self._effective_interval = interval
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = None, budget: float = None):
+        if interval is not None:
+            self.interval = interval
+        if budget is not None:
+            self.budget = budget
+        if self.running:
+            return
+        # A fresh event per thread, so a stop still in progress cannot be undone by a restart
+        self._stop = threading.Event()
+        self._started_at = time.time()
+        self._sampling_time = 0.0
+        self._effective_interval = self.interval
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info("profiler_started", interval_ms=self.interval * 1000, budget=self.budget)
+
+    def stop(self):
+        """
+        Blocks until the sampler thread exits (at most a second); call it from
+        a threadpool, not the event loop.
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join(1)
+        logger.info("profiler_stopped")
+
+    def _run(self, stop: threading.Event):
+        ident = threading.get_ident()
+        wait = self.interval
+        while not stop.wait(wait):
+            start = time.perf_counter()
+            with self._lock:
+                self.collector.sample(ident)
+            cost = time.perf_counter() - start
+            self._sampling_time += cost
+            # Never spend more than `budget` of wall time sampling
+            wait = max(self.interval, cost / self.budget - cost)
+            self._effective_interval = wait + cost
+
+    def render(self, idle: bool = False, limit: int = None, reset: bool = False):
+        with self._lock:
+            text = self.collector.render(idle, limit)
+            if reset:
+                self.collector.reset()
+        return text
+
+    def stats(self):
+        elapsed = time.time() - self._started_at if self._started_at else 0.0
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "effective_interval_ms": round(self._effective_interval * 1000, 3),
+            "overhead_budget": self.budget,
+            "overhead": round(self._sampling_time / elapsed, 5) if elapsed else 0.0,
+            "samples": self.collector.samples,
+            "distinct_stacks": len(self.collector.stacks),
+        }
+
+
+class RequestProfile:
+    def __init__(self, request_id: str, method: str, path: str, interval: float):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.collector = StackCollector(max_stacks=2000)
+        self.status_code = None
+        self.duration = None
+        self.done = threading.Event()
+        self.thread = None
+
+    def start(self, max_duration: float, on_finish):
+        self.thread = threading.Thread(target=self._run, args=(max_duration, on_finish),
+                                       name="request-profiler", daemon=True)
+        self.thread.start()
+
+    def _run(self, max_duration: float, on_finish):
+        ident = threading.get_ident()
+        deadline = time.monotonic() + max_duration
+        while not self.done.wait(self.interval) and time.monotonic() < deadline:
+            self.collector.sample(ident)
+        # The sampler files the profile itself once the request is over, so
+        # the event loop never waits for a sample in progress
+        self.done.wait()
+        on_finish(self)
+
+    def to_dict(self, idle: bool = False):
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "interval_ms": self.interval * 1000,
+            "samples": self.collector.samples,
+            "collapsed": self.collector.render(idle),
+        }
+
+
+class RequestProfiler:
+    """
+    Profiles single requests that carry `X-Profile: <PROFILE_TOKEN>`.
+
+    A sampler thread records every thread's stack for the lifetime of the
+    request, so sync routes running in the threadpool are covered too, along
+    with anything else running at the time. Finished profiles are kept by
+    request id. Without a configured token the middleware never looks at
+    the header.
+    """
+
+    def __init__(self, token: str = None, interval: float = 0.001, max_concurrent: int = 2,
+                 max_duration: float = 30, history: int = 50):
+        self.token = token.encode() if token else None
+        self.interval = interval
+        self.max_concurrent = max_concurrent
+        self.max_duration = max_duration
+        self._active = 0
+        self._lock = threading.Lock()
+        self._profiles = collections.OrderedDict()
+        self._history = history
+        self._rejected = 0
+
+    def begin(self, scope, request_id: str):
+        """
+        Starts profiling if the request carries the token, else returns None.
+        """
+        supplied = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                supplied = value
+                break
+        if supplied is None or not hmac.compare_digest(supplied, self.token):
+            return None
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                self._rejected += 1
+                return None
+            self._active += 1
+        profile = RequestProfile(request_id, scope["method"], scope["path"], self.interval)
+        profile.start(self.max_duration, self._store)
+        return profile
+
+    def finish(self, profile: RequestProfile, status_code: int, duration: float):
+        """
+        Ends the request's profile without blocking; the sampler thread stores it.
+        """
+        profile.status_code = status_code
+        profile.duration = duration
+        profile.done.set()
+
+    def _store(self, profile: RequestProfile):
+        with self._lock:
+            self._active -= 1
+            self._profiles[profile.request_id] = profile
+            while len(self._profiles) > self._history:
+                self._profiles.popitem(last=False)
+        logger.info("request_profiled", profiled_request_id=profile.request_id, samples=profile.collector.samples)
+
+    def get(self, request_id: str):
+        with self._lock:
+            return self._profiles.get(request_id)
+
+    def list(self):
+        with self._lock:
+            profiles = list(reversed(self._profiles.values()))
+        return [{key: value for key, value in profile.to_dict().items() if key != "collapsed"} for profile in profiles]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.token is not None,
+                "active": self._active,
+                "stored": len(self._profiles),
+                "rejected_over_limit": self._rejected,
+            }
+
+
+sampling_profiler = SamplingProfiler(
+    interval=float(os.getenv("PROFILER_INTERVAL_MS", "10")) / 1000,
+    budget=float(os.getenv("PROFILER_OVERHEAD_BUDGET", "0.01")),
+    max_stacks=int(os.getenv("PROFILER_MAX_STACKS", "10000")),
+)
+
+request_profiler = RequestProfiler(
+    token=os.getenv("PROFILE_TOKEN"),
+    interval=float(os.getenv("REQUEST_PROFILE_INTERVAL_MS", "1")) / 1000,
+)
+
+
+def start_profiler_if_enabled():
+    if os.getenv("PROFILER_ENABLED", "0") == "1":
+        sampling_profiler.start()
+
+
+router.add_event_handler("startup", start_profiler_if_enabled)
+router.add_event_handler("shutdown", sampling_profiler.stop)
+
+
+@router.get("/debug/profile")
+async def get_profile(
+    format: str = Query("collapsed", pattern="^(collapsed|json)$"),
+    idle: bool = False,
+    limit: int = Query(None, ge=1),
+    reset: bool = False,
+):
+    """
+    Aggregated stacks from the continuous profiler, in collapsed format for
+    flamegraph tools. `reset=true` starts a new window after reading.
+    """
+    text = sampling_profiler.render(idle, limit, reset)
+    if format == "json":
+        return {**sampling_profiler.stats(), "collapsed": text}
+    return PlainTextResponse(text)
+
+
+@router.post("/debug/profile/start")
+async def start_profile(interval_ms: float = Query(None, gt=0), budget: float = Query(None, gt=0, le=0.5)):
+    sampling_profiler.start(interval_ms / 1000 if interval_ms else None, budget)
+    return sampling_profiler.stats()
+
+
+@router.post("/debug/profile/stop")
+async def stop_profile():
+    await run_in_threadpool(sampling_profiler.stop)
+    return sampling_profiler.stats()
+
+
+@router.get("/debug/profile/requests")
+async def list_request_profiles():
+    return {"profiles": request_profiler.list(), **request_profiler.stats()}
+
+
+@router.get("/debug/profile/requests/{request_id}")
+async def get_request_profile(request_id: str, format: str = Query("json", pattern="^(collapsed|json)$"), idle: bool = False):
+    profile = request_profiler.get(request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collector.render(idle))
+    return profile.to_dict(idle)
@@ -0,0 +1,134 @@
+import contextlib
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from .logger import logger
+
+SEGMENT_PATTERN = "incidents-*.jsonl.gz"
+
+
+def list_segments(directory: str):
+    """
+    Segment files in `directory`, oldest first (names start with their UTC start time).
+    """
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+
+
+class IncidentRecorder:
+    """
+    Appends every agent payload to gzip-compressed JSONL segments.
+
+    Each line is {"ts": <unix time>, "payload": <payload>}. A new segment is
+    started once the current one has taken `segment_bytes` of uncompressed
+    JSON or is `segment_seconds` old; the oldest segments beyond
+    `max_segments` are deleted. The stream is sync-flushed at most every
+    `flush_interval` seconds, so a crash loses little and leaves a segment
+    that reads cleanly up to that point. Segment names carry the pid, so
+    worker processes can share a directory.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 16 * 1024 * 1024, segment_seconds: float = 3600,
+                 max_segments: int = 100, flush_interval: float = 1.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._written = 0
+        self._last_flush = 0.0
+        self._recorded = 0
+        self._segments = 0
+        self._errors = 0
+
+    def _open_segment(self, now: float):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+        self._path = os.path.join(self.directory, f"incidents-{stamp}-{os.getpid()}-{self._segments}.jsonl.gz")
+        self._file = gzip.open(self._path, "wb")
+        self._opened_at = now
+        self._written = 0
+        self._segments += 1
+        self._prune()
+
+    def _prune(self):
+        segments = list_segments(self.directory)
+        for path in segments[:max(0, len(segments) - self.max_segments)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            logger.info("incident_segment_closed", path=self._path, bytes=self._written)
+            self._file = None
+
+    def record(self, payloads):
+        """
+        Appends `payloads` with the current time. Called from the delivery
+        thread, so disk writes never happen on a request.
+        """
+        now = time.time()
+        data = b"".join(json.dumps({"ts": now, "payload": payload}).encode() + b"\n" for payload in payloads)
+        with self._lock:
+            try:
+                if self._file is not None and (
+                    self._written >= self.segment_bytes or now - self._opened_at >= self.segment_seconds
+                ):
+                    self._close_segment()
+                if self._file is None:
+                    self._open_segment(now)
+                self._file.write(data)
+                self._written += len(data)
+                self._recorded += len(payloads)
+                if now - self._last_flush >= self.flush_interval:
+                    self._file.flush(zlib.Z_SYNC_FLUSH)
+                    self._last_flush = now
+            except OSError as e:
+                self._errors += 1
+                if self._file is not None:
+                    # Releases the fd and ends the gzip stream, so the segment stays readable
+                    with contextlib.suppress(OSError):
+                        self._file.close()
+                    self._file = None
+                logger.warning("incident_record_failed", error=str(e), directory=self.directory)
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "current_segment": self._path,
+                "segment_bytes": self._written,
+                "segments_opened": self._segments,
+                "recorded": self._recorded,
+                "errors": self._errors,
+            }
+
+
+def from_env():
+    directory = os.getenv("INCIDENT_RECORD_DIR")
+    if not directory:
+        return None
+    return IncidentRecorder(
+        directory,
+        segment_bytes=int(float(os.getenv("INCIDENT_RECORD_SEGMENT_MB", "16")) * 1024 * 1024),
+        segment_seconds=float(os.getenv("INCIDENT_RECORD_SEGMENT_SECONDS", "3600")),
+        max_segments=int(os.getenv("INCIDENT_RECORD_MAX_SEGMENTS", "100")),
+    )
+
+
+# None unless INCIDENT_RECORD_DIR is set
+incident_recorder = from_env()
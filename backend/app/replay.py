@@ -0,0 +1,183 @@
+"""
+Replays recorded agent payloads against an agent webhook.
+
+Reads the gzip JSONL segments written by app.recorder (INCIDENT_RECORD_DIR),
+merges them by timestamp and re-sends every payload, keeping the recorded
+spacing divided by `--speed` (or as fast as the concurrency limit allows
+with `--speed max`). Requests go out over a keep-alive connection pool with
+at most `--concurrency` in flight. The report has the agent's latency
+percentiles, status codes and error rate, and how far sending fell behind
+the recorded schedule.
+
+    python -m app.replay recordings/ --stub --speed 10
+    python -m app.replay recordings/ --url http://127.0.0.1:9000/analyze-incident --speed max --concurrency 200
+"""
+import argparse
+import asyncio
+import collections
+import gzip
+import heapq
+import json
+import logging
+import os
+import time
+import zlib
+
+import httpx
+
+from .agent_stub import start_stub
+from .histogram import LatencyHistogram
+from .loadgen import positive_int
+from .recorder import list_segments
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class ReplayResult:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.outcomes = collections.Counter()
+        self.max_lag = 0.0
+        self.damaged_segments = 0
+        self.skipped_lines = 0
+        self.elapsed = 0.0
+        self.recorded_span = 0.0
+
+    def report(self):
+        sent = self.latency.count
+        errors = sum(count for outcome, count in self.outcomes.items() if not outcome.startswith("2"))
+        return {
+            "sent": sent,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "recorded_span_seconds": round(self.recorded_span, 3),
+            "rate_per_second": round(sent / self.elapsed, 2) if self.elapsed else 0.0,
+            "outcomes": dict(self.outcomes),
+            "error_rate": round(errors / sent, 4) if sent else 0.0,
+            "latency": self.latency.summary_ms(),
+            "max_schedule_lag_ms": round(self.max_lag * 1000, 3),
+            "damaged_segments": self.damaged_segments,
+            "skipped_lines": self.skipped_lines,
+        }
+
+
+def read_segment(path: str, result: ReplayResult):
+    """
+    Yields (ts, payload) from one segment. A segment cut short by a crash,
+    or still being written, is read up to its last complete line.
+    """
+    try:
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    yield record["ts"], record["payload"]
+                except (ValueError, KeyError, TypeError):
+                    result.skipped_lines += 1
+    except (EOFError, OSError, zlib.error):
+        result.damaged_segments += 1
+
+
+def read_records(paths, result: ReplayResult):
+    """
+    Streams the records of every segment under `paths` (files or
+    directories) in timestamp order.
+    """
+    segments = []
+    for path in paths:
+        segments.extend(list_segments(path) if os.path.isdir(path) else [path])
+    # Each segment is in time order; segments from several workers overlap
+    return heapq.merge(*(read_segment(segment, result) for segment in segments), key=lambda record: record[0])
+
+
+async def replay(records, url: str, speed: float = 1.0, concurrency: int = 50, limit: int = None,
+                 timeout: float = 30.0, result: ReplayResult = None) -> ReplayResult:
+    """
+    Sends every record's payload to `url`. `speed=0` ignores the recorded spacing.
+    """
+    result = result or ReplayResult()
+    slots = asyncio.Semaphore(concurrency)
+    pool = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    loop = asyncio.get_running_loop()
+    inflight = set()
+
+    async def send(client, payload):
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, json=payload)
+            outcome = str(response.status_code)
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        finally:
+            slots.release()
+        result.latency.record(time.perf_counter() - start)
+        result.outcomes[outcome] += 1
+
+    async with httpx.AsyncClient(limits=pool, timeout=timeout) as client:
+        started = loop.time()
+        first_ts = last_ts = None
+        for count, (ts, payload) in enumerate(records):
+            if limit is not None and count >= limit:
+                break
+            if first_ts is None:
+                first_ts = ts
+            last_ts = ts
+            if speed:
+                delay = started + (ts - first_ts) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    result.max_lag = max(result.max_lag, -delay)
+            await slots.acquire()
+            task = loop.create_task(send(client, payload))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        if inflight:
+            await asyncio.wait(inflight)
+        result.elapsed = loop.time() - started
+        result.recorded_span = (last_ts - first_ts) if first_ts is not None else 0.0
+    return result
+
+
+def parse_speed(value: str) -> float:
+    if value == "max":
+        return 0.0
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive, or max")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays recorded agent payloads against an agent webhook.")
+    parser.add_argument("paths", nargs="+", help="Segment files or directories of segments")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Agent webhook URL")
+    target.add_argument("--stub", action="store_true", help="Replay against a local agent stub")
+    parser.add_argument("--stub-delay-ms", type=float, default=0.0, help="Processing delay of the local stub")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10, ... times the recorded rate, or max")
+    parser.add_argument("--concurrency", type=positive_int, default=50, help="Maximum requests in flight")
+    parser.add_argument("--limit", type=int, help="Stop after this many payloads")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    stub = start_stub(delay=args.stub_delay_ms / 1000) if args.stub else None
+    url = stub.url if stub else args.url
+
+    result = ReplayResult()
+    records = read_records(args.paths, result)
+    asyncio.run(replay(records, url, args.speed, args.concurrency, args.limit, result=result))
+    report = result.report()
+    if stub:
+        report["stub"] = {"requests": stub.requests, "incidents": stub.incidents}
+        stub.shutdown()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import collections
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+VERSION_FORMAT = "Q"
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers")
+
+    def __init__(self, body: bytes, headers: dict = None):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.headers = headers or {}
+
+
+class SharedVersion:
+    """
+    A version counter in a small memory-mapped file, shared by every worker
+    process that maps it. Reads are a single unpack; increments take an
+    exclusive flock so concurrent writers never lose a bump.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = struct.calcsize(VERSION_FORMAT)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def read(self) -> int:
+        return struct.unpack_from(VERSION_FORMAT, self._map)[0]
+
+    def bump(self) -> int:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            value = self.read() + 1
+            struct.pack_into(VERSION_FORMAT, self._map, 0, value)
+            return value
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class VersionedCache:
+    """
+    LRU cache of serialized responses for one table, keyed by a version
+    counter plus the request parameters.
+
+    Write paths call `bump` after committing; entries of older versions are
+    never looked up again and age out of the LRU. With `version_path` the
+    counter lives in a file mapped by every worker process, so a write on
+    one worker invalidates the others on their next request. The ETag is a
+    hash of the body, so it is the same in every worker for the same content.
+    """
+
+    def __init__(self, max_entries: int = 128, version_path: str = None):
+        self.max_entries = max_entries
+        self._shared = SharedVersion(version_path) if version_path else None
+        self._version = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._evictions = 0
+
+    @property
+    def version(self) -> int:
+        if self._shared is not None:
+            return self._shared.read()
+        return self._version
+
+    def bump(self):
+        """
+        Marks the table as changed.
+        """
+        if self._shared is not None:
+            self._shared.bump()
+            return
+        with self._lock:
+            self._version += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key, entry: CachedResponse):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def not_modified(self, entry: CachedResponse, if_none_match: str) -> bool:
+        """
+        True if the client's If-None-Match header matches `entry`.
+        """
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        matched = "*" in tags or any((tag[2:] if tag.startswith("W/") else tag) == entry.etag for tag in tags)
+        if matched:
+            with self._lock:
+                self._not_modified += 1
+        return matched
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "version": self.version,
+                "shared_version_file": self._shared.path if self._shared is not None else None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self._not_modified,
+                "evictions": self._evictions,
+            }
+
+
+def default_version_path():
+    db_file = os.getenv("DB_FILE", "todos.db")
+    return os.getenv("TODOS_VERSION_FILE", os.path.splitext(db_file)[0] + ".todos.version")
+
+
+todos_cache = VersionedCache(int(os.getenv("TODOS_CACHE_SIZE", "128")), version_path=default_version_path())
@@ -0,0 +1,107 @@
+import contextvars
+import logging
+import random
+import threading
+
+_current_buffer = contextvars.ContextVar("log_sample_buffer", default=None)
+
+
+class RequestLogBuffer:
+    __slots__ = ("records", "sampled", "closed", "incident", "lock")
+
+    def __init__(self, sampled: bool):
+        self.records = []
+        self.sampled = sampled
+        # Sampled requests log straight through, so their buffer starts closed
+        self.closed = sampled
+        self.incident = False
+        self.lock = threading.Lock()
+
+
+class TailSamplingHandler(logging.Handler):
+    """
+    Tail-based sampling of per-request log records.
+
+    The sampling decision for a successful request is made when it starts:
+    a `sample_rate` fraction of requests log straight through, the rest are
+    buffered. When a buffered request finishes, its records are emitted only
+    if it failed or logged anything at `keep_level` or above (incidents);
+    otherwise they are dropped. Records logged outside a request, or after
+    the request has finished (background tasks), always pass through.
+    """
+
+    def __init__(self, target: logging.Handler, sample_rate: float = 0.1, keep_level: int = logging.WARNING):
+        super().__init__()
+        self.target = target
+        self.sample_rate = sample_rate
+        self.keep_level = keep_level
+        self._lock = threading.Lock()
+        self._requests_kept = 0
+        self._requests_dropped = 0
+        self._records_dropped = 0
+
+    def emit(self, record):
+        buffer = _current_buffer.get()
+        if buffer is not None:
+            with buffer.lock:
+                if not buffer.closed:
+                    buffer.records.append(record)
+                    if record.levelno >= self.keep_level:
+                        buffer.incident = True
+                    return
+        self.target.handle(record)
+
+    def begin(self):
+        """
+        Starts sampling a request. Returns a token for `finish`.
+        """
+        sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        return _current_buffer.set(RequestLogBuffer(sampled))
+
+    def finish(self, token, failed: bool = False):
+        """
+        Ends the request started with `token`, flushing or dropping its records.
+        """
+        buffer = _current_buffer.get()
+        _current_buffer.reset(token)
+        if buffer is None:
+            return
+        with buffer.lock:
+            buffer.closed = True
+            records = buffer.records
+            buffer.records = []
+            keep = buffer.sampled or failed or buffer.incident
+        with self._lock:
+            if keep:
+                self._requests_kept += 1
+            else:
+                self._requests_dropped += 1
+                self._records_dropped += len(records)
+        if keep:
+            for record in records:
+                self.target.handle(record)
+
+    def mark_incident(self):
+        """
+        Forces the current request's records to be kept.
+        """
+        buffer = _current_buffer.get()
+        if buffer is not None:
+            buffer.incident = True
+
+    def flush(self):
+        self.target.flush()
+
+    def close(self):
+        self.target.close()
+        super().close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sample_rate": self.sample_rate,
+                "requests_kept": self._requests_kept,
+                "requests_dropped": self._requests_dropped,
+                "records_dropped": self._records_dropped,
+            }
+
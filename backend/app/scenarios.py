@@ -0,0 +1,194 @@
+from fastapi import APIRouter, HTTPException
+from starlette.concurrency import run_in_threadpool
+from .logger import logger
+from .shared_state import shared_state
+import asyncio
+import collections
+import datetime
+import time
+import uuid
+
+router = APIRouter()
+
+# Maximum concurrently running scenarios per kind
+DEFAULT_LIMITS = {
+    "api_timeout": 20,
+    "memory_leak": 2,
+    "memory_pressure": 1,
+    "db_error": 1,
+    "traffic_gen": 2,
+    "campaign": 2,
+}
+DEFAULT_LIMIT = 10
+
+
+class ScenarioLimitError(Exception):
+    pass
+
+
+class Scenario:
+    def __init__(self, kind: str, params: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = "running"
+        self.error = None
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.finished_at = None
+        self.cancel_requested = False
+        self.task = None
+        self._start = time.monotonic()
+        self._elapsed = None
+
+    def finish(self, status: str, error: str = None):
+        self.status = status
+        self.error = error
+        self.finished_at = datetime.datetime.now(datetime.timezone.utc)
+        self._elapsed = time.monotonic() - self._start
+
+    def to_dict(self):
+        elapsed = self._elapsed if self._elapsed is not None else time.monotonic() - self._start
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "elapsed_seconds": round(elapsed, 3),
+            "error": self.error,
+        }
+
+
+class ScenarioEngine:
+    """
+    Runs simulation scenarios as asyncio tasks on the event loop.
+
+    Waiting scenarios cost a suspended coroutine instead of a threadpool
+    worker. Every scenario gets an id, can be listed and cancelled, and each
+    kind is capped at a number of concurrent runs. Finished scenarios are
+    kept in a bounded history. `on_change(scenario)` is called when a
+    scenario starts and finishes. Only use it from the event loop thread.
+    """
+
+    def __init__(self, limits: dict = None, default_limit: int = DEFAULT_LIMIT, history: int = 200, on_change=None):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.default_limit = default_limit
+        self.on_change = on_change
+        self._running = {}
+        self._finished = collections.OrderedDict()
+        self._history = history
+
+    def _register(self, kind: str, params: dict):
+        limit = self.limits.get(kind, self.default_limit)
+        running = sum(1 for s in self._running.values() if s.kind == kind)
+        if running >= limit:
+            raise ScenarioLimitError(f"{kind} already has {running} running scenarios (limit {limit})")
+        scenario = Scenario(kind, params)
+        self._running[scenario.id] = scenario
+        if self.on_change is not None:
+            self.on_change(scenario)
+        return scenario
+
+    def _complete(self, scenario: Scenario, task: asyncio.Task):
+        if task.cancelled():
+            scenario.finish("cancelled")
+        elif task.exception() is not None:
+            scenario.finish("failed", repr(task.exception()))
+        else:
+            scenario.finish("completed")
+        self._running.pop(scenario.id, None)
+        self._finished[scenario.id] = scenario
+        while len(self._finished) > self._history:
+            self._finished.popitem(last=False)
+        if self.on_change is not None:
+            self.on_change(scenario)
+        logger.info("scenario_finished", scenario_id=scenario.id, kind=scenario.kind, status=scenario.status)
+
+    def start(self, kind: str, coro_fn, params: dict = None) -> Scenario:
+        """
+        Starts `coro_fn()` as a background scenario and returns immediately.
+        Raises ScenarioLimitError when the kind is at its concurrency cap.
+        """
+        scenario = self._register(kind, params or {})
+        scenario.task = asyncio.get_running_loop().create_task(coro_fn())
+        scenario.task.add_done_callback(lambda task: self._complete(scenario, task))
+        logger.info("scenario_started", scenario_id=scenario.id, kind=kind)
+        return scenario
+
+    async def run(self, kind: str, coro_fn, params: dict = None):
+        """
+        Runs `coro_fn()` as a scenario and waits for it.
+        Returns (scenario, result); result is None if the scenario was cancelled
+        through `cancel`. Cancelling the caller cancels the scenario too.
+        """
+        scenario = self.start(kind, coro_fn, params)
+        try:
+            return scenario, await scenario.task
+        except asyncio.CancelledError:
+            if scenario.cancel_requested:
+                return scenario, None
+            raise
+
+    def cancel(self, scenario_id: str) -> bool:
+        scenario = self._running.get(scenario_id)
+        if scenario is None:
+            return False
+        scenario.cancel_requested = True
+        scenario.task.cancel()
+        return True
+
+    def get(self, scenario_id: str):
+        return self._running.get(scenario_id) or self._finished.get(scenario_id)
+
+    def list(self):
+        return list(self._running.values()) + list(reversed(self._finished.values()))
+
+    def stats(self):
+        running = collections.Counter(s.kind for s in self._running.values())
+        return {
+            "running": dict(running),
+            "limits": self.limits,
+            "finished_retained": len(self._finished),
+        }
+
+
+def share_scenario(scenario: Scenario):
+    # Lets the other worker processes list and cancel this scenario.
+    # Called on the event loop, so the write is left to the sync thread.
+    shared_state.queue_scenario(scenario.to_dict())
+
+
+scenario_engine = ScenarioEngine(on_change=share_scenario)
+
+
+@router.get("/scenarios")
+async def list_scenarios(status: str = None, kind: str = None):
+    """
+    Lists running and recently finished scenarios of every worker process.
+    """
+    scenarios = [s.to_dict() for s in scenario_engine.list()] + await run_in_threadpool(shared_state.peer_scenarios)
+    scenarios = [s for s in scenarios
+                 if (status is None or s["status"] == status) and (kind is None or s["kind"] == kind)]
+    return {"scenarios": scenarios, "stats": scenario_engine.stats()}
+
+
+@router.get("/scenarios/{scenario_id}")
+async def get_scenario(scenario_id: str):
+    scenario = scenario_engine.get(scenario_id)
+    if scenario is not None:
+        return scenario.to_dict()
+    shared = await run_in_threadpool(shared_state.get_scenario, scenario_id)
+    if shared is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    return shared
+
+
+@router.post("/scenarios/{scenario_id}/cancel")
+async def cancel_scenario(scenario_id: str):
+    if not scenario_engine.cancel(scenario_id):
+        # Running in another worker: it cancels the scenario on its next sync
+        if not await run_in_threadpool(shared_state.request_cancel, scenario_id):
+            raise HTTPException(status_code=404, detail="No running scenario with that id")
+    logger.info("scenario_cancel_requested", scenario_id=scenario_id)
+    return {"message": "Cancellation requested", "id": scenario_id}
@@ -0,0 +1,307 @@
+from .logger import logger
+from .metrics import ProcessMetrics
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS worker_snapshots (
+    pid INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    snapshot TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scenarios (
+    id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS faults (
+    id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    spec TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def default_path():
+    db_file = os.getenv("DB_FILE", "todos.db")
+    return os.getenv("SHARED_STATE_FILE", os.path.splitext(db_file)[0] + ".state.db")
+
+
+class SharedState:
+    """
+    Small SQLite store shared by all worker processes of one server
+    (`uvicorn --workers N`).
+
+    Every `interval` seconds each worker's sync thread upserts a snapshot of
+    its mergeable metrics under its pid, carries out cancellations that other
+    workers requested for its scenarios, and runs the callbacks of watched
+    counters that changed. Readers merge the snapshots of workers that
+    reported within `stale_after` seconds. Scenario changes queued from the
+    event loop with `queue_scenario` are written by the sync thread as soon
+    as it wakes up.
+    """
+
+    def __init__(self, path: str, interval: float = 2.0, history: int = 500):
+        self.path = path
+        self.interval = interval
+        self.stale_after = interval * 3
+        self.history = history
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self.process = ProcessMetrics()
+        self._conn = None
+        self._conn_pid = None
+        self._lock = threading.Lock()
+        self._snapshot_fn = None
+        self._cancel_fn = None
+        self._watches = {}  # key -> [last_seen, callback]
+        self._pending_scenarios = {}  # id -> latest scenario dict not yet written
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._syncs = 0
+        self._errors = 0
+
+    def _connection(self):
+        # Reconnect after fork: a SQLite connection must not cross processes
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.pid = os.getpid()
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._conn_pid = self.pid
+        return self._conn
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    # --- metrics snapshots ---
+
+    def publish(self, snapshot: dict):
+        self._execute(
+            "INSERT INTO worker_snapshots (pid, started_at, updated_at, snapshot) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(pid) DO UPDATE SET updated_at = excluded.updated_at, snapshot = excluded.snapshot",
+            (self.pid, self.started_at, time.time(), json.dumps(snapshot)),
+        )
+
+    def peer_snapshots(self):
+        """
+        Latest snapshots of the other live workers: [(pid, updated_at, snapshot)].
+        """
+        rows = self._execute(
+            "SELECT pid, updated_at, snapshot FROM worker_snapshots WHERE pid != ? AND updated_at >= ?",
+            (self.pid, time.time() - self.stale_after),
+        )
+        return [(pid, updated_at, json.loads(snapshot)) for pid, updated_at, snapshot in rows]
+
+    # --- scenarios ---
+
+    def put_scenario(self, scenario: dict):
+        self._execute(
+            "INSERT INTO scenarios (id, pid, status, updated_at, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, data = excluded.data",
+            (scenario["id"], self.pid, scenario["status"], time.time(), json.dumps(scenario, default=str)),
+        )
+
+    def queue_scenario(self, scenario: dict):
+        """
+        Hands a scenario change to the sync thread, so the caller never
+        waits on SQLite. Only the latest state of each scenario is written.
+        """
+        with self._lock:
+            self._pending_scenarios.pop(scenario["id"], None)
+            self._pending_scenarios[scenario["id"]] = scenario
+            # Without a sync thread nothing drains the queue; keep the newest
+            while len(self._pending_scenarios) > self.history:
+                self._pending_scenarios.pop(next(iter(self._pending_scenarios)))
+        self._wake.set()
+
+    def flush_scenarios(self):
+        with self._lock:
+            pending, self._pending_scenarios = self._pending_scenarios, {}
+        for scenario in pending.values():
+            try:
+                self.put_scenario(scenario)
+            except sqlite3.Error as e:
+                logger.warning("scenario_share_failed", scenario_id=scenario["id"], error=str(e))
+
+    def _scenario_rows(self, where: str, params):
+        rows = self._execute(
+            "SELECT s.pid, s.status, s.data, w.updated_at FROM scenarios s "
+            "LEFT JOIN worker_snapshots w ON w.pid = s.pid WHERE " + where + " ORDER BY s.updated_at DESC",
+            params,
+        )
+        scenarios = []
+        cutoff = time.time() - self.stale_after
+        for pid, status, data, worker_seen in rows:
+            scenario = json.loads(data)
+            scenario["worker_pid"] = pid
+            # A running scenario whose worker stopped reporting died with it
+            if status == "running" and pid != self.pid and (worker_seen is None or worker_seen < cutoff):
+                scenario["status"] = "orphaned"
+            scenarios.append(scenario)
+        return scenarios
+
+    def peer_scenarios(self):
+        return self._scenario_rows("s.pid != ?", (self.pid,))
+
+    def get_scenario(self, scenario_id: str):
+        scenarios = self._scenario_rows("s.id = ?", (scenario_id,))
+        return scenarios[0] if scenarios else None
+
+    def request_cancel(self, scenario_id: str) -> bool:
+        """
+        Asks the worker running `scenario_id` to cancel it on its next sync.
+        """
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE scenarios SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (scenario_id,)
+            )
+            return cursor.rowcount > 0
+
+    # --- faults ---
+
+    def put_fault(self, fault_id: str, expires_at: float, spec: dict):
+        self._execute(
+            "INSERT OR REPLACE INTO faults (id, expires_at, spec) VALUES (?, ?, ?)",
+            (fault_id, expires_at, json.dumps(spec)),
+        )
+
+    def delete_faults(self, fault_id: str = None):
+        """
+        Deletes one fault, or every fault when `fault_id` is None.
+        """
+        if fault_id is None:
+            self._execute("DELETE FROM faults")
+        else:
+            self._execute("DELETE FROM faults WHERE id = ?", (fault_id,))
+
+    def active_faults(self):
+        """
+        Faults that have not expired: [(id, expires_at, spec)].
+        """
+        rows = self._execute("SELECT id, expires_at, spec FROM faults WHERE expires_at > ?", (time.time(),))
+        return [(fault_id, expires_at, json.loads(spec)) for fault_id, expires_at, spec in rows]
+
+    # --- counters ---
+
+    def bump(self, key: str) -> int:
+        """
+        Increments a shared counter. Watchers in other workers see the change
+        on their next sync; this worker's watcher is not called.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO counters (key, value) VALUES (?, 1) ON CONFLICT(key) DO UPDATE SET value = value + 1",
+                    (key,),
+                )
+                value = conn.execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()[0]
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if key in self._watches:
+            self._watches[key][0] = value
+        return value
+
+    def counter(self, key: str) -> int:
+        rows = self._execute("SELECT value FROM counters WHERE key = ?", (key,))
+        return rows[0][0] if rows else 0
+
+    def watch(self, key: str, callback):
+        self._watches[key] = [self.counter(key), callback]
+
+    # --- sync thread ---
+
+    def start(self, snapshot_fn, cancel_fn):
+        """
+        Starts syncing. `snapshot_fn()` returns this worker's metrics snapshot;
+        `cancel_fn(scenario_id)` is called for cancellations requested elsewhere.
+        """
+        self._snapshot_fn = snapshot_fn
+        self._cancel_fn = cancel_fn
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="shared-state-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+        try:
+            self.flush_scenarios()
+            self._execute("DELETE FROM worker_snapshots WHERE pid = ?", (self.pid,))
+        except sqlite3.Error:
+            pass
+
+    def _run(self):
+        next_sync = time.monotonic() + self.interval
+        while True:
+            self._wake.wait(max(0.0, next_sync - time.monotonic()))
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.flush_scenarios()
+                if time.monotonic() >= next_sync:
+                    next_sync = time.monotonic() + self.interval
+                    self.sync()
+            except Exception as e:
+                self._errors += 1
+                logger.warning("shared_state_sync_failed", error=str(e))
+
+    def sync(self):
+        self.publish(self._snapshot_fn())
+
+        cancels = self._execute(
+            "SELECT id FROM scenarios WHERE pid = ? AND cancel_requested = 1 AND status = 'running'", (self.pid,)
+        )
+        for (scenario_id,) in cancels:
+            self._execute("UPDATE scenarios SET cancel_requested = 0 WHERE id = ?", (scenario_id,))
+            self._cancel_fn(scenario_id)
+
+        for key, watch in list(self._watches.items()):
+            value = self.counter(key)
+            if value != watch[0]:
+                watch[0] = value
+                watch[1]()
+
+        # Forget workers that stopped reporting and trim finished scenarios
+        self._execute("DELETE FROM worker_snapshots WHERE updated_at < ?", (time.time() - 600,))
+        self._execute("DELETE FROM faults WHERE expires_at < ?", (time.time(),))
+        self._execute(
+            "DELETE FROM scenarios WHERE status != 'running' AND id NOT IN "
+            "(SELECT id FROM scenarios WHERE status != 'running' ORDER BY updated_at DESC LIMIT ?)",
+            (self.history,),
+        )
+        self._syncs += 1
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "pid": self.pid,
+            "sync_interval_seconds": self.interval,
+            "syncs": self._syncs,
+            "sync_errors": self._errors,
+        }
+
+
+shared_state = SharedState(default_path(), interval=float(os.getenv("SHARED_STATE_INTERVAL", "2")))
@@ -1,67 +1,116 @@
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
 from .logger import logger
 from .alerts import send_email_alert, notify_agent
-import time
-import threading
-import uuid
+from .scenarios import scenario_engine, ScenarioLimitError
+from .faults import FaultSpec, install_fault, remove_fault, MAX_TTL_SECONDS
+import asyncio
 import sys
 
 router = APIRouter()
 
-# Global state for memory leak simulation
-memory_hog = []
+MEMORY_SCENARIOS = ("memory_leak", "memory_pressure")
+
+def start_scenario(kind: str, coro_fn, params: dict):
+    """
+    Starts a background scenario, turning the concurrency cap into a 429.
+    """
+    try:
+        return scenario_engine.start(kind, coro_fn, params)
+    except ScenarioLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
 
 # --- HANDLED ERRORS (~40%) ---
 
 @router.post("/simulate/memory_leak")
-def simulate_memory_leak(background_tasks: BackgroundTasks):
+async def simulate_memory_leak():
     """
     Simulates a memory leak (Handled Exception).
     """
+    from .memory_pressure import memory_pressure
+
     logger.warning("incident_simulated", type="memory_leak", status="started")
     
-    def leak():
-        for _ in range(10):
-            memory_hog.append(" " * 10 * 1024 * 1024) 
-            time.sleep(1)
+    async def leak():
+        await memory_pressure.ramp_by(100, rate_mb_s=10)
         
         try:
             raise MemoryError("Out of memory: Kill process or sacrifice child")
         except Exception as e:
-            import traceback
             logger.exception(e)
-            full_traceback = traceback.format_exc()
+            error = e
             
         send_email_alert("High Memory Usage Detected", "Memory usage has crossed critical threshold.")
-        notify_agent(severity="high", error_message=full_traceback, incident_type="memory_leak")
+        notify_agent(severity="high", exc=error, incident_type="memory_leak")
+
+    scenario = start_scenario("memory_leak", leak, {})
+    return {"message": "Memory leak simulation started", "scenario_id": scenario.id}
+
+@router.post("/simulate/memory_pressure")
+async def simulate_memory_pressure(target_mb: float = 512, rate_mb_s: float = 50, shape: str = "large"):
+    """
+    Ramps process RSS up to `target_mb` at `rate_mb_s`, allocating in the given shape:
+    "large" blocks, many "small" objects, or a "fragmented" mix.
+    """
+    from .memory_pressure import memory_pressure, SHAPES
 
-    background_tasks.add_task(leak)
-    return {"message": "Memory leak simulation started"}
+    if shape not in SHAPES:
+        raise HTTPException(status_code=422, detail=f"shape must be one of {', '.join(SHAPES)}")
+    if target_mb <= 0 or rate_mb_s <= 0:
+        raise HTTPException(status_code=422, detail="target_mb and rate_mb_s must be positive")
+    logger.warning("incident_simulated", type="memory_pressure", target_mb=target_mb, rate_mb_s=rate_mb_s, shape=shape)
+
+    async def pressure():
+        reached = await memory_pressure.ramp(target_mb, rate_mb_s, shape)
+        stats = memory_pressure.stats()
+        logger.warning("memory_pressure_reached", target_reached=reached, **stats)
+        notify_agent(
+            severity="high",
+            error_message=f"Memory pressure: RSS {stats['rss_mb']} MB (target {target_mb} MB, {stats['allocated_mb']} MB allocated as {shape})",
+            incident_type="memory_pressure",
+        )
+
+    params = {"target_mb": target_mb, "rate_mb_s": rate_mb_s, "shape": shape}
+    scenario = start_scenario("memory_pressure", pressure, params)
+    return {"message": "Memory pressure simulation started", "scenario_id": scenario.id, **params}
 
 @router.post("/simulate/memory_reset")
-def reset_memory():
-    global memory_hog
-    memory_hog = []
-    logger.info("memory_reset", status="cleared")
-    return {"message": "Memory cleared"}
+async def reset_memory():
+    """
+    Stops running memory scenarios and frees their allocations.
+    Reports how much RSS was actually returned to the OS.
+    """
+    from .memory_pressure import memory_pressure
+
+    for scenario in scenario_engine.list():
+        if scenario.kind in MEMORY_SCENARIOS and scenario.status == "running":
+            scenario_engine.cancel(scenario.id)
+    result = await run_in_threadpool(memory_pressure.reset)
+    logger.info("memory_reset", status="cleared", **result)
+    return {"message": "Memory cleared", **result}
 
 @router.post("/simulate/timeout")
-def simulate_timeout(duration: int = 30):
+async def simulate_timeout(duration: int = 30):
     """
     Simulates an API timeout (Handled Exception).
+    Waits on the event loop, so slow calls don't hold threadpool workers.
     """
     logger.warning("incident_simulated", type="api_timeout", duration=duration)
     
-    time.sleep(duration)
+    try:
+        scenario, _ = await scenario_engine.run("api_timeout", lambda: asyncio.sleep(duration), {"duration": duration})
+    except ScenarioLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    if scenario.status == "cancelled":
+        return {"message": "Timeout simulation cancelled", "scenario_id": scenario.id}
     
     try:
         raise TimeoutError(f"Request timed out after {duration}s")
     except Exception as e:
-        import traceback
         logger.exception(e)
-        full_traceback = traceback.format_exc()
+        error = e
     
-    notify_agent(severity="medium", error_message=full_traceback, incident_type="api_timeout")
+    notify_agent(severity="medium", exc=error, incident_type="api_timeout")
     return {"message": f"Finished sleeping for {duration}s"}
 
 @router.post("/simulate/disk_full")
@@ -74,12 +123,11 @@ def simulate_disk_full():
     try:
         raise OSError(28, "No space left on device", "/data")
     except Exception as e:
-        import traceback
         logger.exception(e)
-        full_traceback = traceback.format_exc()
+        error = e
     
     send_email_alert("Disk Full Warning", "Disk usage at 99.9% on /data")
-    notify_agent(severity="critical", error_message=full_traceback, incident_type="disk_full")
+    notify_agent(severity="critical", exc=error, incident_type="disk_full")
     
     return {"message": "Disk full incident simulated", "metrics": {"disk_usage": 99.9}}
 
@@ -88,48 +136,45 @@ def simulate_division_by_zero():
     """
     Simulates division by zero (Handled Exception).
     """
-    import traceback
     try:
         result = 1 / 0
         return {"result": result}
     except Exception as e:
         logger.exception(e)
-        full_traceback = traceback.format_exc()
-        notify_agent(severity="high", error_message=full_traceback, incident_type="division_by_zero")
+        notify_agent(severity="high", exc=e, incident_type="division_by_zero")
         return {"error": "Division by zero simulated"}
 
 @router.post("/simulate/db_error")
-def simulate_db_error(duration: int = 30):
+async def simulate_db_error(duration: int = 30):
     """
     Simulates DB error (Handled Exception).
+    Every database read and write fails for `duration` seconds, in every
+    worker. The fault expires on its own, even if this process dies first.
     """
-    from .database import DB_FILE
-    import os
-    
     logger.warning("incident_simulated", type="db_connection_error", duration=duration)
-    
-    original_path = DB_FILE
-    broken_path = DB_FILE + ".broken"
-    
+
+    if not 0 < duration <= MAX_TTL_SECONDS:
+        raise HTTPException(status_code=422, detail=f"duration must be between 1 and {MAX_TTL_SECONDS} seconds")
+
+    spec = FaultSpec(target="db", message="unable to open database file", ttl=duration)
+
+    async def restore():
+        # Cancelling the scenario restores the database early
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            await run_in_threadpool(remove_fault, fault.id)
+            logger.info("db_restored", status="fault_removed")
+
     try:
-        if os.path.exists(original_path):
-            os.rename(original_path, broken_path)
-            logger.info("db_broken", status="file_renamed")
-            
-            def restore():
-                time.sleep(duration)
-                if os.path.exists(broken_path):
-                    os.rename(broken_path, original_path)
-                    logger.info("db_restored", status="file_restored")
-            
-            threading.Thread(target=restore).start()
-            notify_agent(severity="critical", error_message="Database unreachable.", incident_type="db_connection_error")
-            return {"message": f"DB error simulated for {duration}s"}
-        else:
-            return {"message": "DB file not found, maybe already broken?"}
-    except Exception as e:
-        logger.exception(e)
-        return {"error": str(e)}
+        fault = await run_in_threadpool(install_fault, spec)
+        scenario = start_scenario("db_error", restore, {"duration": duration, "fault_id": fault.id})
+    except HTTPException:
+        await run_in_threadpool(remove_fault, fault.id)
+        raise
+    logger.info("db_broken", status="fault_installed", fault_id=fault.id)
+    notify_agent(severity="critical", error_message="Database unreachable.", incident_type="db_connection_error")
+    return {"message": f"DB error simulated for {duration}s", "scenario_id": scenario.id, "fault_id": fault.id}
 
 
 # --- UNHANDLED ERRORS (~60%) ---
@@ -395,60 +440,29 @@ def simulate_cache_explosion():
 
 
 @router.post("/simulate/traffic_gen")
-def simulate_traffic_gen(duration: int = 60, background_tasks: BackgroundTasks = None):
+async def simulate_traffic_gen(request: Request, duration: int = Query(60, gt=0, le=3600), rps: float = Query(5.0, gt=0, le=1000)):
     """
     Generates continuous traffic.
-    """
-    import random
-    
-    logger.info("traffic_gen_started", duration=duration, ratio="4:1")
-    
-    def generate_traffic():
-        end_time = time.time() + duration
-        
-        while time.time() < end_time:
-            is_success = random.random() < 0.8
-            request_id = str(uuid.uuid4())
-            
-            if is_success:
-                action = random.choice(["get_todos", "create_todo", "update_todo"])
-                logger.debug(
-                    "request_finished", 
-                    method="GET" if action == "get_todos" else "POST",
-                    path="/todos",
-                    status_code=200,
-                    process_time=random.uniform(0.01, 0.1), 
-                    request_id=request_id,
-                    action=action
-                )
-            else:
-                # Simulate errors
-                error_type = random.choice(["timeout", "db_error", "500_internal"])
-                status_code = 504 if error_type == "timeout" else 500
-                
-                path = "/todos" if error_type == "db_error" else "/simulate/timeout"
-
-                # Log generic error to mimic application failure
-                # Note: traffic generator specific 'incidents' are still logged here manually
-                # as they are 'simulated client side' observations.
-                logger.error(
-                    error_type,
-                    details={
-                        "method": "POST",
-                        "path": path,
-                        "status_code": status_code,
-                        "process_time": random.uniform(0.1, 2.0),
-                        "request_id": request_id
-                    }
-                )
-            
-            time.sleep(random.uniform(0.1, 0.5))
-
-        logger.info("traffic_gen_finished", duration=duration)
-
-    if background_tasks:
-        background_tasks.add_task(generate_traffic)
-    else:
-        threading.Thread(target=generate_traffic).start()
-        
-    return {"message": f"Traffic generation started for {duration}s"}
+    Sends real requests through this app (in-process, via ASGI) with Poisson
+    arrivals at `rps`, roughly 4 successful requests per failing one.
+    """
+    from .loadgen import TRAFFIC_GEN_MIX, asgi_client, run_load
+
+    logger.info("traffic_gen_started", duration=duration, rps=rps, ratio="4:1")
+    app = request.app
+
+    async def generate_traffic():
+        async with asgi_client(app) as client:
+            result = await run_load(client, rps, duration, TRAFFIC_GEN_MIX, max_inflight=100)
+        report = result.report()
+        logger.info(
+            "traffic_gen_finished",
+            duration=duration,
+            completed=report["completed"],
+            achieved_rps=report["achieved_rps"],
+            status_codes=report["status_codes"],
+            latency=report["latency"],
+        )
+
+    scenario = start_scenario("traffic_gen", generate_traffic, {"duration": duration, "rps": rps})
+    return {"message": f"Traffic generation started for {duration}s", "scenario_id": scenario.id}
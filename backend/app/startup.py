@@ -0,0 +1,89 @@
+from fastapi import APIRouter
+import contextlib
+import importlib
+import os
+import sys
+import time
+
+router = APIRouter()
+
+
+def process_age():
+    """
+    Seconds since this process was started, or None where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces, so split after its closing parenthesis
+            fields = f.read().rsplit(")", 1)[1].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupReport:
+    """
+    Where cold-start time goes: the interpreter and server before the app is
+    built, each module `create_app` imports, each startup hook, and the
+    first response.
+
+    Import times are cumulative, so a module that is imported first pays for
+    dependencies it shares with later ones.
+    """
+
+    def __init__(self):
+        self.created = time.perf_counter()
+        self.age_at_created = process_age()
+        self.imports = {}
+        self.phases = {}
+        self.skipped = []
+        self.first_response = None
+
+    def import_module(self, name: str, package: str = None):
+        start = time.perf_counter()
+        module = importlib.import_module(name, package)
+        self.imports.setdefault(name.lstrip("."), time.perf_counter() - start)
+        return module
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def response_sent(self):
+        if self.first_response is None:
+            self.first_response = time.perf_counter()
+
+    @staticmethod
+    def _ms(seconds):
+        return round(seconds * 1000, 2) if seconds is not None else None
+
+    def report(self):
+        since_created = self.first_response - self.created if self.first_response is not None else None
+        before_app = self.age_at_created
+        return {
+            "process_start_to_app_module_ms": self._ms(before_app),
+            "imports_ms": {name: self._ms(seconds) for name, seconds in self.imports.items()},
+            "phases_ms": {name: self._ms(seconds) for name, seconds in self.phases.items()},
+            "app_module_to_first_response_ms": self._ms(since_created),
+            "process_start_to_first_response_ms": self._ms(
+                before_app + since_created if before_app is not None and since_created is not None else None
+            ),
+            "skipped_routers": self.skipped,
+            "modules_loaded": len(sys.modules),
+        }
+
+
+startup_report = StartupReport()
+
+
+@router.get("/debug/startup")
+async def get_startup_report():
+    """
+    Cold-start timing of this worker process.
+    """
+    return startup_report.report()
@@ -0,0 +1,122 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import PlainTextResponse
+from .scenarios import scenario_engine
+from .incident_store import incident_store
+from .event_stream import event_broadcaster
+from .faults import fault_injector, sync_faults
+from .logger import logger, logging_stats
+from .database import DB_FILE, db_pool, group_committer
+from .alerts import storm_coalescer
+from .delivery import delivery_queue
+from .metrics import disk_usage, merge_snapshots, process_metrics, render_prometheus, route_metrics, route_summary
+from .shared_state import shared_state
+from .admission import admission
+from .profiler import sampling_profiler, request_profiler
+from .response_cache import todos_cache
+import asyncio
+import collections
+import sys
+
+router = APIRouter()
+
+def worker_snapshot():
+    """
+    This worker's mergeable metrics, published to the shared state store.
+    """
+    counts = incident_store.counts(window_minutes=1)
+    return {
+        "routes": [[method, route, *stats] for (method, route), stats in route_metrics.snapshot().items()],
+        "rss_bytes": process_metrics.rss_bytes(),
+        "cpu_seconds": process_metrics.cpu_seconds(),
+        "cpu_percent": shared_state.process.cpu_percent(),
+        "incidents": {"by_type": counts["by_type"], "by_severity": counts["by_severity"]},
+    }
+
+def start_shared_state():
+    loop = asyncio.get_running_loop()
+    # Faults installed by any worker apply to all of them
+    sync_faults()
+    shared_state.watch("faults", sync_faults)
+    shared_state.start(worker_snapshot, lambda scenario_id: loop.call_soon_threadsafe(scenario_engine.cancel, scenario_id))
+
+def stop_shared_state():
+    shared_state.stop()
+
+@router.get("/")
+def read_root():
+    logger.info("root_accessed")
+    return {"message": "Incident Response Simulation Backend"}
+
+@router.get("/metrics")
+def metrics(format: str = Query("json", pattern="^(json|prometheus)$")):
+    """
+    Process, disk and per-route request metrics.
+    `format=prometheus` returns the Prometheus text exposition format.
+    Request, memory, CPU and incident numbers cover every worker process;
+    other workers contribute their snapshot from the last shared-state sync.
+    """
+    rss = process_metrics.rss_bytes()
+    cpu_seconds = process_metrics.cpu_seconds()
+    disk_percent, disk_used, disk_total = disk_usage(DB_FILE)
+    local_counts = incident_store.counts(window_minutes=1)
+
+    # Add up this worker's live numbers and the last snapshot of every other worker
+    route_snapshots = [route_metrics.snapshot()]
+    workers = [{"pid": shared_state.pid, "rss_mb": round(rss / (1024 * 1024), 2) if rss is not None else None}]
+    incidents = {"by_type": collections.Counter(local_counts["by_type"]),
+                 "by_severity": collections.Counter(local_counts["by_severity"])}
+    peer_rss = peer_cpu_seconds = peer_cpu_percent = 0
+    for pid, _, snapshot in shared_state.peer_snapshots():
+        route_snapshots.append({(method, route): tuple(stats) for method, route, *stats in snapshot["routes"]})
+        peer_rss += snapshot["rss_bytes"] or 0
+        peer_cpu_seconds += snapshot["cpu_seconds"] or 0
+        peer_cpu_percent += snapshot["cpu_percent"] or 0
+        for key in ("by_type", "by_severity"):
+            incidents[key].update(snapshot["incidents"][key])
+        workers.append({"pid": pid, "rss_mb": round((snapshot["rss_bytes"] or 0) / (1024 * 1024), 2)})
+    routes = merge_snapshots(route_snapshots)
+    if rss is not None:
+        rss += peer_rss
+    cpu_percent = process_metrics.cpu_percent()
+    if cpu_percent is not None:
+        cpu_percent = round(cpu_percent + peer_cpu_percent, 2)
+
+    memory_module = sys.modules.get(__package__ + ".memory_pressure")
+    sections = {
+        "agent_delivery": delivery_queue.stats(),
+        "incident_coalescing": storm_coalescer.stats(),
+        "db_pool": db_pool.stats(),
+        "db_writes": group_committer.stats(),
+        "logging": logging_stats(),
+        # Only loaded once a memory scenario or the memory router has used it
+        "memory_pressure": memory_module.memory_pressure.stats() if memory_module is not None else None,
+        "incident_store": incident_store.stats(),
+        "event_stream": event_broadcaster.stats(),
+        "todos_cache": todos_cache.stats(),
+        "admission": admission.stats(),
+        "profiler": {**sampling_profiler.stats(), "requests": request_profiler.stats()},
+        "faults": fault_injector.stats(),
+        "incidents": {key: dict(counter) for key, counter in incidents.items()},
+        "shared_state": shared_state.stats(),
+    }
+
+    if format == "prometheus":
+        process = {
+            "rss_bytes": rss,
+            "cpu_seconds": cpu_seconds + peer_cpu_seconds if cpu_seconds is not None else None,
+            "disk_used_bytes": disk_used,
+            "disk_total_bytes": disk_total,
+        }
+        return PlainTextResponse(
+            render_prometheus(routes, process, sections),
+            media_type="text/plain; version=0.0.4",
+        )
+
+    return {
+        "memory_usage_mb": round(rss / (1024 * 1024), 2) if rss is not None else None,
+        "cpu_usage_percent": cpu_percent,
+        "disk_usage_percent": disk_percent,
+        "workers": workers,
+        "routes": route_summary(routes),
+        **sections,
+    }
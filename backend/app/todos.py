@@ -0,0 +1,119 @@
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+from .logger import logger
+from .database import db_pool, group_committer, iter_todo_pages, SELECT_TODOS, SELECT_TODOS_AFTER, SELECT_TODOS_PAGE, INSERT_TODO
+from .faults import fault_injector, InjectedDatabaseError
+from .response_cache import CachedResponse, todos_cache
+import itertools
+import json
+
+router = APIRouter()
+
+class TodoItem(BaseModel):
+    title: str
+    completed: bool = False
+
+def todo_to_dict(row):
+    return {"id": row["id"], "title": row["title"], "completed": bool(row["completed"])}
+
+def stream_todos(pages, fmt: str):
+    """
+    Renders pages of rows as a JSON array or NDJSON, one page per chunk.
+    """
+    first = True
+    if fmt == "json":
+        yield "["
+    try:
+        for rows in pages:
+            if fmt == "ndjson":
+                yield "".join(json.dumps(todo_to_dict(row)) + "\n" for row in rows)
+            else:
+                chunk = ",".join(json.dumps(todo_to_dict(row)) for row in rows)
+                yield chunk if first else "," + chunk
+            first = False
+    except Exception as e:
+        # Headers are already sent, so the truncated body is all we can signal
+        logger.error("db_query_failed", details={"error": str(e), "streaming": True})
+    if fmt == "json":
+        yield "]"
+
+@router.get("/todos")
+def get_todos(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: int = Query(0, ge=0),
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Lists todos ordered by id.
+    `limit`/`after` page through the table by id; the `X-Next-Cursor` header
+    carries the `after` value for the next page. `stream=json|ndjson` streams
+    the rows in chunks instead of building the whole list in memory.
+
+    Non-streamed responses are served from `todos_cache` until the next
+    write, with an ETag; a matching `If-None-Match` gets a 304.
+    """
+    try:
+        if stream:
+            pages = iter_todo_pages(after=after, limit=limit)
+            # Fetch the first page up front so database errors still return a 500
+            first_page = next(pages, [])
+            media_type = "application/x-ndjson" if stream == "ndjson" else "application/json"
+            return StreamingResponse(stream_todos(itertools.chain([first_page], pages), stream), media_type=media_type)
+
+        # The pool generation changes when the database file is swapped out
+        key = (db_pool.generation, todos_cache.version, limit, after)
+        cached = todos_cache.get(key)
+        if cached is not None and fault_injector.db:
+            # A cache hit skips the pool, so apply injected read faults here
+            fault_injector.apply(fault_injector.db, "read", InjectedDatabaseError)
+        if cached is None:
+            with db_pool.reader() as conn:
+                if limit is None and not after:
+                    todos = conn.execute(SELECT_TODOS).fetchall()
+                elif limit is None:
+                    todos = conn.execute(SELECT_TODOS_AFTER, (after,)).fetchall()
+                else:
+                    todos = conn.execute(SELECT_TODOS_PAGE, (after, limit)).fetchall()
+            headers = {}
+            if limit is not None and len(todos) == limit:
+                headers["X-Next-Cursor"] = str(todos[-1]["id"])
+            body = json.dumps([todo_to_dict(row) for row in todos], separators=(",", ":")).encode()
+            cached = CachedResponse(body, headers)
+            todos_cache.put(key, cached)
+
+        headers = {**cached.headers, "ETag": cached.etag, "Cache-Control": "no-cache"}
+        if todos_cache.not_modified(cached, if_none_match):
+            return Response(status_code=304, headers=headers)
+        return Response(cached.body, media_type="application/json", headers=headers)
+    except Exception as e:
+        logger.error("db_query_failed", details={"error": str(e)})
+        raise HTTPException(status_code=500, detail="Database Error")
+
+@router.post("/todos")
+def create_todo(item: TodoItem):
+    try:
+        # Concurrent inserts share a transaction; see group_commit.GroupCommitter
+        todo_id = group_committer.submit(INSERT_TODO, (item.title, item.completed))
+        todos_cache.bump()
+        logger.info("todo_created", id=todo_id, title=item.title)
+        return {"id": todo_id, "title": item.title, "completed": item.completed}
+    except Exception as e:
+        logger.error("db_insert_failed", details={"error": str(e)})
+        raise HTTPException(status_code=500, detail="Database Error")
+
+@router.post("/todos/batch")
+def create_todos_batch(items: List[TodoItem]):
+    """
+    Inserts many todos with a single executemany and one commit.
+    """
+    try:
+        todo_ids = group_committer.insert_many(INSERT_TODO, [(item.title, item.completed) for item in items])
+        todos_cache.bump()
+        logger.info("todos_created", count=len(todo_ids))
+        return [{"id": todo_id, "title": item.title, "completed": item.completed} for todo_id, item in zip(todo_ids, items)]
+    except Exception as e:
+        logger.error("db_insert_failed", details={"error": str(e), "batch_size": len(items)})
+        raise HTTPException(status_code=500, detail="Database Error")
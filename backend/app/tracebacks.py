@@ -0,0 +1,63 @@
+import collections
+import functools
+import linecache
+import os
+import sys
+import traceback
+
+LOG_TRACEBACK_FRAMES = int(os.getenv("LOG_TRACEBACK_FRAMES", "20"))
+
+
+@functools.lru_cache(maxsize=4096)
+def source_line(filename: str, lineno: int) -> str:
+    return linecache.getline(filename, lineno).strip()
+
+
+def summarize(exc: BaseException, limit: int = 20) -> str:
+    """
+    Renders the innermost `limit` frames of `exc`'s traceback in the usual
+    "Traceback (most recent call last)" format.
+
+    The stack is walked once without formatting; consecutive repeats of the
+    same frame (recursion) collapse into one entry with a repeat count, and
+    only the entries that are kept are rendered. Source lines are cached by
+    code location.
+    """
+    entries = collections.deque(maxlen=limit)  # [code, lineno, repeats]
+    total = 0
+    for frame, lineno in traceback.walk_tb(exc.__traceback__):
+        total += 1
+        code = frame.f_code
+        if entries and entries[-1][0] is code and entries[-1][1] == lineno:
+            entries[-1][2] += 1
+        else:
+            entries.append([code, lineno, 1])
+
+    lines = ["Traceback (most recent call last):"] if total else []
+    omitted = total - sum(repeats for _, _, repeats in entries)
+    if omitted:
+        lines.append(f"  ... {omitted} outer frames omitted ...")
+    for code, lineno, repeats in entries:
+        lines.append(f'  File "{code.co_filename}", line {lineno}, in {code.co_name}')
+        source = source_line(code.co_filename, lineno)
+        if source:
+            lines.append(f"    {source}")
+        if repeats > 1:
+            lines.append(f"  [Previous line repeated {repeats - 1} more times]")
+    lines.extend(line.rstrip("\n") for line in traceback.format_exception_only(type(exc), exc))
+    return "\n".join(lines)
+
+
+def format_exc_summary(logger, method_name, event_dict):
+    """
+    structlog processor used in place of `format_exc_info`.
+    Renders `exc_info` with `summarize` instead of formatting the whole stack.
+    """
+    exc_info = event_dict.pop("exc_info", None)
+    if exc_info:
+        if exc_info is True:
+            exc_info = sys.exc_info()
+        exc = exc_info if isinstance(exc_info, BaseException) else exc_info[1]
+        if exc is not None:
+            event_dict["exception"] = summarize(exc, LOG_TRACEBACK_FRAMES)
+    return event_dict
@@ -0,0 +1,47 @@
+"""
+Minimal in-process ASGI driver shared by the benchmark scripts.
+"""
+
+
+def make_scope(method: str, path: str, query_string: bytes = b"", headers=()):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string,
+        "root_path": "",
+        "headers": list(headers),
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+
+
+async def call_asgi(app, method: str = "GET", path: str = "/", body: bytes = b"", headers=()):
+    """
+    Sends one request straight into an ASGI app and returns (status, body).
+    """
+    scope = make_scope(method, path, headers=headers)
+    request_sent = False
+    status = None
+    chunks = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
@@ -0,0 +1,89 @@
+"""
+Cold-start time: from launching uvicorn to the first successful response.
+
+Starts a fresh server process `--runs` times for each variant against a new
+temporary database, polls GET / every few milliseconds until it answers, and
+stops it. Variants are the full app and the app with every optional router
+skipped. `--backend-dir` points at another checkout of this directory, e.g.
+an older revision in a git worktree, to compare against it.
+
+Run from the backend directory:
+    python -m benchmarks.cold_start --runs 10
+    git worktree add /tmp/before <rev> && python -m benchmarks.cold_start --backend-dir /tmp/before/backend
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from app.main import OPTIONAL_ROUTERS
+from .routes import BACKEND_DIR, free_port
+
+VARIANTS = {
+    "full": "",
+    "skip_optional": ",".join(name for name, _ in OPTIONAL_ROUTERS),
+}
+
+
+def cold_start(backend_dir: str, skip: str, poll_interval: float = 0.005, timeout: float = 30):
+    """
+    Returns (seconds to first response, the server's /debug/startup report or None).
+    """
+    port = free_port()
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, DB_FILE=os.path.join(workdir, "todos.db"), AGENT_URL="http://127.0.0.1:9", SKIP_ROUTERS=skip)
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(url + "/", timeout=1):
+                    elapsed = time.perf_counter() - started
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if time.perf_counter() - started > timeout or process.poll() is not None:
+                    raise RuntimeError(f"Server in {backend_dir} did not start")
+                time.sleep(poll_interval)
+        try:
+            with urllib.request.urlopen(url + "/debug/startup", timeout=5) as response:
+                report = json.load(response)
+        except urllib.error.HTTPError:
+            report = None  # a revision without the startup report
+        return elapsed, report
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--backend-dir", default=BACKEND_DIR)
+    parser.add_argument("--show-report", action="store_true", help="Print the last /debug/startup report per variant")
+    args = parser.parse_args()
+
+    print(f"{'variant':<16}{'mean ms':>10}{'p50 ms':>10}{'min ms':>10}{'max ms':>10}")
+    for name, skip in VARIANTS.items():
+        samples = []
+        report = None
+        for _ in range(args.runs):
+            elapsed, report = cold_start(args.backend_dir, skip)
+            samples.append(elapsed * 1000)
+        print(f"{name:<16}{statistics.mean(samples):>10.1f}{statistics.median(samples):>10.1f}"
+              f"{min(samples):>10.1f}{max(samples):>10.1f}")
+        if args.show_report and report is not None:
+            print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Cost of the fault-injection hooks when no fault is installed.
+
+Times one hook check (the `if fault_injector.<target>:` guard every hook
+starts with) in isolation, then the full app on a route that passes the
+middleware and database hooks, with no faults installed and with a fault
+installed that never matches. Log output is filtered at the level check so
+only request handling is measured.
+
+Run from the backend directory:
+    python -m benchmarks.fault_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+import timeit
+
+os.environ.setdefault("DB_FILE", os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("AGENT_URL", "http://127.0.0.1:9")
+
+from app.database import init_db
+from app.faults import FaultSpec, fault_injector
+from app.main import app
+from .asgi import call_asgi
+
+# GET /todos goes through the middleware hook and the database read hook
+PATHS = ("/", "/todos")
+
+
+def hook_ns(loops: int):
+    """
+    Nanoseconds per inactive hook check, and per empty statement for comparison.
+    """
+    guard = timeit.timeit("if fault_injector.db: pass", globals={"fault_injector": fault_injector}, number=loops)
+    empty = timeit.timeit("pass", number=loops)
+    return guard / loops * 1e9, empty / loops * 1e9
+
+
+async def measure(path: str, requests: int, warmup: int):
+    for _ in range(warmup):
+        await call_asgi(app, "GET", path)
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter_ns()
+        await call_asgi(app, "GET", path)
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument("--loops", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    init_db()
+
+    guard_ns, empty_ns = hook_ns(args.loops)
+    print(f"inactive hook check: {guard_ns:.1f} ns (empty statement: {empty_ns:.1f} ns)\n")
+
+    print(f"{'path':<20}{'faults':<14}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}")
+    for path in PATHS:
+        results = {}
+        for label in ("none", "non_matching"):
+            fault_injector.clear()
+            if label == "non_matching":
+                for target in ("http", "db"):
+                    fault_injector.add(FaultSpec(target=target, route="/never-matches", ttl=3600))
+            samples = sorted(asyncio.run(measure(path, args.requests, args.warmup)))
+            results[label] = statistics.mean(samples) / 1000
+            p50 = samples[len(samples) // 2] / 1000
+            p99 = samples[int(len(samples) * 0.99)] / 1000
+            print(f"{path:<20}{label:<14}{results[label]:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+        # At most three inactive checks run per request: middleware, read, write
+        print(f"{'':<20}inactive hooks: {3 * guard_ns / (results['none'] * 1000) * 100:.4f}% of a request\n")
+    fault_injector.clear()
+
+
+if __name__ == "__main__":
+    main()
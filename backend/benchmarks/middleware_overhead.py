@@ -0,0 +1,102 @@
+"""
+Per-request overhead of the request middleware.
+
+Compares a bare FastAPI app against the same app wrapped with the previous
+`@app.middleware("http")` implementation (BaseHTTPMiddleware) and with the
+pure ASGI RequestContextMiddleware. Log output is filtered at the level check
+in all variants so only the middleware machinery is measured.
+
+Run from the backend directory:
+    python -m benchmarks.middleware_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("DB_FILE", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+from fastapi import FastAPI, Request
+
+from app.logger import logger
+from app.middleware import RequestContextMiddleware
+from .asgi import call_asgi
+
+
+def build_plain():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def build_base_http():
+    app = build_plain()
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        # The original BaseHTTPMiddleware implementation, minus agent notification
+        request_id = str(uuid.uuid4())
+        logger.info("request_started", method=request.method, path=request.url.path, request_id=request_id)
+        start_time = time.time()
+        response = await call_next(request)
+        logger.info(
+            "request_finished",
+            method=request.method,
+            path=request.url.path,
+            status_code=response.status_code,
+            process_time=time.time() - start_time,
+            request_id=request_id
+        )
+        return response
+
+    return app
+
+
+def build_asgi():
+    app = build_plain()
+    app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+async def measure(app, requests: int, warmup: int):
+    for _ in range(warmup):
+        await call_asgi(app, "GET", "/ping")
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter_ns()
+        await call_asgi(app, "GET", "/ping")
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {}
+    for name, build in (("no_middleware", build_plain), ("base_http_middleware", build_base_http), ("asgi_middleware", build_asgi)):
+        samples = asyncio.run(measure(build(), args.requests, args.warmup))
+        results[name] = (statistics.mean(samples) / 1000, statistics.median(samples) / 1000)
+
+    base_mean = results["no_middleware"][0]
+    print(f"{'variant':<24}{'mean us':>10}{'p50 us':>10}{'overhead us':>14}")
+    for name, (mean_us, p50_us) in results.items():
+        print(f"{name:<24}{mean_us:>10.1f}{p50_us:>10.1f}{mean_us - base_mean:>14.1f}")
+    saved = results["base_http_middleware"][0] - results["asgi_middleware"][0]
+    print(f"\nPer-request overhead saved by the ASGI middleware: {saved:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Per-route throughput and latency benchmark with baseline regression gating.
+
+Starts the app under uvicorn against a temporary SQLite file, with the agent
+webhook pointed at a local stub, seeds the table, warms each route up and
+then drives it closed-loop at several concurrency levels. Results can be
+saved as a JSON baseline and later runs compared against it.
+
+Run from the backend directory:
+    python -m benchmarks.routes --save-baseline benchmarks/baseline.json
+    python -m benchmarks.routes --compare benchmarks/baseline.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from app.agent_stub import start_stub
+from app.histogram import LatencyHistogram
+from app.loadgen import request_body
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Routes that start long-running scenarios or take the service down for everyone
+EXCLUDED_ROUTES = {
+    "/simulate/memory_leak",
+    "/simulate/memory_pressure",
+    "/simulate/memory_reset",
+    "/simulate/timeout",
+    "/simulate/db_error",
+    "/simulate/traffic_gen",
+}
+
+# Streams that never end, and operator controls that change server state
+# (profilers, tracemalloc, injected faults, campaigns)
+EXCLUDED_PREFIXES = ("/events/stream", "/debug", "/faults", "/campaigns")
+
+
+def discover_routes():
+    """
+    Lists (method, path) for every benchmarkable route in app.main.
+    Routes with path parameters, scenario triggers, streams and operator
+    controls are skipped.
+    """
+    from app.main import app
+
+    routes = []
+    for path, operations in app.openapi()["paths"].items():
+        if "{" in path or path in EXCLUDED_ROUTES or path.startswith(EXCLUDED_PREFIXES):
+            continue
+        for method in operations:
+            routes.append((method.upper(), path))
+    return sorted(routes, key=lambda r: (r[1], r[0]))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_file: str, agent_url: str):
+    port = free_port()
+    env = dict(os.environ, DB_FILE=db_file, AGENT_URL=agent_url, LOG_ASYNC="1")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url + "/").status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server did not start within 30s")
+
+
+async def drive(client, method, path, concurrency, duration):
+    """
+    Closed-loop: `concurrency` workers send back-to-back requests for `duration` seconds.
+    """
+    histogram = LatencyHistogram()
+    errors = 0
+    end = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            try:
+                await client.request(method, path, json=request_body(method, path))
+            except httpx.HTTPError:
+                errors += 1
+            histogram.record(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    summary = histogram.summary_ms()
+    return {
+        "requests": histogram.count,
+        "transport_errors": errors,
+        "rps": round(histogram.count / elapsed, 2),
+        "p50_ms": summary["p50_ms"],
+        "p95_ms": summary["p95_ms"],
+        "p99_ms": summary["p99_ms"],
+    }
+
+
+async def run_suite(url, routes, levels, duration, warmup, seed_rows):
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+        await client.post("/todos/batch", json=[{"title": f"seed-{i}"} for i in range(seed_rows)])
+        results = {}
+        for method, path in routes:
+            label = f"{method} {path}"
+            await drive(client, method, path, 1, warmup)
+            results[label] = {}
+            for level in levels:
+                results[label][str(level)] = await drive(client, method, path, level, duration)
+            print(f"{label:<45} " + "  ".join(
+                f"c={level}: {results[label][str(level)]['rps']:>8.1f} rps p99 {results[label][str(level)]['p99_ms']:>8.2f} ms"
+                for level in levels), file=sys.stderr)
+        return results
+
+
+def compare(current: dict, baseline: dict, threshold: float):
+    """
+    Returns regressions where p95 latency grew or throughput fell by more than `threshold`.
+    """
+    regressions = []
+    for route, levels in current["results"].items():
+        for level, stats in levels.items():
+            base = baseline["results"].get(route, {}).get(level)
+            if not base:
+                continue
+            if base["p95_ms"] and stats["p95_ms"] > base["p95_ms"] * (1 + threshold):
+                regressions.append(f"{route} c={level}: p95 {base['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if base["rps"] and stats["rps"] < base["rps"] * (1 - threshold):
+                regressions.append(f"{route} c={level}: rps {base['rps']} -> {stats['rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-route benchmark with baseline comparison.")
+    parser.add_argument("--levels", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=1.0, help="Seconds per route and level")
+    parser.add_argument("--warmup", type=float, default=0.5, help="Warm-up seconds per route")
+    parser.add_argument("--seed-rows", type=int, default=100, help="Todos inserted before measuring")
+    parser.add_argument("--routes", help="Only routes whose path contains one of these comma-separated strings")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--save-baseline", help="Write results JSON as the new baseline")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    db_file = os.path.join(workdir, "bench.db")
+    os.environ["DB_FILE"] = db_file  # route discovery imports the app too
+
+    routes = discover_routes()
+    if args.routes:
+        wanted = args.routes.split(",")
+        routes = [r for r in routes if any(w in r[1] for w in wanted)]
+
+    stub = start_stub()
+    process, url = start_server(db_file, stub.url)
+    try:
+        results = asyncio.run(run_suite(url, routes, levels, args.duration, args.warmup, args.seed_rows))
+    finally:
+        process.terminate()
+        process.wait(10)
+        stub.shutdown()
+
+    report = {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "levels": levels,
+        "duration": args.duration,
+        "results": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print("Regressions beyond {:.0%}:".format(args.threshold))
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print("No regressions beyond {:.0%}".format(args.threshold))
+
+
+if __name__ == "__main__":
+    main()
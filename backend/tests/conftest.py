@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import time, so point every file it
+# writes at a scratch directory before anything imports it
+_scratch = tempfile.mkdtemp(prefix="simulation-tests-")
+os.environ.setdefault("DB_FILE", os.path.join(_scratch, "todos.db"))
+os.environ.setdefault("AGENT_SPILL_PATH", os.path.join(_scratch, "agent_spill.jsonl"))
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+os.environ.pop("AGENT_URL", None)
+os.environ.pop("INCIDENT_RECORD_DIR", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db_pool import ConnectionPool  # noqa: E402
+from app.faults import fault_injector  # noqa: E402
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS todos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        completed BOOLEAN NOT NULL CHECK (completed IN (0, 1)) DEFAULT 0
+    )
+"""
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "todos.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(SCHEMA)
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def pool(db_file):
+    return ConnectionPool(db_file)
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+        # Faults installed through the API are shared with other workers too
+        client.delete("/faults")
+
+
+@pytest.fixture(autouse=True)
+def no_faults():
+    fault_injector.clear()
+    yield
+    fault_injector.clear()
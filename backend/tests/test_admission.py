@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+from app.admission import AdmissionController, AdmissionMiddleware, RouteClass, parse_limits
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_parse_limits():
+    assert parse_limits("simulation=8:8:50, core=128:256:500,") == {
+        "simulation": (8, 8, 50),
+        "core": (128, 256, 500),
+    }
+
+
+def test_classify():
+    controller = AdmissionController({"core": (1, 1, 1), "simulation": (1, 1, 1), "default": (1, 1, 1)})
+
+    assert controller.classify("/").name == "core"
+    assert controller.classify("/todos/1").name == "core"
+    assert controller.classify("/simulate/disk_full").name == "simulation"
+    assert controller.classify("/anything").name == "default"
+    for path in ("/metrics", "/faults", "/debug/profile", "/scenarios", "/events/stream"):
+        assert controller.classify(path) is None
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    async def scenario():
+        route_class = RouteClass("core", limit=1, queue=2, deadline_ms=1000)
+        assert await route_class.acquire()
+        first = asyncio.ensure_future(route_class.acquire())
+        second = asyncio.ensure_future(route_class.acquire())
+        await asyncio.sleep(0)
+        assert route_class.stats()["queued_now"] == 2
+
+        route_class.release(0.01)
+        assert await first
+        assert not second.done()
+        # The slot moved to the waiter rather than being freed
+        assert route_class.inflight == 1
+
+        route_class.release(0.01)
+        assert await second
+        route_class.release(0.01)
+        return route_class.stats()
+
+    stats = run(scenario())
+    assert stats["inflight"] == 0
+    assert stats["admitted"] == 3
+    assert stats["admitted_after_queueing"] == 2
+
+
+def test_sheds_when_the_queue_is_full_or_the_deadline_passes():
+    async def scenario():
+        route_class = RouteClass("simulation", limit=1, queue=1, deadline_ms=20)
+        assert await route_class.acquire()
+        waiter = asyncio.ensure_future(route_class.acquire())
+        await asyncio.sleep(0)
+        assert not await route_class.acquire()  # queue full
+        assert not await waiter  # deadline passed
+        return route_class
+
+    route_class = run(scenario())
+    stats = route_class.stats()
+    assert (stats["shed_queue_full"], stats["shed_deadline"]) == (1, 1)
+    assert stats["queued_now"] == 0
+    assert route_class.retry_after() >= 1
+
+
+def test_a_cancelled_waiter_passes_its_slot_on():
+    async def scenario():
+        route_class = RouteClass("core", limit=1, queue=2, deadline_ms=1000)
+        assert await route_class.acquire()
+        cancelled = asyncio.ensure_future(route_class.acquire())
+        waiting = asyncio.ensure_future(route_class.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        route_class.release(0.0)
+        assert await waiting
+        return route_class
+
+    assert run(scenario()).inflight == 1
+
+
+def test_middleware_answers_503_with_retry_after():
+    controller = AdmissionController({"core": (1, 0, 10), "simulation": (1, 0, 10), "default": (1, 0, 10)})
+    sent = []
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await gate.wait()
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = AdmissionMiddleware(app, controller)
+        scope = {"type": "http", "path": "/todos"}
+        busy = asyncio.ensure_future(middleware(scope, None, send))
+        await asyncio.sleep(0)
+        await middleware(scope, None, send)
+        gate.set()
+        await busy
+
+    run(scenario())
+    start, body = sent
+    headers = dict(start["headers"])
+    assert start["status"] == 503
+    assert b"retry-after" in headers
+    assert json.loads(body["body"])["route_class"] == "core"
+    assert controller.classes["core"].inflight == 0
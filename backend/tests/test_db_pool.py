@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app.db_pool import ConnectionPool
+from app.faults import FaultSpec, InjectedDatabaseError, fault_injector
+
+
+def test_readers_are_query_only(pool):
+    with pool.reader() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO todos (title) VALUES ('x')")
+
+
+def test_reader_is_reused_per_thread(pool):
+    with pool.reader() as first:
+        pass
+    with pool.reader() as second:
+        pass
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool._reader_connection()))
+    thread.start()
+    thread.join()
+    assert first is second
+    assert other[0] is not first
+    assert pool.stats()["open_readers"] == 2
+
+
+def test_writer_commits_and_rolls_back(pool):
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO todos (title) VALUES ('kept')")
+    with pytest.raises(RuntimeError):
+        with pool.writer() as conn:
+            conn.execute("INSERT INTO todos (title) VALUES ('dropped')")
+            raise RuntimeError("boom")
+    with pool.reader() as conn:
+        titles = [row["title"] for row in conn.execute("SELECT title FROM todos")]
+    assert titles == ["kept"]
+
+
+def test_missing_database_fails_instead_of_creating_one(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "missing.db"))
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.reader():
+            pass
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_init_db_enables_wal_before_the_first_write(tmp_path, monkeypatch):
+    from app import database
+
+    path = str(tmp_path / "fresh.db")
+    monkeypatch.setattr(database, "DB_FILE", path)
+    database.init_db()
+    with ConnectionPool(path).reader() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_invalidate_leaves_readers_to_their_owning_thread(pool):
+    with pool.reader() as conn:
+        pool.invalidate(reason="test")
+        # Still usable by the thread that holds it
+        assert conn.execute("SELECT count(*) FROM todos").fetchone()[0] == 0
+    with pool.reader() as fresh:
+        assert fresh is not conn
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    assert pool.generation == 1
+
+
+def test_read_faults_raise_before_touching_the_database(pool):
+    fault_injector.add(FaultSpec(target="db", operation="read", message="injected"))
+    with pytest.raises(InjectedDatabaseError, match="injected"):
+        with pool.reader():
+            pass
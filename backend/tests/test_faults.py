@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from app.faults import FaultSpec, InjectedFault, LatencySpec, fault_injector, validate_fault
+
+
+def test_no_faults_means_empty_hook_tuples():
+    assert fault_injector.http == fault_injector.db == fault_injector.agent == ()
+
+
+def test_faults_expire_after_their_ttl():
+    fault = fault_injector.add(FaultSpec(target="agent"), expires_at=time.time() - 1)
+    assert fault_injector.agent == (fault,)
+
+    # Expired faults never fire and are dropped on the next evaluation
+    assert fault_injector.evaluate(fault_injector.agent) == (0.0, None)
+    assert fault_injector.agent == ()
+    assert fault_injector.stats()["expired"] == 1
+
+
+def test_route_and_operation_filters():
+    fault = fault_injector.add(FaultSpec(target="db", route="/todos", operation="write"))
+
+    assert fault_injector.evaluate(fault_injector.db, "/todos/1", "write") == (0.0, fault)
+    assert fault_injector.evaluate(fault_injector.db, "/todos", "read") == (0.0, None)
+    assert fault_injector.evaluate(fault_injector.db, "/simulate", "write") == (0.0, None)
+
+
+def test_latency_is_summed_and_clamped():
+    latency = LatencySpec(distribution="fixed", mean_ms=50, max_ms=20)
+    fault_injector.add(FaultSpec(target="agent", kind="latency", latency=latency))
+    fault_injector.add(FaultSpec(target="agent", kind="latency", latency=latency))
+
+    delay, error = fault_injector.evaluate(fault_injector.agent)
+
+    assert delay == pytest.approx(0.04)
+    assert error is None
+
+
+def test_probability_zero_never_fires():
+    fault = fault_injector.add(FaultSpec(target="agent", probability=0))
+    for _ in range(100):
+        fault_injector.apply(fault_injector.agent)
+    assert (fault.matched, fault.fired) == (100, 0)
+
+
+def test_apply_raises_the_injected_error():
+    fault_injector.add(FaultSpec(target="agent", message="agent down"))
+    with pytest.raises(InjectedFault, match="agent down"):
+        fault_injector.apply(fault_injector.agent)
+
+
+@pytest.mark.parametrize("spec, error", [
+    (FaultSpec(target="disk"), "target"),
+    (FaultSpec(probability=2), "probability"),
+    (FaultSpec(ttl=0), "ttl"),
+    (FaultSpec(status=200), "status"),
+    (FaultSpec(target="agent", route="/todos"), "route"),
+    (FaultSpec(target="http", operation="read"), "operation"),
+    (FaultSpec(kind="latency"), "latency spec"),
+])
+def test_invalid_specs_are_rejected(spec, error):
+    assert error in validate_fault(spec)
+
+
+def test_http_faults_keep_cors_headers_and_spare_control_routes(client):
+    origin = {"Origin": "http://dashboard.example"}
+    assert client.post("/faults", json={"target": "http", "status": 503}).status_code == 200
+
+    faulted = client.get("/todos", headers=origin)
+    assert faulted.status_code == 503
+    assert faulted.headers["access-control-allow-origin"]
+    assert faulted.headers["x-request-id"]
+
+    assert client.get("/metrics", headers=origin).status_code == 200
+    assert client.get("/faults", headers=origin).status_code == 200
+    assert client.delete("/faults").status_code == 200
+    assert client.get("/todos", headers=origin).status_code == 200
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from app.fingerprint import StormCoalescer, fingerprint_exception, fingerprint_message
+
+
+def raise_and_catch(exc_type):
+    try:
+        raise exc_type("boom")
+    except exc_type as e:
+        return e
+
+
+def test_exceptions_from_the_same_place_share_a_fingerprint():
+    first = [raise_and_catch(KeyError) for _ in range(2)]
+    assert fingerprint_exception(first[0], "bug") == fingerprint_exception(first[1], "bug")
+    assert fingerprint_exception(first[0], "bug") != fingerprint_exception(first[0], "other")
+    assert fingerprint_exception(first[0], "bug") != fingerprint_exception(raise_and_catch(ValueError), "bug")
+
+
+def test_message_fingerprint_ignores_the_exception_text():
+    template = 'Traceback:\n  File "a.py", line 1, in f\nKeyError: {}'
+    assert fingerprint_message(template.format("'x'"), "bug") == fingerprint_message(template.format("'y'"), "bug")
+
+
+def test_repeats_are_suppressed_and_summarised_once_per_window():
+    emitted = []
+    coalescer = StormCoalescer(emitted.append, window=60)
+    coalescer._ensure_flusher = lambda: None
+
+    assert coalescer.observe("key", lambda: {"error": "Traceback\nKeyError: 'x'"})
+    for _ in range(4):
+        assert not coalescer.observe("key", pytest.fail)
+
+    assert coalescer.flush(time.monotonic()) == []
+    [summary] = coalescer.flush(time.monotonic() + 61)
+    assert summary["summary"] is True
+    assert summary["occurrences"] == 4
+    assert "KeyError: 'x'" in summary["error"]
+    assert coalescer.stats()["repeats_suppressed"] == 4
+
+
+def test_quiet_fingerprints_are_forgotten():
+    coalescer = StormCoalescer(lambda payload: None, window=1)
+    coalescer._ensure_flusher = lambda: None
+    coalescer.observe("key", dict)
+
+    assert coalescer.flush(time.monotonic() + 2) == []
+    assert coalescer.stats()["active_fingerprints"] == 0
+    assert coalescer.observe("key", dict)
+
+
+def test_racing_first_occurrences_build_one_payload():
+    builds = []
+    emitted = []
+    coalescer = StormCoalescer(emitted.append)
+    coalescer._ensure_flusher = lambda: None
+    barrier = threading.Barrier(16)
+
+    def build():
+        builds.append(1)
+        time.sleep(0.01)
+        return {"error": "boom"}
+
+    def worker():
+        barrier.wait()
+        coalescer.observe("key", build)
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == len(emitted) == 1
+    assert coalescer.stats()["repeats_suppressed"] == 15
+
+
+def test_a_failed_build_releases_the_claim():
+    coalescer = StormCoalescer(lambda payload: None)
+    coalescer._ensure_flusher = lambda: None
+
+    with pytest.raises(RuntimeError):
+        coalescer.observe("key", lambda: (_ for _ in ()).throw(RuntimeError("no payload")))
+    assert coalescer.observe("key", dict)
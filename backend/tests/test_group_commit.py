@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app.faults import FaultSpec, InjectedDatabaseError, fault_injector
+from app.group_commit import GroupCommitter
+
+INSERT = "INSERT INTO todos (title, completed) VALUES (?, ?)"
+
+
+def submit_concurrently(committer, params_list):
+    results = [None] * len(params_list)
+    barrier = threading.Barrier(len(params_list))
+
+    def worker(i, params):
+        barrier.wait()
+        try:
+            results[i] = committer.submit(INSERT, params)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i, params)) for i, params in enumerate(params_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_writes_share_commits(pool):
+    committer = GroupCommitter(pool, window=0.05)
+    results = submit_concurrently(committer, [(f"todo {i}", 0) for i in range(20)])
+
+    assert sorted(results) == list(range(1, 21))
+    stats = committer.stats()
+    assert stats["group_rows"] == 20
+    assert stats["group_commits"] < 20
+
+
+def test_a_failing_statement_only_fails_its_caller(pool):
+    committer = GroupCommitter(pool, window=0.05)
+    # NULL violates the NOT NULL constraint on title
+    results = submit_concurrently(committer, [("ok", 0), (None, 0), ("also ok", 0)])
+
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert all(isinstance(result, int) for result in (results[0], results[2]))
+    with pool.reader() as conn:
+        assert conn.execute("SELECT count(*) FROM todos").fetchone()[0] == 2
+
+
+def test_insert_many_returns_contiguous_ids(pool):
+    committer = GroupCommitter(pool)
+    committer.submit(INSERT, ("first", 0))
+
+    ids = committer.insert_many(INSERT, [(f"bulk {i}", 0) for i in range(5)])
+
+    assert ids == [2, 3, 4, 5, 6]
+    assert committer.insert_many(INSERT, []) == []
+    assert committer.stats()["bulk_size_histogram"] == {"le_8": 1}
+
+
+def test_write_faults_fail_on_the_callers_thread(pool):
+    committer = GroupCommitter(pool)
+    fault_injector.add(FaultSpec(target="db", operation="write"))
+    with pytest.raises(InjectedDatabaseError):
+        committer.submit(INSERT, ("never written", 0))
+    assert committer.stats()["pending"] == 0
@@ -0,0 +1,58 @@
+from app.incident_store import BUCKET_SECONDS, IncidentStore
+
+T0 = 1_700_000_000.0
+
+
+def fill(store, records):
+    return [store.add(incident_type, severity, "test", timestamp=ts) for incident_type, severity, ts in records]
+
+
+def test_query_is_newest_first_with_a_cursor():
+    store = IncidentStore(capacity=10)
+    fill(store, [("bug", "high", T0 + i) for i in range(5)])
+
+    page, cursor = store.query(limit=2)
+    assert [incident["id"] for incident in page] == [5, 4]
+    rest, end = store.query(limit=10, cursor=cursor)
+    assert [incident["id"] for incident in rest] == [3, 2, 1]
+    assert end is None
+
+
+def test_filters_use_the_indexes():
+    store = IncidentStore(capacity=10)
+    fill(store, [("bug", "high", T0), ("db", "critical", T0 + 1), ("bug", "LOW", T0 + 2)])
+
+    assert [i["id"] for i in store.query(incident_type="bug")[0]] == [3, 1]
+    assert [i["id"] for i in store.query(severity="low")[0]] == [3]
+    assert store.query(incident_type="bug", severity="critical")[0] == []
+    assert store.query(incident_type="unknown-type")[0] == []
+
+
+def test_time_window_filters():
+    store = IncidentStore(capacity=10)
+    fill(store, [("bug", "high", T0 + i * BUCKET_SECONDS) for i in range(4)])
+
+    since = T0 + BUCKET_SECONDS
+    until = T0 + 2 * BUCKET_SECONDS
+    assert [i["id"] for i in store.query(since=since, until=until)[0]] == [3, 2]
+
+
+def test_eviction_keeps_indexes_and_counts_in_step():
+    store = IncidentStore(capacity=3)
+    fill(store, [("bug", "high", T0), ("db", "critical", T0 + 1), ("bug", "high", T0 + 2),
+                 ("db", "critical", T0 + BUCKET_SECONDS)])
+
+    assert [i["id"] for i in store.query()[0]] == [4, 3, 2]
+    assert [i["id"] for i in store.query(incident_type="bug")[0]] == [3]
+    counts = store.counts(window_minutes=10)
+    assert counts["total"] == 3
+    assert counts["by_type"] == {"bug": 1, "db": 2}
+    assert [minute["count"] for minute in counts["per_minute"]] == [2, 1]
+    assert store.stats()["evicted"] == 1
+
+
+def test_timestamps_never_go_backwards():
+    store = IncidentStore(capacity=10)
+    fill(store, [("bug", "high", T0 + 10), ("bug", "high", T0)])
+    newest, older = store.query()[0]
+    assert newest["timestamp"] == older["timestamp"]
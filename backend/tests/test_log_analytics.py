@@ -0,0 +1,65 @@
+import argparse
+import json
+
+import pytest
+
+from app.log_analytics import LogSummary, analyze, normalize_path, positive_seconds
+
+
+def request_line(path, status, seconds, request_id):
+    return json.dumps({
+        "event": "request_finished", "method": "GET", "path": path, "status_code": status,
+        "process_time": seconds, "request_id": request_id, "timestamp": "2024-01-01T00:00:00Z",
+    })
+
+
+def incident_line(incident_type, timestamp):
+    return json.dumps({"type": "incident", "incident_type": incident_type, "severity": "high", "timestamp": timestamp})
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    lines = [request_line(f"/todos/{i}", 500 if i % 10 == 0 else 200, i / 1000, f"r{i}") for i in range(100)]
+    lines += [incident_line("bug", "2024-01-01T00:00:30Z"), incident_line("bug", "2024-01-01T00:02:00Z")]
+    lines += ["not json at all", '{"event": "request_finished", "broken"', ""]
+    path = tmp_path / "server.log"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_normalize_path():
+    assert normalize_path("/todos/42") == "/todos/{id}"
+    assert normalize_path("/scenarios/0123456789abcdef0123") == "/scenarios/{id}"
+    assert normalize_path("/simulate/disk_full") == "/simulate/disk_full"
+
+
+def test_chunked_analysis_matches_a_single_pass(log_file):
+    single = analyze([log_file], workers=1, chunk_bytes=1 << 30, window=60, top=5).report()
+    chunked = analyze([log_file], workers=1, chunk_bytes=256, window=60, top=5).report()
+
+    assert chunked == single
+    assert single["requests"] == 100
+    assert single["malformed"] == 1
+    assert single["paths"]["GET /todos/{id}"]["error_rate"] == 0.1
+    assert [entry["request_id"] for entry in single["slowest"]] == ["r99", "r98", "r97", "r96", "r95"]
+    assert single["incidents"]["totals"] == {"bug/high": 2}
+    assert len(single["incidents"]["windows"]) == 2
+
+
+def test_merge_caps_paths_under_other():
+    left = LogSummary(max_paths=2)
+    right = LogSummary(max_paths=2)
+    for path in ("/a", "/b"):
+        left.add_request("GET", path, 200, 0.001, None)
+    right.add_request("GET", "/c", 200, 0.001, None)
+
+    left.merge(right)
+
+    assert set(left.paths) == {"GET /a", "GET /b", "GET [other]"}
+
+
+def test_window_must_be_positive():
+    assert positive_seconds("60") == 60
+    for value in ("0", "-5", "inf", "nan"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            positive_seconds(value)
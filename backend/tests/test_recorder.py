@@ -0,0 +1,64 @@
+import gzip
+import json
+
+from app.recorder import IncidentRecorder, list_segments
+from app.replay import ReplayResult, read_records
+
+
+def test_segments_rotate_by_size_and_old_ones_are_pruned(tmp_path):
+    recorder = IncidentRecorder(str(tmp_path), segment_bytes=200, max_segments=2)
+    for i in range(10):
+        recorder.record([{"n": i, "padding": "x" * 250}])
+    recorder.close()
+
+    segments = list_segments(str(tmp_path))
+    assert len(segments) == 2
+    assert recorder.stats()["segments_opened"] == 10
+
+
+def test_recorded_payloads_replay_in_time_order(tmp_path):
+    recorder = IncidentRecorder(str(tmp_path), segment_bytes=1)
+    recorder.record([{"n": 0}, {"n": 1}])
+    recorder.record([{"n": 2}])
+    recorder.close()
+
+    result = ReplayResult()
+    payloads = [payload["n"] for _, payload in read_records([str(tmp_path)], result)]
+    assert payloads == [0, 1, 2]
+    assert result.skipped_lines == result.damaged_segments == 0
+
+
+def test_unflushed_segment_is_readable_up_to_the_last_sync(tmp_path):
+    recorder = IncidentRecorder(str(tmp_path), flush_interval=0)
+    recorder.record([{"n": 0}])
+
+    # The writer is still open, as after a crash
+    with gzip.open(recorder.stats()["current_segment"], "rb") as f:
+        lines = []
+        try:
+            for line in f:
+                lines.append(json.loads(line))
+        except EOFError:
+            pass
+    assert [line["payload"] for line in lines] == [{"n": 0}]
+    recorder.close()
+
+
+def test_a_write_error_closes_the_segment_and_starts_a_new_one(tmp_path):
+    recorder = IncidentRecorder(str(tmp_path))
+    recorder.record([{"n": 0}])
+    broken = recorder._file
+
+    def fail(data):
+        raise OSError(28, "No space left on device")
+
+    broken.write = fail
+    recorder.record([{"n": 1}])
+
+    assert broken.closed
+    assert recorder.stats()["errors"] == 1
+    recorder.record([{"n": 2}])
+    recorder.close()
+    result = ReplayResult()
+    assert [payload["n"] for _, payload in read_records([str(tmp_path)], result)] == [0, 2]
+    assert result.damaged_segments == 0
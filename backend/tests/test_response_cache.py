@@ -0,0 +1,50 @@
+from app.response_cache import CachedResponse, SharedVersion, VersionedCache
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = VersionedCache(max_entries=2)
+    cache.put("a", CachedResponse(b"a"))
+    cache.put("b", CachedResponse(b"b"))
+    cache.get("a")
+    cache.put("c", CachedResponse(b"c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == b"a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_bump_moves_to_a_new_version():
+    cache = VersionedCache()
+    before = cache.version
+    cache.bump()
+    assert cache.version == before + 1
+
+
+def test_etag_depends_only_on_the_body():
+    assert CachedResponse(b"[]").etag == CachedResponse(b"[]").etag
+    assert CachedResponse(b"[]").etag != CachedResponse(b"[1]").etag
+
+
+def test_if_none_match():
+    cache = VersionedCache()
+    entry = CachedResponse(b"body")
+
+    assert cache.not_modified(entry, entry.etag)
+    assert cache.not_modified(entry, f'"other", W/{entry.etag}')
+    assert cache.not_modified(entry, "*")
+    assert not cache.not_modified(entry, '"other"')
+    assert not cache.not_modified(entry, None)
+    assert cache.stats()["not_modified"] == 3
+
+
+def test_shared_version_is_seen_by_every_cache_on_the_file(tmp_path):
+    path = str(tmp_path / "todos.version")
+    worker_a = VersionedCache(version_path=path)
+    worker_b = VersionedCache(version_path=path)
+
+    worker_a.bump()
+    worker_a.bump()
+
+    assert worker_b.version == worker_a.version == 2
+    # A restarted worker picks up where the others are
+    assert SharedVersion(path).read() == 2
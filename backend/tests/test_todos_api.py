@@ -0,0 +1,28 @@
+def test_list_is_cached_with_an_etag_until_the_next_write(client):
+    first = client.get("/todos")
+    etag = first.headers["etag"]
+
+    assert client.get("/todos", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/todos", json={"title": "new"})
+    changed = client.get("/todos", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert "new" in [todo["title"] for todo in changed.json()]
+
+
+def test_after_without_limit_skips_earlier_ids(client):
+    ids = [client.post("/todos", json={"title": f"page {i}"}).json()["id"] for i in range(3)]
+
+    todos = client.get("/todos", params={"after": ids[0]}).json()
+
+    assert [todo["id"] for todo in todos] == ids[1:]
+
+
+def test_pages_carry_the_next_cursor(client):
+    ids = [client.post("/todos", json={"title": f"cursor {i}"}).json()["id"] for i in range(3)]
+
+    page = client.get("/todos", params={"after": ids[0] - 1, "limit": 2})
+
+    assert [todo["id"] for todo in page.json()] == ids[:2]
+    assert page.headers["x-next-cursor"] == str(ids[1])
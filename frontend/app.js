@@ -190,6 +190,8 @@ modalOverlay.addEventListener('click', (e) => {
     if (e.target === modalOverlay) closeModal();
 });
 
+const MAX_LOG_ENTRIES = 500;
+
 function log(type, message) {
     const entry = document.createElement('div');
     entry.className = `log-entry ${type}`;
@@ -200,6 +202,55 @@ function log(type, message) {
         <span class="log-msg">${message}</span>
     `;
     logContainer.prepend(entry);
+    while (logContainer.childElementCount > MAX_LOG_ENTRIES) {
+        logContainer.lastElementChild.remove();
+    }
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = String(text);
+    return div.innerHTML;
+}
+
+// --- SERVER EVENT STREAM ---
+const streamStatus = document.getElementById('stream-status');
+const streamLevel = document.getElementById('stream-level');
+let eventSource = null;
+
+function describeEvent(event) {
+    if (event.type === 'agent_notification') {
+        return `🤖 agent notified: ${event.incident_type} (${event.severity}) ${event.message || ''}`;
+    }
+    if (event.type === 'incident') {
+        return `🚨 ${event.incident_type} [${event.severity}]`;
+    }
+    const details = event.path ? ` ${event.method || ''} ${event.path}` : (event.type ? ` [${event.type}]` : '');
+    return `🛰️ ${event.event}${details}`;
+}
+
+function connectEventStream() {
+    if (eventSource) eventSource.close();
+    eventSource = new EventSource(`${API_BASE}/events/stream?level=${streamLevel.value}`);
+
+    eventSource.onopen = () => {
+        streamStatus.textContent = 'live';
+        streamStatus.className = 'stream-status live';
+    };
+    eventSource.onerror = () => {
+        // EventSource reconnects on its own
+        streamStatus.textContent = 'reconnecting';
+        streamStatus.className = 'stream-status';
+    };
+    eventSource.onmessage = (e) => {
+        const event = JSON.parse(e.data);
+        const level = event.level || event.severity;
+        const type = level === 'error' || level === 'critical' ? 'error' : level === 'warning' ? 'system' : 'info';
+        log(type, escapeHtml(describeEvent(event)));
+    };
+    eventSource.addEventListener('dropped', (e) => {
+        log('system', `⚠️ ${JSON.parse(e.data).count} server events skipped (dashboard too slow)`);
+    });
 }
 
 function clearLog() {
@@ -208,4 +259,5 @@ function clearLog() {
 
 // Start
 checkHealth();
+connectEventStream();
 setInterval(checkHealth, 30000);